@@ -1,6 +1,9 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import os
+import json
+import time
+import threading
 from datetime import datetime
 import openai
 import requests
@@ -26,10 +29,14 @@ from utils.utils import (
 
 # RAG 서비스 import
 from services.rag_service import get_rag_service
+from services.index_reconciler import IndexReconciler
+from services.schema_index import SchemaIndex
+from services.index_rebuilder import IndexRebuilder
 
 # 한국어 전처리 에이전트 import (hybrid 방식 사용)
 try:
     from preprocessing.hybrid_preprocessing_agent import hybrid_agent
+    from preprocessing.preprocessing_result import serialize_result
     korean_preprocessing_agent = hybrid_agent
     KOREAN_PREPROCESSING_AVAILABLE = True
     print("✅ 한국어 전처리 에이전트(혼합 방식) 로드 성공")
@@ -64,8 +71,13 @@ LLM_MODEL = os.getenv('LLM_MODEL', 'gpt-3.5-turbo')
 # openai.api_key = os.getenv('OPENAI_API_KEY') # 이제 openai_client 사용
 OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
 
-# RAG 파일 업로드 설정
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'rag_files')
+# /api/convert 응답에 포함할 전처리 프로필 (full/prompt/lite, 요청의 preprocessing_profile로 변경 가능)
+# 프론트엔드 PreprocessingViewer가 reasoning_chain 등 전체 단계를 표시하므로 기본값은 full
+# (LLM 프롬프트 생성은 이 설정과 무관하게 항상 lite 사용)
+CONVERT_PREPROCESS_PROFILE = os.getenv('PREPROCESS_CONVERT_PROFILE', 'full')
+
+# RAG 파일 업로드 설정 (초기 색인/정합성 점검과 같은 폴더)
+UPLOAD_FOLDER = config.UPLOAD_FOLDER
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'docx', 'doc', 'csv', 'json', 'md'}
 
 # 도메인별 폴더 구조
@@ -219,6 +231,10 @@ def parse_user_metadata():
         print(f"엑셀 메타데이터 파싱 오류: {e}")
         return None
 
+def get_active_metadata():
+    """현재 적용 중인 메타데이터 (사용자 업로드 우선, 없으면 기본 메타데이터)"""
+    return parse_user_metadata() or CUSTOMER_METADATA
+
 # get_metadata 엔드포인트 수정: 사용자 메타데이터 우선 반환
 @app.route('/api/metadata', methods=['GET'])
 def get_metadata():
@@ -268,8 +284,12 @@ def upload_metadata():
             print(f"메타데이터 파싱 성공: {len(parsed_meta.get('tables', {}))}개 테이블")
         else:
             print("메타데이터 파싱 실패")
+
+        # 스키마 인덱스 재구축
+        schema_result = schema_index.rebuild(parsed_meta or CUSTOMER_METADATA)
             
-        return jsonify({"message": "메타데이터 파일이 업로드 및 적용되었습니다.", "filename": save_name})
+        return jsonify({"message": "메타데이터 파일이 업로드 및 적용되었습니다.", "filename": save_name,
+                        "schema_index": schema_result})
     except Exception as e:
         print(f"메타데이터 업로드 오류: {e}")
         return jsonify({"error": str(e)}), 500
@@ -302,7 +322,8 @@ def apply_metadata():
         return jsonify({"error": "파일이 존재하지 않습니다."}), 404
     with open(ACTIVE_META_FILE, 'w', encoding='utf-8') as f:
         f.write(filename)
-    return jsonify({"message": "적용 완료", "filename": filename})
+    schema_result = schema_index.rebuild(get_active_metadata())
+    return jsonify({"message": "적용 완료", "filename": filename, "schema_index": schema_result})
 
 # 메타데이터 파일 삭제
 @app.route('/api/metadata/delete/<filename>', methods=['DELETE'])
@@ -318,10 +339,32 @@ def delete_metadata(filename):
                 active = f.read().strip()
             if active == filename:
                 os.remove(ACTIVE_META_FILE)
+                schema_index.rebuild(get_active_metadata())
         return jsonify({"message": "삭제 완료"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# 질문-컬럼 연결 (스키마 인덱스 상위 N개 컬럼)
+@app.route('/api/metadata/link', methods=['POST'])
+def link_metadata():
+    try:
+        data = request.get_json() or {}
+        question = data.get('question', '')
+        if not question:
+            return jsonify({"error": "질문이 필요합니다."}), 400
+        start = time.perf_counter()
+        columns = schema_index.link(question, data.get('top_n'))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return jsonify({
+            "question": question,
+            "columns": columns,
+            "tables": SchemaIndex.rank_tables(columns),
+            "elapsed_ms": round(elapsed_ms, 2),
+            "index": schema_index.get_status()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # convert_question_to_sql에서 메타데이터를 동적으로 사용하도록 수정
 @app.route('/api/convert', methods=['POST'])
 def convert_to_sql():
@@ -329,17 +372,27 @@ def convert_to_sql():
     try:
         data = request.get_json()
         question = data.get('question', '')
-        rag_domain = data.get('rag_domain', None)
+        rag_domain = data.get('rag_domain', None)  # 단일 도메인 또는 도메인 목록
+        preprocessing_profile = data.get('preprocessing_profile') or CONVERT_PREPROCESS_PROFILE
         if not question:
             return jsonify({"error": "질문이 필요합니다."}), 400
         
         # 새로운 RAG 서비스를 사용하여 관련 문서 검색
-        rag_context = rag_service.get_rag_context(question, rag_domain, top_k=5)
+        rag_result = rag_service.build_rag_context(question, rag_domain, top_k=5)
+        rag_context = rag_result["context"]
+        
+        # 요청 프로필로 한 번만 전처리하여 SQL 변환(엔티티/SQL 패턴)과 응답에 함께 사용
+        analyzed = None
+        analysis_error = None
+        if KOREAN_PREPROCESSING_AVAILABLE and korean_preprocessing_agent:
+            try:
+                analyzed = korean_preprocessing_agent.analyze_query(question, preprocessing_profile)
+            except Exception as e:
+                analysis_error = f"전처리 중 오류 발생: {str(e)}"
         
         # 메타데이터 동적 로딩
-        user_meta = parse_user_metadata()
-        meta = user_meta if user_meta else CUSTOMER_METADATA
-        sql_query = convert_question_to_sql(question, rag_context, meta)
+        meta = get_active_metadata()
+        sql_query = convert_question_to_sql(question, rag_context, meta, analyzed)
         
         # 전처리 에이전트 정보 추가 (혼합 방식 우선)
         preprocessing_info = {}
@@ -347,23 +400,17 @@ def convert_to_sql():
         # 혼합 전처리 에이전트 사용 (우선)
         if KOREAN_PREPROCESSING_AVAILABLE and korean_preprocessing_agent:
             try:
-                preprocessed = korean_preprocessing_agent.preprocess_query(question)
-                preprocessing_info = {
+                if analysis_error:
+                    raise ValueError(analysis_error)
+                preprocessed = serialize_result(analyzed)
+                # 직렬화 결과(프로필에서 제외된 단계는 빈 값)에 요약 수치만 덧붙여 그대로 사용
+                preprocessing_info = preprocessed
+                preprocessing_info.update(preprocessed["preprocessing_metadata"])
+                preprocessing_info.update({
                     "agent_type": "hybrid",
                     "available": True,
-                    "original_query": preprocessed["original_query"],
-                    "normalized_query": preprocessed["normalized_query"],
-                    "mapped_query": preprocessed["mapped_query"],
-                    "entities": preprocessed["entities"],
-                    "clauses": preprocessed["clauses"],
-                    "reasoning_chain": preprocessed["reasoning_chain"],
-                    "sql_mappings": preprocessed["sql_mappings"],
-                    "preprocessing_metadata": preprocessed["preprocessing_metadata"],
-                    "domain_terms_found": preprocessed["preprocessing_metadata"]["domain_terms_found"],
-                    "clauses_count": preprocessed["preprocessing_metadata"]["clauses_count"],
-                    "reasoning_steps": preprocessed["preprocessing_metadata"]["reasoning_steps"],
-                    "sql_patterns_mapped": preprocessed["preprocessing_metadata"]["sql_patterns_mapped"]
-                }
+                    "profile": preprocessing_profile
+                })
                 print(f"🔧 혼합 전처리 에이전트 사용 - 도메인 용어: {preprocessed['preprocessing_metadata']['domain_terms_found']}개")
                 print(f"📋 절(Clause): {preprocessed['preprocessing_metadata']['clauses_count']}개")
                 
@@ -405,14 +452,13 @@ def convert_to_sql():
             "sql": sql_query,
             "timestamp": datetime.now().isoformat(),
             "rag_context_used": bool(rag_context),  # RAG 컨텍스트 사용 여부
+            "rag_top_k": rag_result["stats"]["chosen_k"],  # 적응형 컷오프로 정해진 k (0이면 RAG 생략)
+            "rag_context_stats": rag_result["stats"],  # 후처리로 절감한 토큰 수, 컷오프 임계값 등
             "preprocessing": preprocessing_info
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# RAG 서비스 초기화
-rag_service = get_rag_service()
-
 # 기존 문서들을 벡터 DB에 처리 (최초 1회만 실행)
 def initialize_rag_database():
     """기존 RAG 문서들을 벡터 데이터베이스에 처리"""
@@ -425,8 +471,62 @@ def initialize_rag_database():
         print(f"RAG 데이터베이스 초기화 실패: {e}")
         return []
 
-# 앱 시작 시 RAG DB 초기화 (수동으로 실행하려면 주석 처리)
-# initialize_rag_database()
+# spawn 방식 배치 전처리 워커는 이 스크립트를 __mp_main__으로 다시 실행하므로
+# 워커에서는 RAG 서비스와 백그라운드 작업(스냅샷 적재, 정합성 점검, 스키마 색인)을 만들지 않음
+BATCH_WORKER_PROCESS = __name__ == '__mp_main__'
+
+# 테이블/컬럼 설명 인덱스 사용 여부 (질문-컬럼 연결로 프롬프트 스키마 축소)
+SCHEMA_PRUNING = os.getenv('SCHEMA_PRUNING', 'false').lower() == 'true'
+
+if BATCH_WORKER_PROCESS:
+    rag_service = rag_reconciler = rag_index_rebuilder = schema_index = None
+else:
+    # RAG 서비스 초기화
+    rag_service = get_rag_service()
+    
+    # 앱 시작 시 RAG DB 초기화 (수동으로 실행하려면 주석 처리)
+    # initialize_rag_database()
+    
+    # 빈 노드는 스냅샷으로 부트스트랩 (RAG_SNAPSHOT_BOOTSTRAP 지정 시, 임베딩 재계산 없음)
+    rag_service.bootstrap_from_snapshot()
+    
+    # 파일 시스템 ↔ 벡터 DB 정합성 점검 (RAG_RECONCILE_ON_STARTUP/RAG_RECONCILE_INTERVAL 지정 시에만 자동 실행)
+    rag_reconciler = IndexReconciler(rag_service, UPLOAD_FOLDER)
+    rag_reconciler.start()
+    
+    # HNSW 파라미터 변경/인덱스 재구축 (관리자 API에서 백그라운드 실행)
+    rag_index_rebuilder = IndexRebuilder(rag_service)
+    
+    # 테이블/컬럼 설명 인덱스 (질문-컬럼 연결, 메타데이터 업로드/적용/삭제 시 재구축)
+    # 시작 시 구축은 백그라운드 (임베딩 제공자가 느리거나 장애여도 앱 import가 막히지 않음)
+    schema_index = SchemaIndex(rag_service.embeddings)
+    schema_index.rebuild_async(get_active_metadata())
+    
+    # 배치 전처리 워커 풀을 미리 띄워 첫 배치 요청의 워커 시작 지연 제거 (PREPROCESS_BATCH_WARM)
+    if os.getenv('PREPROCESS_BATCH_WARM', 'false').lower() == 'true' and \
+            KOREAN_PREPROCESSING_AVAILABLE and korean_preprocessing_agent:
+        threading.Thread(target=korean_preprocessing_agent.warm_batch_pool,
+                         name="preprocess-batch-warm", daemon=True).start()
+
+def build_schema_info(question, meta):
+    """프롬프트용 스키마 텍스트 (SCHEMA_PRUNING 시 질문과 연결된 컬럼만 설명과 함께 포함)"""
+    if SCHEMA_PRUNING:
+        pruned = schema_index.prune_metadata(question, meta)
+        if pruned is not meta:
+            schema_info = "데이터베이스 스키마 (질문 관련 컬럼):\n"
+            for tname, tinfo in pruned["tables"].items():
+                schema_info += f"- {tname} 테이블: "
+                schema_info += ", ".join([
+                    f"{col}({cinfo['type']}{', ' + cinfo['description'] if cinfo.get('description') else ''})"
+                    for col, cinfo in tinfo["columns"].items()
+                ]) + "\n"
+            return schema_info
+
+    schema_info = "데이터베이스 스키마:\n"
+    for tname, tinfo in meta["tables"].items():
+        schema_info += f"- {tname} 테이블: "
+        schema_info += ", ".join([f"{col}({cinfo['type']})" for col, cinfo in tinfo["columns"].items()]) + "\n"
+    return schema_info
 
 # convert_question_to_sql 함수 시그니처 및 내부 수정
 
@@ -468,35 +568,59 @@ def call_local_llm(prompt, system_prompt="당신은 자연어를 SQL로 변환
         print(f"로컬 LLM 호출 중 오류: {e}")
         return None
 
-def convert_question_to_sql(question, rag_context=None, meta=None):
-    """자연어 질문을 SQL로 변환하는 함수 (한국어 전처리 에이전트 + RAG context + 동적 메타데이터 활용)"""
+def build_sql_prompt(schema_info, question, rag_context=None, query_analysis=None):
+    """SQL 변환 프롬프트 생성 (스키마 + 참고 문서 + 전처리 질의 분석 + 질문)"""
+    prompt = f"{schema_info}\n"
+    if rag_context:
+        prompt += f"[참고 문서]\n{rag_context}\n"
+    if query_analysis:
+        prompt += f"[질의 분석]\n{query_analysis}\n"
+    prompt += (
+        f"다음 자연어 질문을 SQL 쿼리로 변환해주세요.\n"
+        f"질문: {question}\n\n"
+        "요구사항:\n"
+        "1. SQL만 출력하고 다른 설명은 하지 마세요\n"
+        "2. 적절한 JOIN을 사용하세요\n"
+        "3. WHERE 조건을 명확히 하세요\n"
+        "4. ORDER BY, GROUP BY, LIMIT 등을 적절히 사용하세요\n"
+        "5. 컬럼명은 정확히 사용하세요\n"
+    )
+    return prompt
+
+def convert_question_to_sql(question, rag_context=None, meta=None, preprocessed=None):
+    """자연어 질문을 SQL로 변환하는 함수 (한국어 전처리 에이전트 + RAG context + 동적 메타데이터 활용)
+    
+    preprocessed: 호출 측에서 이미 분석한 전처리 결과 객체 (모든 프로필에 포함된 엔티티/SQL 패턴만 사용)
+    """
     
     # 한국어 전처리 에이전트 사용 (가능한 경우)
-    enhanced_prompt = None
+    query_analysis = None
     preprocessing_info = {}
     
     if KOREAN_PREPROCESSING_AVAILABLE and korean_preprocessing_agent:
         try:
-            # 전처리 수행
-            preprocessed = korean_preprocessing_agent.preprocess_query(question)
-            
-            # 향상된 프롬프트 생성
-            enhanced_prompt = korean_preprocessing_agent.generate_enhanced_prompt(preprocessed)
+            # 전달된 결과가 없으면 직접 전처리 (SQL 변환에는 엔티티와 SQL 패턴만 필요하므로 lite 프로필)
+            # (직렬화 없이 결과 객체를 그대로 사용)
+            if preprocessed is None:
+                preprocessed = korean_preprocessing_agent.analyze_query(question, "lite")
             
             # 전처리 정보 저장
+            sql_keywords = [pattern.sql for pattern in preprocessed.sql_mappings]
             preprocessing_info = {
-                "clauses_count": len(preprocessed.clauses),
-                "sql_keywords": preprocessed.sql_keywords,
-                "entities_count": len(preprocessed.entities),
+                "sql_keywords": sql_keywords,
+                "entities_count": len(preprocessed.entities.domain_terms),
                 "normalized_query": preprocessed.normalized_query
             }
             
-            print(f"🇰🇷 한국어 전처리 에이전트 사용 - 추출된 절: {len(preprocessed.clauses)}개")
-            print(f"🔑 SQL 키워드: {preprocessed.sql_keywords}")
+            print(f"🇰🇷 한국어 전처리 에이전트 사용 - 도메인 용어: {preprocessing_info['entities_count']}개")
+            print(f"🔑 SQL 키워드: {sql_keywords}")
+            
+            # 추출한 엔티티(조건/범위/유형)를 프롬프트 힌트로 사용
+            query_analysis = korean_preprocessing_agent.build_prompt_context(preprocessed)
             
         except Exception as e:
             print(f"❌ 한국어 전처리 에이전트 오류: {e}")
-            enhanced_prompt = None
+            preprocessed = None
     
     # 로컬 LLM 사용 시
     if LLM_PROVIDER in ['ollama', 'enterprise'] and LLM_BASE_URL:
@@ -504,68 +628,30 @@ def convert_question_to_sql(question, rag_context=None, meta=None):
             # 메타데이터를 프롬프트용 텍스트로 변환
             if meta is None:
                 meta = CUSTOMER_METADATA
-            schema_info = "데이터베이스 스키마:\n"
-            for tname, tinfo in meta["tables"].items():
-                schema_info += f"- {tname} 테이블: "
-                schema_info += ", ".join([f"{col}({cinfo['type']})" for col, cinfo in tinfo["columns"].items()]) + "\n"
+            schema_info = build_schema_info(question, meta)
             
-            # 전처리된 프롬프트 사용 또는 기본 프롬프트 사용
-            if enhanced_prompt:
-                prompt = f"{schema_info}\n{enhanced_prompt}"
-            else:
-                prompt = f"{schema_info}\n"
-                if rag_context:
-                    prompt += f"[참고 문서]\n{rag_context}\n"
-                prompt += (
-                    f"다음 자연어 질문을 SQL 쿼리로 변환해주세요.\n"
-                    f"질문: {question}\n\n"
-                    "요구사항:\n"
-                    "1. SQL만 출력하고 다른 설명은 하지 마세요\n"
-                    "2. 적절한 JOIN을 사용하세요\n"
-                    "3. WHERE 조건을 명확히 하세요\n"
-                    "4. ORDER BY, GROUP BY, LIMIT 등을 적절히 사용하세요\n"
-                    "5. 컬럼명은 정확히 사용하세요\n"
-                )
+            prompt = build_sql_prompt(schema_info, question, rag_context, query_analysis)
             
             sql_query = call_local_llm(prompt)
             if sql_query and any(keyword in sql_query.upper() for keyword in ['SELECT', 'FROM', 'WHERE', 'JOIN']):
                 return sql_query
             else:
-                return convert_question_to_sql_rule_based(question)
+                return convert_question_to_sql_rule_based(question, preprocessed)
                 
         except Exception as e:
             print(f"로컬 LLM 변환 오류: {e}")
-            return convert_question_to_sql_rule_based(question)
+            return convert_question_to_sql_rule_based(question, preprocessed)
     
     # OpenAI API 사용 시
     if not os.getenv('OPENAI_API_KEY') or not openai_client:
-        return convert_question_to_sql_rule_based(question)
+        return convert_question_to_sql_rule_based(question, preprocessed)
     try:
         # 메타데이터를 프롬프트용 텍스트로 변환
         if meta is None:
             meta = CUSTOMER_METADATA
-        schema_info = "데이터베이스 스키마:\n"
-        for tname, tinfo in meta["tables"].items():
-            schema_info += f"- {tname} 테이블: "
-            schema_info += ", ".join([f"{col}({cinfo['type']})" for col, cinfo in tinfo["columns"].items()]) + "\n"
+        schema_info = build_schema_info(question, meta)
         
-        # 전처리된 프롬프트 사용 또는 기본 프롬프트 사용
-        if enhanced_prompt:
-            prompt = f"{schema_info}\n{enhanced_prompt}"
-        else:
-            prompt = f"{schema_info}\n"
-            if rag_context:
-                prompt += f"[참고 문서]\n{rag_context}\n"
-            prompt += (
-                f"다음 자연어 질문을 SQL 쿼리로 변환해주세요.\n"
-                f"질문: {question}\n\n"
-                "요구사항:\n"
-                "1. SQL만 출력하고 다른 설명은 하지 마세요\n"
-                "2. 적절한 JOIN을 사용하세요\n"
-                "3. WHERE 조건을 명확히 하세요\n"
-                "4. ORDER BY, GROUP BY, LIMIT 등을 적절히 사용하세요\n"
-                "5. 컬럼명은 정확히 사용하세요\n"
-            )
+        prompt = build_sql_prompt(schema_info, question, rag_context, query_analysis)
         
         response = openai_client.chat.completions.create(
             model=OPENAI_MODEL,
@@ -580,13 +666,112 @@ def convert_question_to_sql(question, rag_context=None, meta=None):
         if any(keyword in sql_query.upper() for keyword in ['SELECT', 'FROM', 'WHERE', 'JOIN']):
             return sql_query
         else:
-            return convert_question_to_sql_rule_based(question)
+            return convert_question_to_sql_rule_based(question, preprocessed)
     except Exception as e:
         print(f"OpenAI API 오류: {e}")
-        return convert_question_to_sql_rule_based(question)
+        return convert_question_to_sql_rule_based(question, preprocessed)
+
+# 엔티티 기반 규칙 SQL에서 쓰는 테이블 별칭 (customers 기준 customer_id로 JOIN)
+RULE_SQL_TABLE_ALIASES = {
+    "customers": "c",
+    "credit_scores": "cs",
+    "loan_history": "lh"
+}
 
-def convert_question_to_sql_rule_based(question):
-    """규칙 기반 SQL 변환 (폴백용)"""
+# 합계/평균/최대/최소를 적용할 딕셔너리 용어 데이터 타입
+RULE_SQL_NUMERIC_TYPES = ("INTEGER", "DECIMAL")
+
+def build_sql_from_entities(preprocessed):
+    """전처리 엔티티(범위/신용점수/대출금액/위험도)와 집계 키워드로 SQL 생성 (조건/집계가 없으면 None)
+    
+    조건 값은 엔티티 스캐너가 추출한 숫자와 딕셔너리 korean_mapping 값만 사용
+    """
+    entities = preprocessed.entities
+    if entities is None:
+        return None
+    tables = {"customers"}
+    columns = []
+    conditions = []
+    
+    def column_of(found):
+        """도메인 용어 -> 별칭 붙은 컬럼 (JOIN할 수 없는 테이블이면 None)"""
+        table = found.entry.info.get("table") if found else None
+        if table not in RULE_SQL_TABLE_ALIASES:
+            return None
+        tables.add(table)
+        column = f"{RULE_SQL_TABLE_ALIASES[table]}.{found.entry.info.get('sql_mapping', found.entry.term)}"
+        if column not in columns:
+            columns.append(column)
+        return column
+    
+    # 범위: 앞선 도메인 용어의 컬럼에 BETWEEN
+    for numeric_range in entities.numeric_ranges:
+        column = column_of(entities.domain_term_before(numeric_range.start))
+        if column:
+            conditions.append(f"{column} BETWEEN {numeric_range.min} AND {numeric_range.max}")
+    
+    # 신용점수/대출금액 비교 조건
+    for score in entities.credit_scores:
+        tables.add("credit_scores")
+        conditions.append(f"cs.credit_score {score.comparison or '='} {score.value}")
+    for amount in entities.loan_amounts:
+        tables.add("loan_history")
+        conditions.append(f"lh.loan_amount {amount.comparison or '='} {amount.value}")
+    
+    # 위험도/등급: 앞선 용어 중 한글 값 매핑이 있는 용어의 컬럼 ("매우높음"은 "높음"으로)
+    for risk in entities.risk_levels:
+        found = entities.domain_term_before(risk.start, lambda entry: entry.info.get("korean_mapping"))
+        column = column_of(found)
+        if column:
+            mapping = found.entry.info["korean_mapping"]
+            value = mapping.get(risk.level) or mapping.get(risk.level.removeprefix("매우"))
+            if value:
+                conditions.append(f"{column} = '{value}'")
+    
+    # 집계: 첫 집계 키워드, 대상은 가장 가까운 도메인 용어 ("대출금액 합계", "평균 신용점수", 숫자형 컬럼만)
+    aggregate = None
+    for pattern in preprocessed.sql_mappings or ():
+        if pattern.category != "aggregation":
+            continue
+        if pattern.sql == "COUNT":
+            aggregate = "COUNT(DISTINCT c.customer_id)"
+        else:
+            found = min(entities.domain_terms,
+                        key=lambda term: max(term.start - pattern.end, pattern.start - term.end), default=None)
+            if found is None or found.entry.info.get("data_type") not in RULE_SQL_NUMERIC_TYPES:
+                break
+            column = column_of(found)
+            if column:
+                aggregate = f"{pattern.sql}({column})"
+        break
+    
+    if not conditions and not aggregate:
+        return None
+    
+    if aggregate:
+        select = f"{aggregate} AS result"
+    else:
+        select = ", ".join(["c.customer_id", "c.name"] + [column for column in columns if not column.startswith("c.")])
+    sql = f"SELECT {select} FROM customers c"
+    for table, alias in RULE_SQL_TABLE_ALIASES.items():
+        if table != "customers" and table in tables:
+            sql += f" JOIN {table} {alias} ON c.customer_id = {alias}.customer_id"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql + ";"
+
+def convert_question_to_sql_rule_based(question, preprocessed=None):
+    """규칙 기반 SQL 변환 (폴백용, 전처리 엔티티로 만든 SQL을 우선 사용)"""
+    if preprocessed is None and KOREAN_PREPROCESSING_AVAILABLE and korean_preprocessing_agent:
+        try:
+            preprocessed = korean_preprocessing_agent.analyze_query(question, "lite")
+        except Exception as e:
+            print(f"❌ 한국어 전처리 에이전트 오류: {e}")
+    if preprocessed is not None:
+        sql = build_sql_from_entities(preprocessed)
+        if sql:
+            return sql
+    
     question_lower = question.lower()
 
     # 기본적인 패턴 매칭을 통한 SQL 생성
@@ -624,6 +809,14 @@ def convert_question_to_sql_rule_based(question):
         return "SELECT name, registration_date FROM customers ORDER BY registration_date DESC LIMIT 5;"
 
     else:
+        # 스키마 인덱스로 질문과 가장 관련된 테이블/컬럼 조회 (최종 폴백이므로 실패해도 기본 쿼리)
+        try:
+            tables = SchemaIndex.rank_tables(schema_index.link(question, top_n=5))
+        except Exception as e:
+            print(f"⚠️ 스키마 인덱스 조회 실패: {e}")
+            tables = []
+        if tables:
+            return f"SELECT {', '.join(tables[0]['columns'])} FROM {tables[0]['table']} LIMIT 10;"
         # 기본 쿼리
         return "SELECT * FROM customers LIMIT 10;"
 
@@ -782,13 +975,26 @@ def search_rag_documents():
     try:
         data = request.get_json()
         question = data.get('question', '')
-        domain = data.get('domain', None)
+        domain = data.get('domain', None)  # 단일 도메인 또는 도메인 목록
         top_k = data.get('top_k', 5)
+        per_domain_quota = data.get('per_domain_quota', None)
+        adaptive = data.get('adaptive', False)  # 유사도 컷오프로 k를 자동 결정
         
         if not question:
             return jsonify({"error": "검색 질문이 필요합니다."}), 400
         
-        chunks = rag_service.retrieve_relevant_chunks(question, domain, top_k)
+        if adaptive:
+            result = rag_service.retrieve_adaptive(question, domain, top_k, per_domain_quota)
+            return jsonify({
+                'question': question,
+                'domain': domain,
+                'chunks': result['chunks'],
+                'total_found': result['chosen_k'],
+                'chosen_k': result['chosen_k'],
+                'cutoff': result['cutoff']
+            })
+        
+        chunks = rag_service.retrieve_relevant_chunks(question, domain, top_k, per_domain_quota)
         
         return jsonify({
             'question': question,
@@ -822,13 +1028,143 @@ def initialize_rag_manually():
             "error": str(e)
         }), 500
 
+@app.route('/api/rag/reconcile', methods=['POST'])
+def reconcile_rag_database():
+    """파일 시스템과 벡터 DB의 불일치를 점검/복구하고 DB를 압축합니다."""
+    try:
+        data = request.get_json(silent=True) or {}
+        report = rag_reconciler.reconcile(
+            dry_run=bool(data.get('dry_run', False)),
+            compact=None if data.get('compact') is None else bool(data['compact']),
+            delete_orphans=data.get('delete_orphans')
+        )
+        return jsonify(report), (200 if report['success'] else 409)
+    except Exception as e:
+        return jsonify({"error": f"정합성 점검 중 오류가 발생했습니다: {str(e)}"}), 500
+
+@app.route('/api/rag/reconcile/status', methods=['GET'])
+def get_reconcile_status():
+    """정합성 점검 스케줄 상태와 마지막 점검 결과를 반환합니다."""
+    return jsonify(rag_reconciler.get_status())
+
+@app.route('/api/rag/summarize', methods=['POST'])
+def summarize_rag_chunks():
+    """색인된 청크의 요약/핵심 사실을 로컬 LLM으로 사전 계산합니다. (백필)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        domain = data.get('domain')
+        if domain and domain not in RAG_DOMAINS:
+            return jsonify({"error": "유효하지 않은 도메인입니다."}), 400
+        
+        result = rag_service.summarize_existing_chunks(domain, overwrite=bool(data.get('overwrite', False)))
+        return jsonify(result), (200 if result['success'] else 400)
+    except Exception as e:
+        return jsonify({"error": f"청크 요약 중 오류가 발생했습니다: {str(e)}"}), 500
+
+@app.route('/api/rag/snapshot/export', methods=['POST'])
+def export_rag_snapshot():
+    """벡터 인덱스를 스냅샷 파일(Parquet + 매니페스트)로 내보냅니다."""
+    try:
+        data = request.get_json(silent=True) or {}
+        path = None
+        if data.get('name'):
+            name = secure_filename(data['name'])
+            if not name.endswith('.parquet'):
+                name += '.parquet'
+            os.makedirs(rag_service.snapshot_dir, exist_ok=True)
+            path = os.path.join(rag_service.snapshot_dir, name)
+        
+        result = rag_service.export_snapshot(path)
+        return jsonify(result), (200 if result['success'] else 500)
+    except Exception as e:
+        return jsonify({"error": f"스냅샷 내보내기 중 오류가 발생했습니다: {str(e)}"}), 500
+
+@app.route('/api/rag/snapshot/import', methods=['POST'])
+def import_rag_snapshot():
+    """스냅샷 파일을 벡터 인덱스로 적재합니다. (기존 인덱스 교체)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        name = secure_filename(data.get('name', ''))
+        if not name:
+            return jsonify({"error": "스냅샷 파일명이 필요합니다."}), 400
+        
+        path = os.path.join(rag_service.snapshot_dir, name)
+        if not os.path.exists(path):
+            return jsonify({"error": "스냅샷 파일을 찾을 수 없습니다."}), 404
+        
+        result = rag_service.import_snapshot(path, force=bool(data.get('force', False)))
+        return jsonify(result), (200 if result['success'] else 400)
+    except Exception as e:
+        return jsonify({"error": f"스냅샷 적재 중 오류가 발생했습니다: {str(e)}"}), 500
+
+@app.route('/api/rag/snapshot/list', methods=['GET'])
+def list_rag_snapshots():
+    """저장된 스냅샷 매니페스트 목록을 반환합니다."""
+    snapshots = []
+    for manifest_path in sorted(glob.glob(os.path.join(rag_service.snapshot_dir, '*.manifest.json'))):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                snapshots.append(json.load(f))
+        except Exception:
+            continue
+    return jsonify({"snapshots": snapshots})
+
+@app.route('/api/rag/index', methods=['GET'])
+def get_rag_index_config():
+    """컬렉션별 HNSW 설정과 마지막 재구축 결과를 반환합니다."""
+    try:
+        return jsonify({
+            "collections": rag_service.get_index_config(),
+            "rebuild": rag_index_rebuilder.get_status()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/rag/index/search-ef', methods=['POST'])
+def set_rag_search_ef():
+    """컬렉션 search_ef를 재구축 없이 변경하고 전후 검색 품질/지연을 반환합니다."""
+    try:
+        data = request.get_json() or {}
+        collection = rag_service.resolve_collection_name(data.get('collection', 'rag_documents'))
+        if collection is None or 'search_ef' not in data:
+            return jsonify({"error": "유효한 collection과 search_ef가 필요합니다."}), 400
+        top_k = int(data.get('top_k', 5))
+        before = rag_index_rebuilder.evaluate(collection, top_k)
+        result = rag_service.set_search_ef(collection, int(data['search_ef']))
+        if not result["success"]:
+            return jsonify(result), 400
+        result.update({"before": before, "after": rag_index_rebuilder.evaluate(collection, top_k)})
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/rag/index/rebuild', methods=['POST'])
+def rebuild_rag_index():
+    """HNSW 파라미터(M, construction_ef, search_ef)로 컬렉션을 백그라운드 재구축합니다."""
+    try:
+        data = request.get_json() or {}
+        collection = rag_service.resolve_collection_name(data.get('collection', 'rag_documents'))
+        if collection is None:
+            return jsonify({"error": "유효하지 않은 컬렉션입니다."}), 400
+        result = rag_index_rebuilder.start(
+            collection,
+            hnsw=data.get('hnsw', {}),
+            evaluate=bool(data.get('evaluate', True)),
+            top_k=int(data.get('top_k', 5))
+        )
+        return jsonify(result), 202 if result["success"] else 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/preprocessing/status', methods=['GET'])
 def get_preprocessing_status():
     """전처리 에이전트 상태 확인 API"""
     return jsonify({
         "korean_preprocessing_available": KOREAN_PREPROCESSING_AVAILABLE,
         "agent_loaded": korean_preprocessing_agent is not None,
-        "domain_context": korean_preprocessing_agent.domain_context if korean_preprocessing_agent else None
+        "domain_context": getattr(korean_preprocessing_agent, "domain_context", None),
+        "cache": korean_preprocessing_agent.get_cache_stats()
+        if hasattr(korean_preprocessing_agent, "get_cache_stats") else None
     })
 
 @app.route('/api/preprocessing/test', methods=['POST'])
@@ -837,6 +1173,8 @@ def test_preprocessing():
     try:
         data = request.get_json()
         test_query = data.get('query', '')
+        # 테스트 API는 디버깅용 전체 출력이 기본
+        profile = data.get('profile', 'full')
         
         if not test_query:
             return jsonify({"error": "테스트 쿼리가 제공되지 않았습니다."}), 400
@@ -846,22 +1184,12 @@ def test_preprocessing():
         # 혼합 전처리 에이전트 테스트 (우선)
         if KOREAN_PREPROCESSING_AVAILABLE and korean_preprocessing_agent:
             try:
-                preprocessed = korean_preprocessing_agent.preprocess_query(test_query)
-                result["hybrid_preprocessing"] = {
-                    "available": True,
-                    "original_query": preprocessed["original_query"],
-                    "normalized_query": preprocessed["normalized_query"],
-                    "mapped_query": preprocessed["mapped_query"],
-                    "entities": preprocessed["entities"],
-                    "clauses": preprocessed["clauses"],
-                    "reasoning_chain": preprocessed["reasoning_chain"],
-                    "sql_mappings": preprocessed["sql_mappings"],
-                    "preprocessing_metadata": preprocessed["preprocessing_metadata"],
-                    "domain_terms_found": preprocessed["preprocessing_metadata"]["domain_terms_found"],
-                    "clauses_count": preprocessed["preprocessing_metadata"]["clauses_count"],
-                    "reasoning_steps": preprocessed["preprocessing_metadata"]["reasoning_steps"],
-                    "sql_patterns_mapped": preprocessed["preprocessing_metadata"]["sql_patterns_mapped"]
-                }
+                preprocessed = korean_preprocessing_agent.preprocess_query(test_query, profile)
+                if "error" in preprocessed:
+                    raise ValueError(preprocessed["error"])
+                preprocessed.update(preprocessed["preprocessing_metadata"])
+                preprocessed.update({"available": True, "profile": profile})
+                result["hybrid_preprocessing"] = preprocessed
             except Exception as e:
                 result["hybrid_preprocessing"] = {
                     "available": True,
@@ -909,6 +1237,45 @@ def test_preprocessing():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/preprocessing/batch', methods=['POST'])
+def batch_preprocessing():
+    """대량 질의 전처리 API (프로세스 풀, NDJSON 스트리밍)
+    
+    요청: {"queries": [...], "workers": N, "profile": "lite", "chunk_size": 64}
+    응답: 질의마다 {"type": "result", "index", "result"} 한 줄, 마지막에 처리량 {"type": "summary", ...} 한 줄
+    """
+    if not (KOREAN_PREPROCESSING_AVAILABLE and korean_preprocessing_agent):
+        return jsonify({"error": "혼합 전처리 에이전트를 사용할 수 없습니다."}), 503
+    
+    data = request.get_json() or {}
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+        return jsonify({"error": "queries는 문자열 목록이어야 합니다."}), 400
+    
+    profile = data.get('profile', 'lite')
+    try:
+        korean_preprocessing_agent.resolve_stages(profile)
+        workers = int(data['workers']) if data.get('workers') else None
+        chunk_size = int(data['chunk_size']) if data.get('chunk_size') else None
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    def generate():
+        stats = {}
+        try:
+            results = korean_preprocessing_agent.preprocess_batch(
+                queries, workers=workers, profile=profile, chunk_size=chunk_size, stats=stats
+            )
+            for index, result in enumerate(results):
+                yield json.dumps({"type": "result", "index": index, "result": result}, ensure_ascii=False) + "\n"
+            print(f"📦 배치 전처리 완료 - {stats['queries']}건, {stats['queries_per_sec']}건/초 "
+                  f"(코어당 {stats['queries_per_sec_per_core']}건/초)")
+            yield json.dumps({"type": "summary", **stats}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "error": str(e)}, ensure_ascii=False) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
 # 딕셔너리 관리 API 엔드포인트들
 @app.route('/api/dictionary/status', methods=['GET'])
 def get_dictionary_status():
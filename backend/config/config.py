@@ -9,6 +9,13 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def _has_documents(folder: str, extensions: set) -> bool:
+    """폴더(하위 폴더 포함)에 색인 대상 확장자 문서가 있는지"""
+    for _, _, files in os.walk(folder):
+        if any(os.path.splitext(name)[1].lstrip('.').lower() in extensions for name in files):
+            return True
+    return False
+
 class Config:
     """애플리케이션 설정 클래스"""
     
@@ -27,8 +34,14 @@ class Config:
     OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
     
     # RAG 설정
-    UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'rag_files')
     ALLOWED_EXTENSIONS = {'txt', 'pdf', 'docx', 'doc', 'csv', 'json', 'md'}
+    # 업로드/초기 색인/정합성 점검이 모두 사용하는 RAG 문서 폴더 (RAG_FOLDER로 변경 가능)
+    # 기본값은 <프로젝트>/data/rag_files, 이전 업로드 폴더(backend/data/rag_files)에 문서가 남아 있으면 그 폴더를 계속 사용
+    DEFAULT_UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'rag_files')
+    LEGACY_UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'rag_files')
+    UPLOAD_FOLDER = os.getenv('RAG_FOLDER') or (
+        LEGACY_UPLOAD_FOLDER if _has_documents(LEGACY_UPLOAD_FOLDER, ALLOWED_EXTENSIONS) else DEFAULT_UPLOAD_FOLDER
+    )
     
     # RAG 도메인 설정
     RAG_DOMAINS = {
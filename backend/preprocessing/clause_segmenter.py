@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+한국어 절(Clause) 분리기
+어절 단위로 한 번만 훑는 상태 기계로 연결어/문장부호 위치에서 절을 나눔
+(문자 클래스 정규식처럼 되돌아가며 재탐색하지 않으므로 입력 길이에 선형)
+"""
+
+import re
+from typing import List, NamedTuple, Optional
+
+# 단독 어절로 쓰이는 연결어 (절 사이에 위치, 어느 절에도 포함하지 않음)
+STANDALONE_CONNECTIVES = ("그리고", "또는", "하지만", "그런데", "또한")
+
+# 어절 끝에 붙는 연결 어미 (앞 절에 포함, 긴 것부터 검사)
+SUFFIX_CONNECTIVES = ("이거나", "이고", "하며", "면서")
+
+# 문장 종결 부호 (앞 절에 포함)
+SENTENCE_TERMINATORS = ".!?;"
+
+# 어절 또는 문장부호 하나 (반복 없는 단순 문자 클래스라 토큰화 자체도 선형)
+_TOKEN = re.compile(r'[^\s.!?;]+|[.!?;]')
+
+class ClauseSpan(NamedTuple):
+    """원문 기준 절 위치 [start, end) 와 다음 절로 이어지는 연결어"""
+    start: int
+    end: int
+    connector: Optional[str] = None
+
+    def text(self, source: str) -> str:
+        return source[self.start:self.end]
+
+def segment_clauses(text: str) -> List[ClauseSpan]:
+    """연결어/문장부호 기준 절 분리 -> 원문 오프셋 목록 (빈 절 제외)"""
+    spans = []
+    start = None  # 현재 절의 첫 어절 시작 위치
+    end = None    # 현재 절의 마지막 어절 끝 위치
+
+    def close(connector: Optional[str] = None):
+        nonlocal start, end
+        if start is not None:
+            spans.append(ClauseSpan(start, end, connector))
+        elif connector and spans and spans[-1].connector is None:
+            # 연결어가 연속/문장 첫머리에 오면 직전 절에 연결어만 기록
+            spans[-1] = spans[-1]._replace(connector=connector)
+        start = end = None
+
+    for match in _TOKEN.finditer(text):
+        token = match.group()
+        if token in STANDALONE_CONNECTIVES:
+            close(token)
+            continue
+
+        if token in SENTENCE_TERMINATORS:
+            # 절 없이 단독으로 나온 문장부호는 무시
+            if start is not None:
+                end = match.end()
+                close()
+            continue
+
+        if start is None:
+            start = match.start()
+        end = match.end()
+        for suffix in SUFFIX_CONNECTIVES:
+            if len(token) > len(suffix) and token.endswith(suffix):
+                close(suffix)
+                break
+    close()
+    return spans
@@ -5,330 +5,515 @@
 신용평가 도메인 특화 자연어 전처리
 """
 
-import re
-import jieba
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
 import sys
 import os
+import time
+import threading
+import multiprocessing
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from services.dynamic_dictionary_manager import dictionary_manager
+from preprocessing.term_automaton import TermAutomaton
+from preprocessing import rule_patterns
+from preprocessing.clause_segmenter import segment_clauses
+from preprocessing.korean_tokenizer import create_tokenizer
+from preprocessing.preprocessing_result import (
+    TermEntry, DomainTerm, NumericValue, NumericRange, DateValue, CreditScore, LoanAmount, RiskLevel,
+    CustomerType, SqlPatternMatch, Entities, Clause, PreprocessingResult, serialize_result
+)
+
+# 전처리 단계 (정규화는 항상 수행, 출력 순서 기준)
+# - clause_details: 절별 토큰(words)/도메인 용어 상세 (디버깅용)
+PIPELINE_STAGES = ("mapping", "entities", "clauses", "clause_details", "reasoning", "sql_mappings")
+
+# 단계별 선행 단계
+STAGE_DEPENDENCIES = {
+    "clause_details": ("clauses",),
+    "reasoning": ("entities", "clauses")
+}
+
+# 프로필 -> 실행할 단계
+# - full: 전처리 테스트/뷰어용 전체 출력
+# - prompt: 프롬프트/응답 요약용 (추론 체인, 절 상세 제외)
+# - lite: SQL 변환 핫패스용 (엔티티 + SQL 패턴만)
+PREPROCESS_PROFILES = {
+    "full": PIPELINE_STAGES,
+    "prompt": ("mapping", "entities", "clauses", "sql_mappings"),
+    "lite": ("entities", "sql_mappings")
+}
+
+# 엔티티 통합 스캐너로 채우는 엔티티 필드
+ENTITY_FIELDS = ("numeric_values", "numeric_ranges", "date_values", "customer_types",
+                 "risk_levels", "credit_scores", "loan_amounts")
 
 class HybridPreprocessingAgent:
     """규칙 기반 + 딕셔너리 혼합 전처리 에이전트"""
     
     def __init__(self):
         self.dict_manager = dictionary_manager
+        # (딕셔너리 버전, 오토마톤, 표면형 -> 용어 항목, 표면형 -> SQL 패턴, (분류, 용어) -> 용어 항목)
+        self._term_index = None
+        # 절 토크나이저는 시작 시 한 번만 생성 (PREPROCESS_TOKENIZER)
+        self.tokenizer = create_tokenizer(dictionary=self.dict_manager)
+        # 전처리 결과 LRU 캐시 ((정규화 질의, 딕셔너리 버전, 단계) -> 불변 결과 객체)
+        self.result_cache_size = int(os.getenv('PREPROCESS_CACHE_SIZE', '1024'))
+        self._result_cache = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+        self.result_cache_stats = {"hits": 0, "misses": 0}
+        # 프로필 미지정 시 기본 프로필 (PREPROCESS_PROFILE)
+        self.default_profile = os.getenv('PREPROCESS_PROFILE', 'full')
+        # 배치 전처리 프로세스 풀 (처음 사용할 때 만들어 계속 재사용)
+        # 멀티스레드인 Flask 프로세스를 fork하면 다른 스레드가 잡고 있던 잠금이 복제되므로 기본은 spawn
+        self.batch_workers = int(os.getenv('PREPROCESS_BATCH_WORKERS', '0')) or os.cpu_count() or 1
+        self.batch_start_method = os.getenv('PREPROCESS_BATCH_START_METHOD') or 'spawn'
+        self._batch_pool = None
+        self._batch_pool_lock = threading.Lock()
         self._init_processing_rules()
         self._init_sql_patterns()
         self._init_entity_extractors()
     
     def _init_processing_rules(self):
-        """전처리 규칙 초기화"""
+        """전처리 규칙 초기화 (rule_patterns에서 한 번 컴파일된 정규식 사용)"""
+        # 엔티티 규칙은 ENTITY_SCANNER, 조건/연결 표현은 절 분리기(clause_segmenter)가 처리
         self.processing_rules = {
             # 문장 정규화 규칙
-            "normalization": {
-                "whitespace": r'\s+',
-                "punctuation": r'[^\w\s가-힣]',
-                "numbers": r'(\d+)',
-                "currency": r'(\d+)(원|달러|엔|위안)',
-                "percentage": r'(\d+)%',
-                "date_patterns": [
-                    r'(\d{4})년(\d{1,2})월(\d{1,2})일',
-                    r'(\d{4})-(\d{1,2})-(\d{1,2})',
-                    r'(\d{1,2})월(\d{1,2})일'
-                ]
-            },
-            
-            # 도메인 특화 패턴
-            "domain_patterns": {
-                "credit_score_range": r'신용점수\s*(\d+)\s*이상',
-                "risk_level": r'위험도\s*(낮음|보통|높음)',
-                "loan_amount": r'대출금액\s*(\d+)원',
-                "overdue_days": r'연체일수\s*(\d+)일',
-                "customer_type": r'(개인|기업|소상공인)고객',
-                "vip_customer": r'VIP\s*고객',
-                "managed_customer": r'관리\s*고객'
-            },
-            
-            # 조건부 표현 패턴
-            "conditional_patterns": {
-                "if_then": r'만약\s*(.+?)\s*이면\s*(.+?)\s*이다',
-                "when": r'(.+?)\s*일\s*때\s*(.+?)',
-                "and_condition": r'(.+?)\s*그리고\s*(.+?)',
-                "or_condition": r'(.+?)\s*또는\s*(.+?)',
-                "not_condition": r'(.+?)\s*아닌\s*(.+?)'
-            }
+            "normalization": rule_patterns.NORMALIZATION
         }
     
     def _init_sql_patterns(self):
         """SQL 패턴 매핑 - 동적 딕셔너리에서 로드"""
         self.sql_patterns = self.dict_manager.sql_patterns
     
+    def _get_term_index(self) -> Tuple:
+        """용어/동의어/SQL 패턴 키워드 오토마톤 (딕셔너리 버전이 바뀌면 재구축)"""
+        term_index = self._term_index
+        if term_index is not None and term_index[0] == self.dict_manager.version:
+            return term_index
+        
+        version = self.dict_manager.version
+        term_surfaces = {}
+        term_entries = {}
+        for category, terms in self.dict_manager.credit_terms.items():
+            for term, info in terms.items():
+                entry = TermEntry(category, term, info, len(term_entries))
+                term_entries[(category, term)] = entry
+                for surface in [term] + list(info.get("synonyms", [])):
+                    entries = term_surfaces.setdefault(surface, [])
+                    if not any(existing is entry for existing in entries):
+                        entries.append(entry)
+        # 표면형이 용어 자체인 항목을 치환 대상으로 우선
+        for surface, entries in term_surfaces.items():
+            entries.sort(key=lambda entry: (entry.term != surface, entry.order))
+        
+        # 재로드/가져오기로 딕셔너리 객체가 교체되어도 최신 SQL 패턴을 사용
+        self.sql_patterns = self.dict_manager.sql_patterns
+        sql_surfaces = {}
+        for pattern_type, patterns in self.sql_patterns.items():
+            for korean, sql in patterns.items():
+                # 매칭 결과가 부분 문자열 대신 딕셔너리의 키 문자열을 참조하도록 함께 보관
+                sql_surfaces.setdefault(korean, []).append((pattern_type, sql, korean))
+        
+        automaton = TermAutomaton(list(term_surfaces) + list(sql_surfaces))
+        term_index = (version, automaton, term_surfaces, sql_surfaces, term_entries)
+        self._term_index = term_index
+        return term_index
+    
+    def _scan_terms(self, text: str) -> Tuple[List, List]:
+        """한 번의 스캔으로 (용어 매칭, SQL 패턴 매칭) 반환 (각각 겹치지 않는 최장 일치)"""
+        _, automaton, term_surfaces, sql_surfaces, _ = self._get_term_index()
+        matches = automaton.find_all(text)
+        term_matches = TermAutomaton.select_longest([match for match in matches if match[2] in term_surfaces])
+        sql_matches = TermAutomaton.select_longest([match for match in matches if match[2] in sql_surfaces])
+        return term_matches, sql_matches
+    
     def _init_entity_extractors(self):
-        """엔티티 추출기 초기화"""
+        """엔티티 추출기 초기화 (엔티티 통합 스캐너의 대안 이름 -> 매칭 처리기)"""
         self.entity_extractors = {
             "credit_score": self._extract_credit_score,
             "risk_level": self._extract_risk_level,
             "loan_amount": self._extract_loan_amount,
             "customer_type": self._extract_customer_type,
             "date_range": self._extract_date_range,
-            "numeric_range": self._extract_numeric_range
+            "numeric_range": self._extract_numeric_range,
+            "numeric_value": self._extract_numeric_value
         }
     
-    def preprocess_query(self, query: str) -> Dict:
-        """메인 전처리 함수"""
+    def preprocess_query(self, query: str, profile: Optional[str] = None,
+                         stages: Optional[List[str]] = None) -> Dict:
+        """메인 전처리 함수 -> 프론트엔드 JSON 구조 (매 호출 새 dict, 실행하지 않은 단계는 빈 값)
+        
+        profile: full/prompt/lite (미지정 시 기본 프로필), stages: 실행할 단계 직접 지정 (profile보다 우선)
+        """
         try:
-            # 1단계: 기본 정규화
-            normalized_query = self._normalize_text(query)
-            
-            # 2단계: 도메인 특화 딕셔너리 매핑
-            mapped_query = self._apply_domain_mapping(normalized_query)
-            
-            # 3단계: 엔티티 추출
-            entities = self._extract_entities(normalized_query)
-            
-            # 4단계: 절(Clause) 추출
-            clauses = self._extract_clauses(normalized_query)
-            
-            # 5단계: Chain of Thought 추론
-            reasoning_chain = self._generate_reasoning_chain(normalized_query, entities, clauses)
-            
-            # 6단계: SQL 패턴 매핑
-            sql_mappings = self._map_sql_patterns(normalized_query)
-            
-            return {
-                "original_query": query,
-                "normalized_query": normalized_query,
-                "mapped_query": mapped_query,
-                "entities": entities,
-                "clauses": clauses,
-                "reasoning_chain": reasoning_chain,
-                "sql_mappings": sql_mappings,
-                "preprocessing_metadata": {
-                    "domain_terms_found": len(entities.get("domain_terms", [])),
-                    "clauses_count": len(clauses),
-                    "reasoning_steps": len(reasoning_chain),
-                    "sql_patterns_mapped": len(sql_mappings)
-                }
-            }
-            
+            return serialize_result(self.analyze_query(query, profile, stages))
         except Exception as e:
             return {
                 "error": f"전처리 중 오류 발생: {str(e)}",
                 "original_query": query
             }
     
+    def analyze_query(self, query: str, profile: Optional[str] = None,
+                      stages: Optional[List[str]] = None) -> PreprocessingResult:
+        """전처리 -> 불변 결과 객체 (정규화 질의 + 딕셔너리 버전 + 단계 기준 결과 캐시)
+        
+        요청한 단계와 선행 단계만 실행하며, 캐시된 결과 객체는 복사 없이 공유
+        """
+        stages = self.resolve_stages(profile, stages, self.default_profile)
+        # 1단계: 기본 정규화
+        normalized_query = self._normalize_text(query)
+        
+        cache_key = (normalized_query, self.dict_manager.version, stages)
+        cached = self._get_cached_result(cache_key)
+        if cached is not None:
+            return cached if cached.original_query == query else replace(cached, original_query=query)
+        
+        result = self._run_pipeline(query, normalized_query, stages)
+        self._store_result(cache_key, result)
+        return result
+    
+    def preprocess_batch(self, queries: Iterable[str], workers: Optional[int] = None,
+                         profile: Optional[str] = None, chunk_size: Optional[int] = None,
+                         stats: Optional[Dict] = None) -> Iterator[Dict]:
+        """대량 질의 전처리 (프로세스 풀, 입력 순서대로 결과를 하나씩 반환)
+        
+        질의를 chunk_size 단위로 묶어 상시 유지되는 워커 프로세스 풀에 나눠 보내며, 워커는 시작 시
+        한 번만 자체 에이전트/딕셔너리를 준비함. workers는 풀 크기(batch_workers) 이하로 제한되며
+        1 이하이면 현재 프로세스에서 순차 처리. stats에 dict를 넘기면 처리가 끝난 뒤 처리량 통계를 채움
+        """
+        workers = min(workers or self.batch_workers, self.batch_workers)
+        chunk_size = max(1, chunk_size or int(os.getenv('PREPROCESS_BATCH_CHUNK_SIZE', '64')))
+        stages = self.resolve_stages(profile, None, self.default_profile)
+        
+        started = time.perf_counter()
+        counters = {"queries": 0, "chunks": 0, "cpu_seconds": 0.0, "worker_pids": set()}
+        
+        def collect(chunk_result):
+            results, cpu_seconds, pid = chunk_result
+            counters["queries"] += len(results)
+            counters["chunks"] += 1
+            counters["cpu_seconds"] += cpu_seconds
+            counters["worker_pids"].add(pid)
+            return results
+        
+        try:
+            if workers <= 1:
+                for chunk in _chunked(queries, chunk_size):
+                    yield from collect(_preprocess_chunk_with(self, chunk, stages))
+                return
+            
+            executor = self.warm_batch_pool()
+            # 메모리 사용량을 제한하기 위해 워커당 2개 청크까지만 미리 보냄
+            pending = deque()
+            try:
+                for chunk in _chunked(queries, chunk_size):
+                    pending.append(executor.submit(_preprocess_chunk, chunk, stages))
+                    if len(pending) >= workers * 2:
+                        yield from collect(pending.popleft().result())
+                while pending:
+                    yield from collect(pending.popleft().result())
+            except BrokenProcessPool:
+                # 워커가 비정상 종료된 풀은 버리고 다음 배치에서 새로 생성
+                self.shutdown_batch_pool(executor)
+                raise
+            finally:
+                for future in pending:
+                    future.cancel()
+        finally:
+            if stats is not None:
+                elapsed = time.perf_counter() - started
+                used_workers = max(len(counters["worker_pids"]), 1)
+                stats.update({
+                    "queries": counters["queries"],
+                    "chunks": counters["chunks"],
+                    "workers": used_workers,
+                    "chunk_size": chunk_size,
+                    "stages": list(stages),
+                    "elapsed_sec": round(elapsed, 3),
+                    "queries_per_sec": round(counters["queries"] / elapsed, 1) if elapsed else 0.0,
+                    # 워커 CPU 시간 기준 코어당 처리량
+                    "queries_per_sec_per_core": round(counters["queries"] / counters["cpu_seconds"], 1)
+                    if counters["cpu_seconds"] else 0.0
+                })
+    
+    def warm_batch_pool(self) -> ProcessPoolExecutor:
+        """배치 전처리 프로세스 풀 반환 (없으면 생성 후 워커를 모두 미리 띄움)"""
+        with self._batch_pool_lock:
+            if self._batch_pool is None:
+                context = multiprocessing.get_context(self.batch_start_method)
+                pool = ProcessPoolExecutor(max_workers=self.batch_workers, mp_context=context,
+                                           initializer=_init_batch_worker)
+                # spawn 워커는 작업이 들어올 때 하나씩 뜨므로 워커 수만큼 빈 작업을 보내 모두 띄워 둠
+                started = time.perf_counter()
+                for future in [pool.submit(os.getpid) for _ in range(self.batch_workers)]:
+                    future.result()
+                print(f"⚙️ 배치 전처리 워커 {self.batch_workers}개 준비 완료 "
+                      f"({self.batch_start_method}, {time.perf_counter() - started:.1f}초)")
+                self._batch_pool = pool
+            return self._batch_pool
+    
+    def shutdown_batch_pool(self, pool: Optional[ProcessPoolExecutor] = None):
+        """배치 전처리 프로세스 풀 종료 (pool 지정 시 현재 풀이 그 풀일 때만)"""
+        with self._batch_pool_lock:
+            if self._batch_pool is None or (pool is not None and pool is not self._batch_pool):
+                return
+            pool, self._batch_pool = self._batch_pool, None
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _get_cached_result(self, cache_key: Tuple) -> Optional[PreprocessingResult]:
+        """캐시된 결과 반환 (결과 객체는 불변이므로 공유해도 캐시에 영향 없음)"""
+        if not self.result_cache_size:
+            return None
+        with self._result_cache_lock:
+            result = self._result_cache.get(cache_key)
+            if result is None:
+                self.result_cache_stats["misses"] += 1
+                return None
+            self._result_cache.move_to_end(cache_key)
+            self.result_cache_stats["hits"] += 1
+        return result
+    
+    def _store_result(self, cache_key: Tuple, result: PreprocessingResult):
+        if not self.result_cache_size:
+            return
+        with self._result_cache_lock:
+            self._result_cache[cache_key] = result
+            self._result_cache.move_to_end(cache_key)
+            while len(self._result_cache) > self.result_cache_size:
+                self._result_cache.popitem(last=False)
+    
+    def clear_cache(self):
+        """전처리 결과 캐시 비우기"""
+        with self._result_cache_lock:
+            self._result_cache.clear()
+    
+    def get_cache_stats(self) -> Dict:
+        """결과 캐시/토크나이저 캐시 통계"""
+        with self._result_cache_lock:
+            hits = self.result_cache_stats["hits"]
+            misses = self.result_cache_stats["misses"]
+            entries = len(self._result_cache)
+        total = hits + misses
+        return {
+            "entries": entries,
+            "cache_size": self.result_cache_size,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "dictionary_version": self.dict_manager.version,
+            "tokenizer": self.tokenizer.get_stats()
+        }
+    
+    @staticmethod
+    def resolve_stages(profile: Optional[str] = None, stages: Optional[List[str]] = None,
+                       default_profile: str = "full") -> Tuple[str, ...]:
+        """프로필/단계 목록 -> 선행 단계를 포함한 실행 단계 튜플 (PIPELINE_STAGES 순서)"""
+        if stages is None:
+            profile = profile or default_profile
+            if profile not in PREPROCESS_PROFILES:
+                raise ValueError(f"알 수 없는 전처리 프로필: {profile}")
+            stages = PREPROCESS_PROFILES[profile]
+        
+        requested = set()
+        for stage in stages:
+            if stage not in PIPELINE_STAGES:
+                raise ValueError(f"알 수 없는 전처리 단계: {stage}")
+            requested.add(stage)
+            requested.update(STAGE_DEPENDENCIES.get(stage, ()))
+        return tuple(stage for stage in PIPELINE_STAGES if stage in requested)
+    
+    def _run_pipeline(self, query: str, normalized_query: str,
+                      stages: Tuple[str, ...] = PIPELINE_STAGES) -> PreprocessingResult:
+        """2~6단계 중 요청된 단계만 실행"""
+        results = {}
+        
+        # 용어/SQL 패턴 매칭은 한 번만 스캔하여 이후 단계에서 공유
+        term_matches, sql_matches = self._scan_terms(normalized_query)
+        sql_pattern_matches = self._sql_pattern_matches(sql_matches)
+        
+        # 2단계: 도메인 특화 딕셔너리 매핑
+        if "mapping" in stages:
+            results["mapped_query"] = self._apply_domain_mapping(normalized_query, term_matches)
+        
+        # 3단계: 엔티티 추출
+        if "entities" in stages:
+            results["entities"] = self._extract_entities(normalized_query, term_matches)
+        
+        # 4단계: 절(Clause) 추출
+        if "clauses" in stages:
+            results["clauses"] = self._extract_clauses(
+                normalized_query, "clause_details" in stages, sql_pattern_matches)
+        
+        # 5단계: Chain of Thought 추론
+        if "reasoning" in stages:
+            results["reasoning_chain"] = self._generate_reasoning_chain(
+                normalized_query, results["entities"], results["clauses"])
+        
+        # 6단계: SQL 패턴 매핑
+        if "sql_mappings" in stages:
+            results["sql_mappings"] = self._map_sql_patterns(normalized_query, sql_matches, sql_pattern_matches)
+        
+        return PreprocessingResult(query, normalized_query, stages, **results)
+    
     def _normalize_text(self, text: str) -> str:
         """텍스트 정규화"""
+        rules = self.processing_rules["normalization"]
+        
         # 공백 정규화
-        text = re.sub(self.processing_rules["normalization"]["whitespace"], ' ', text)
+        text = rules["whitespace"].sub(' ', text)
         
-        # 특수문자 처리 (한글, 영문, 숫자, 기본 문장부호만 유지)
-        text = re.sub(r'[^\w\s가-힣.,!?()]', '', text)
+        # 숫자 패턴 정규화 (% 기호는 특수문자 제거 전에 단어로 치환)
+        text = rules["currency_spacing"].sub(r'\1 원', text)
+        text = rules["percent_word"].sub(r'\1 퍼센트', text)
         
-        # 숫자 패턴 정규화
-        text = re.sub(r'(\d+)원', r'\1 원', text)
-        text = re.sub(r'(\d+)%', r'\1 퍼센트', text)
+        # 특수문자 처리 (한글, 영문, 숫자, 기본 문장부호만 유지)
+        text = rules["disallowed"].sub('', text)
         
         return text.strip()
     
-    def _apply_domain_mapping(self, text: str) -> str:
-        """도메인 특화 딕셔너리 매핑 적용"""
-        mapped_text = text
-        
-        # 신용평가 도메인 용어 매핑
-        for category, terms in self.dict_manager.credit_terms.items():
-            for term, info in terms.items():
-                if term in mapped_text:
-                    mapped_text = mapped_text.replace(term, info["sql_mapping"])
-                
-                # 동의어 매핑
-                for synonym in info.get("synonyms", []):
-                    if synonym in mapped_text:
-                        mapped_text = mapped_text.replace(synonym, info["sql_mapping"])
-        
-        return mapped_text
+    def _apply_domain_mapping(self, text: str, term_matches: Optional[List] = None) -> str:
+        """도메인 특화 딕셔너리 매핑 적용 (원문 기준 한 번에 치환, 긴 용어 우선)"""
+        if term_matches is None:
+            term_matches = self._scan_terms(text)[0]
+        term_surfaces = self._get_term_index()[2]
+        
+        parts = []
+        position = 0
+        for start, end, surface in term_matches:
+            entry = term_surfaces[surface][0]
+            parts.append(text[position:start])
+            parts.append(entry.info.get("sql_mapping", entry.term))
+            position = end
+        parts.append(text[position:])
+        
+        return "".join(parts)
     
-    def _extract_entities(self, text: str) -> Dict:
+    def _extract_entities(self, text: str, term_matches: Optional[List] = None) -> Entities:
         """엔티티 추출"""
-        entities = {
-            "domain_terms": [],
-            "numeric_values": [],
-            "date_values": [],
-            "customer_types": [],
-            "risk_levels": [],
-            "credit_scores": []
-        }
-        
-        # 도메인 용어 추출
-        for category, terms in self.dict_manager.credit_terms.items():
-            for term, info in terms.items():
-                if term in text or any(syn in text for syn in info.get("synonyms", [])):
-                    entities["domain_terms"].append({
-                        "term": term,
-                        "category": category,
-                        "sql_mapping": info.get("sql_mapping", term),
-                        "table": info.get("table", "")
-                    })
-        
-        # 숫자 값 추출
-        numeric_patterns = [
-            r'(\d+)원',
-            r'(\d+)%',
-            r'(\d+)일',
-            r'(\d+)개월',
-            r'(\d+)년'
-        ]
-        
-        for pattern in numeric_patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                entities["numeric_values"].append({
-                    "value": match,
-                    "pattern": pattern,
-                    "type": "currency" if "원" in pattern else "percentage" if "%" in pattern else "duration"
-                })
-        
-        # 고객 유형 추출
-        customer_types = ["개인고객", "기업고객", "소상공인", "VIP고객", "관리고객"]
-        for customer_type in customer_types:
-            if customer_type in text:
-                entities["customer_types"].append(customer_type)
-        
-        # 위험도 레벨 추출
-        risk_levels = ["낮음", "보통", "높음", "매우낮음", "매우높음"]
-        for risk_level in risk_levels:
-            if risk_level in text:
-                entities["risk_levels"].append(risk_level)
-        
-        return entities
+        # 도메인 용어 추출 (매칭된 표면형이 가리키는 모든 용어, 딕셔너리 순서 유지, 첫 출현 위치)
+        if term_matches is None:
+            term_matches = self._scan_terms(text)[0]
+        term_surfaces = self._get_term_index()[2]
+        found = {}
+        for start, end, surface in term_matches:
+            for entry in term_surfaces[surface]:
+                if entry.order not in found:
+                    found[entry.order] = DomainTerm(entry, start, end)
+        domain_terms = tuple(found[order] for order in sorted(found))
+        
+        # 규칙 엔티티 추출 (통합 스캐너 한 번, 매칭된 대안 이름으로 추출기 선택)
+        extracted = {field: [] for field in ENTITY_FIELDS}
+        for match in rule_patterns.ENTITY_SCANNER.finditer(text):
+            self.entity_extractors[match.lastgroup](match, extracted)
+        
+        return Entities(domain_terms=domain_terms, **{field: tuple(extracted[field]) for field in ENTITY_FIELDS})
     
-    def _extract_clauses(self, text: str) -> List[Dict]:
-        """절(Clause) 추출"""
+    def build_prompt_context(self, result: PreprocessingResult) -> str:
+        """전처리 결과 -> LLM 프롬프트용 질의 분석 요약 (엔티티가 없으면 빈 문자열)"""
+        lines = []
+        entities = result.entities
+        if entities is not None:
+            for found in entities.domain_terms:
+                table = found.entry.info.get("table")
+                column = found.entry.info.get("sql_mapping", found.entry.term)
+                lines.append(f"- 용어 '{found.entry.term}' → {table}.{column}" if table else
+                             f"- 용어 '{found.entry.term}' → {column}")
+            for numeric_range in entities.numeric_ranges:
+                term = entities.domain_term_before(numeric_range.start)
+                target = f"{term.entry.term} " if term else ""
+                lines.append(f"- 범위: {target}{numeric_range.min} ~ {numeric_range.max} (BETWEEN)")
+            for score in entities.credit_scores:
+                lines.append(f"- 신용점수 조건: {score.comparison or '='} {score.value} ({score.range})")
+            for amount in entities.loan_amounts:
+                lines.append(f"- 대출금액 조건: {amount.comparison or '='} {amount.value}{amount.unit}")
+            for value in entities.numeric_values:
+                if value.comparison:
+                    lines.append(f"- 수치 조건: {value.comparison} {value.value}{value.unit}")
+            for risk in entities.risk_levels:
+                lines.append(f"- 위험도/등급: {risk.level}")
+            for customer in entities.customer_types:
+                lines.append(f"- 고객 유형: {customer.type}")
+            for date in entities.date_values:
+                prefix = f"{date.year}년 " if date.year else ""
+                lines.append(f"- 날짜: {prefix}{date.month}월 {date.day}일")
+        if result.sql_mappings:
+            keywords = ", ".join(f"{pattern.korean}→{pattern.sql}" for pattern in result.sql_mappings)
+            lines.append(f"- SQL 키워드: {keywords}")
+        return "\n".join(lines)
+    
+    def _extract_clauses(self, text: str, detailed: bool = True,
+                         sql_pattern_matches: Optional[Tuple[SqlPatternMatch, ...]] = None) -> Tuple[Clause, ...]:
+        """절(Clause) 추출 (연결어/문장부호 기준 단일 패스 분리, detailed: 절별 토큰 보관)"""
+        if sql_pattern_matches is None:
+            sql_pattern_matches = self._sql_pattern_matches(self._scan_terms(text)[1])
         clauses = []
         processed_clauses = set()  # 중복 방지
         
-        # 1단계: 명확한 구분자로 분리 (우선순위 높음)
-        primary_patterns = [
-            r'([^.!?]+[.!?])',  # 마침표, 느낌표, 물음표로 끝나는 문장
-            r'([^그리고]+그리고[^그리고]+)',  # 그리고로 연결된 절
-            r'([^또는]+또는[^또는]+)',  # 또는로 연결된 절
-            r'([^이고]+이고[^이고]+)',  # 이고로 연결된 절
-            r'([^이거나]+이거나[^이거나]+)',  # 이거나로 연결된 절
-            r'([^하며]+하며[^하며]+)',  # 며로 연결된 절
-        ]
-        
-        # 2단계: 보조 구분자로 분리 (우선순위 낮음)
-        secondary_patterns = [
-            r'([^,]+)',  # 쉼표로 구분
-        ]
-        
-        # 우선순위 높은 패턴부터 처리
-        for pattern in primary_patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                clause_text = match.strip()
-                if len(clause_text) > 3 and clause_text not in processed_clauses:
-                    clause_info = self._analyze_clause(clause_text)
-                    if clause_info:
-                        clauses.append(clause_info)
-                        processed_clauses.add(clause_text)
-        
-        # 만약 절이 추출되지 않았다면, 수동으로 복합문 분리 시도
-        if not clauses:
-            clauses = self._manual_clause_split(text.strip())
-        
-        return clauses
-    
-    def _manual_clause_split(self, text: str) -> List[Dict]:
-        """수동 절 분리 (복합문 처리)"""
-        clauses = []
+        for span in segment_clauses(text):
+            clause_text = span.text(text)
+            if len(clause_text) > 2 and clause_text not in processed_clauses:
+                clauses.append(self._analyze_clause(clause_text, span, detailed, sql_pattern_matches))
+                processed_clauses.add(clause_text)
         
-        # 한국어 연결어 패턴
-        connectors = [
-            '그리고', '또는', '이거나', '이고', '하며', '면서', '하지만', '그런데',
-            '또한', '또한', '또한', '또한', '또한', '또한', '또한', '또한'
-        ]
-        
-        # 연결어로 분리
-        parts = [text]
-        for connector in connectors:
-            new_parts = []
-            for part in parts:
-                if connector in part:
-                    split_parts = part.split(connector)
-                    for i, split_part in enumerate(split_parts):
-                        if split_part.strip():
-                            new_parts.append(split_part.strip())
-                        if i < len(split_parts) - 1:  # 마지막 부분이 아니면 연결어 추가
-                            new_parts.append(connector)
-                else:
-                    new_parts.append(part)
-            parts = new_parts
-        
-        # 각 부분을 절로 분석
-        for part in parts:
-            if len(part.strip()) > 2:  # 의미있는 길이만
-                clause_info = self._analyze_clause(part.strip())
-                if clause_info:
-                    clauses.append(clause_info)
-        
-        return clauses
-    
-    def _analyze_clause(self, clause: str) -> Optional[Dict]:
-        """절 분석"""
-        # jieba로 형태소 분석
-        words = list(jieba.cut(clause))
+        return tuple(clauses)
+    
+    def _analyze_clause(self, clause: str, span, detailed: bool = True,
+                        sql_pattern_matches: Tuple[SqlPatternMatch, ...] = ()) -> Clause:
+        """절 분석 (span: 원문 오프셋과 다음 절로 이어지는 연결어, 질의 단위 SQL 패턴 매칭 중 절 범위 안의 것을 공유)"""
+        # 어절/조사 분리 + 용어 사전 기반 토큰화 (절 단위 캐시, 불변 튜플 공유)
+        words = self.tokenizer.tokenize(clause)
         
         # 도메인 용어 포함 여부 확인
+        term_entries = self._get_term_index()[4]
         domain_terms = []
         for word in words:
             term_info = self.dict_manager.get_term_info(word)
             if term_info:
-                domain_terms.append(term_info)
+                entry = term_entries.get((term_info["category"], term_info["term"]))
+                if entry is not None:
+                    domain_terms.append(entry)
         
         # 절 유형 분석
         clause_type = self._identify_clause_type(clause)
         
-        # 조건부 표현 확인
+        # 조건부 표현 확인 (연결어는 절 분리 시 떼어내므로 span의 연결어로 판단)
+        connector = span.connector
         conditional_type = None
         if "만약" in clause:
             conditional_type = "if_then"
         elif "일 때" in clause:
             conditional_type = "when"
-        elif "그리고" in clause:
+        elif "그리고" in clause or connector in ("그리고", "이고", "하며", "면서", "또한"):
             conditional_type = "and"
-        elif "또는" in clause:
+        elif "또는" in clause or connector in ("또는", "이거나"):
             conditional_type = "or"
         
-        # SQL 패턴 확인
+        # SQL 패턴 확인 (절 안에서 같은 키워드는 첫 출현만)
         sql_patterns = []
-        for pattern_type, patterns in self.sql_patterns.items():
-            for korean, sql in patterns.items():
-                if korean in clause:
-                    sql_patterns.append({
-                        "korean": korean,
-                        "sql": sql,
-                        "type": pattern_type
-                    })
+        first_start = {}
+        for pattern in sql_pattern_matches:
+            if span.start <= pattern.start and pattern.end <= span.end:
+                if first_start.setdefault(pattern.korean, pattern.start) == pattern.start:
+                    sql_patterns.append(pattern)
         
         # 신뢰도 계산
         confidence = self._calculate_confidence(clause, domain_terms, sql_patterns)
         
-        # 프론트엔드 호환성을 위한 구조 변환
-        return {
-            "type": clause_type,
-            "confidence": confidence,
-            "content": clause,
-            "keywords": [term["term"] for term in domain_terms] if domain_terms else [],
-            "clause": clause,
-            "words": words,
-            "domain_terms": domain_terms,
-            "conditional_type": conditional_type,
-            "sql_patterns": sql_patterns,
-            "length": len(clause)
-        }
+        return Clause(
+            start=span.start,
+            end=span.end,
+            type=clause_type,
+            confidence=confidence,
+            conditional_type=conditional_type,
+            connector=connector,
+            domain_terms=tuple(domain_terms),
+            sql_patterns=tuple(sql_patterns),
+            words=words if detailed else None
+        )
     
     def _identify_clause_type(self, clause: str) -> str:
         """절 유형 식별"""
@@ -371,7 +556,8 @@ class HybridPreprocessingAgent:
         
         return min(confidence, 1.0)  # 최대 1.0
     
-    def _generate_reasoning_chain(self, query: str, entities: Dict, clauses: List[Dict]) -> List[str]:
+    def _generate_reasoning_chain(self, query: str, entities: Entities,
+                                  clauses: Tuple[Clause, ...]) -> Tuple[str, ...]:
         """Chain of Thought 추론 생성"""
         reasoning_steps = []
         
@@ -380,15 +566,15 @@ class HybridPreprocessingAgent:
         reasoning_steps.append(f"질문 유형: {question_type}")
         
         # 2단계: 도메인 용어 분석
-        if entities["domain_terms"]:
-            terms_summary = ", ".join([term["term"] for term in entities["domain_terms"]])
+        if entities.domain_terms:
+            terms_summary = ", ".join([found.entry.term for found in entities.domain_terms])
             reasoning_steps.append(f"도메인 용어 발견: {terms_summary}")
         
         # 3단계: 조건 분석
         conditions = []
         for clause in clauses:
-            if clause["conditional_type"]:
-                conditions.append(f"{clause['clause']} ({clause['conditional_type']})")
+            if clause.conditional_type:
+                conditions.append(f"{clause.text(query)} ({clause.conditional_type})")
         
         if conditions:
             reasoning_steps.append(f"조건부 표현: {'; '.join(conditions)}")
@@ -396,8 +582,8 @@ class HybridPreprocessingAgent:
         # 4단계: SQL 패턴 매핑
         sql_patterns = []
         for clause in clauses:
-            for pattern in clause["sql_patterns"]:
-                sql_patterns.append(f"{pattern['korean']} → {pattern['sql']}")
+            for pattern in clause.sql_patterns:
+                sql_patterns.append(f"{pattern.korean} → {pattern.sql}")
         
         if sql_patterns:
             reasoning_steps.append(f"SQL 패턴: {'; '.join(sql_patterns)}")
@@ -405,7 +591,7 @@ class HybridPreprocessingAgent:
         # 5단계: 추론 결과
         reasoning_steps.append("추론 완료: 자연어를 SQL로 변환할 준비가 되었습니다.")
         
-        return reasoning_steps
+        return tuple(reasoning_steps)
     
     def _identify_question_type(self, query: str) -> str:
         """질문 유형 파악"""
@@ -426,56 +612,48 @@ class HybridPreprocessingAgent:
         else:
             return "GENERAL_QUERY"
     
-    def _map_sql_patterns(self, text: str) -> Dict:
-        """SQL 패턴 매핑"""
-        mappings = {
-            "aggregation": [],
-            "comparison": [],
-            "ordering": []
-        }
-        
-        for pattern_type, patterns in self.sql_patterns.items():
-            for korean, sql in patterns.items():
-                if korean in text:
-                    mappings[pattern_type].append({
-                        "korean": korean,
-                        "sql": sql,
-                        "context": self._extract_context(text, korean)
-                    })
-        
-        return mappings
+    def _sql_pattern_matches(self, sql_matches: List) -> Tuple[SqlPatternMatch, ...]:
+        """SQL 패턴 키워드 매칭 -> 매칭 객체 (키워드가 여러 분류에 속하면 분류마다 하나씩)"""
+        sql_surfaces = self._get_term_index()[3]
+        return tuple(
+            SqlPatternMatch(korean, sql, pattern_type, start, end)
+            for start, end, surface in sql_matches
+            for pattern_type, sql, korean in sql_surfaces[surface]
+        )
     
-    def _extract_context(self, text: str, keyword: str) -> str:
-        """키워드 주변 문맥 추출"""
-        try:
-            index = text.index(keyword)
-            start = max(0, index - 20)
-            end = min(len(text), index + len(keyword) + 20)
-            return text[start:end].strip()
-        except ValueError:
-            return ""
-    
-    def _extract_credit_score(self, text: str) -> List[Dict]:
-        """신용점수 추출"""
-        patterns = [
-            r'신용점수\s*(\d+)',
-            r'크레딧스코어\s*(\d+)',
-            r'(\d+)\s*점'
-        ]
-        
-        scores = []
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                score = int(match)
-                if 300 <= score <= 850:
-                    scores.append({
-                        "value": score,
-                        "type": "credit_score",
-                        "range": self._get_score_range(score)
-                    })
-        
-        return scores
+    def _map_sql_patterns(self, text: str, sql_matches: Optional[List] = None,
+                          sql_pattern_matches: Optional[Tuple[SqlPatternMatch, ...]] = None) -> Tuple[SqlPatternMatch, ...]:
+        """SQL 패턴 매핑 (같은 키워드는 첫 출현만, 분류별 묶음/문맥은 직렬화 시 생성)"""
+        if sql_pattern_matches is None:
+            if sql_matches is None:
+                sql_matches = self._scan_terms(text)[1]
+            sql_pattern_matches = self._sql_pattern_matches(sql_matches)
+        
+        first_start = {}
+        return tuple(
+            pattern for pattern in sql_pattern_matches
+            if first_start.setdefault(pattern.korean, pattern.start) == pattern.start
+        )
+    
+    @staticmethod
+    def _comparison(match, group: str) -> Optional[str]:
+        """매칭의 비교 표현 그룹 -> SQL 연산자"""
+        keyword = match.group(group)
+        return rule_patterns.COMPARISON_OPERATORS[keyword] if keyword else None
+    
+    def _credit_score(self, score: int, comparison: Optional[str], start: int, end: int) -> Optional[CreditScore]:
+        """신용점수 범위 안의 값만 신용점수 엔티티로 변환"""
+        low, high = rule_patterns.CREDIT_SCORE_RANGE
+        if not low <= score <= high:
+            return None
+        return CreditScore(score, self._get_score_range(score), comparison, start, end)
+    
+    def _extract_credit_score(self, match, extracted: Dict[str, List]):
+        """신용점수 추출 ("신용점수 N(점) 이상", 숫자는 뒤이은 대안이 다시 매칭)"""
+        score = self._credit_score(int(match.group("score")), self._comparison(match, "score_cmp"),
+                                   *match.span("score"))
+        if score is not None:
+            extracted["credit_scores"].append(score)
     
     def _get_score_range(self, score: int) -> str:
         """점수 범위 분류"""
@@ -490,102 +668,88 @@ class HybridPreprocessingAgent:
         else:
             return "매우낮음"
     
-    def _extract_risk_level(self, text: str) -> List[str]:
-        """위험도 레벨 추출"""
-        risk_levels = []
-        korean_risk_levels = ["매우낮음", "낮음", "보통", "높음", "매우높음"]
-        
-        for level in korean_risk_levels:
-            if level in text:
-                risk_levels.append(level)
-        
-        return risk_levels
-    
-    def _extract_loan_amount(self, text: str) -> List[Dict]:
-        """대출금액 추출"""
-        patterns = [
-            r'대출금액\s*(\d+)원',
-            r'(\d+)원\s*대출',
-            r'대출\s*(\d+)원'
-        ]
-        
-        amounts = []
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                amounts.append({
-                    "value": int(match),
-                    "type": "loan_amount",
-                    "unit": "원"
-                })
-        
-        return amounts
-    
-    def _extract_customer_type(self, text: str) -> List[str]:
-        """고객 유형 추출"""
-        customer_types = []
-        type_patterns = {
-            "개인고객": ["개인", "개인고객", "개인신용"],
-            "기업고객": ["기업", "기업고객", "기업신용"],
-            "소상공인": ["소상공인", "소상공인고객"],
-            "VIP고객": ["VIP", "VIP고객", "우수고객"],
-            "관리고객": ["관리", "관리고객", "주의고객"]
-        }
-        
-        for customer_type, patterns in type_patterns.items():
-            if any(pattern in text for pattern in patterns):
-                customer_types.append(customer_type)
-        
-        return customer_types
-    
-    def _extract_date_range(self, text: str) -> List[Dict]:
-        """날짜 범위 추출"""
-        date_patterns = [
-            r'(\d{4})년(\d{1,2})월(\d{1,2})일',
-            r'(\d{4})-(\d{1,2})-(\d{1,2})',
-            r'(\d{1,2})월(\d{1,2})일'
-        ]
-        
-        dates = []
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                if len(match) == 3:
-                    dates.append({
-                        "year": match[0],
-                        "month": match[1],
-                        "day": match[2],
-                        "type": "full_date"
-                    })
-                elif len(match) == 2:
-                    dates.append({
-                        "month": match[0],
-                        "day": match[1],
-                        "type": "month_day"
-                    })
-        
-        return dates
-    
-    def _extract_numeric_range(self, text: str) -> List[Dict]:
-        """숫자 범위 추출"""
-        range_patterns = [
-            r'(\d+)\s*이상\s*(\d+)이하',
-            r'(\d+)\s*부터\s*(\d+)까지',
-            r'(\d+)\s*~\s*(\d+)',
-            r'(\d+)\s*-\s*(\d+)'
-        ]
-        
-        ranges = []
-        for pattern in range_patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                ranges.append({
-                    "min": int(match[0]),
-                    "max": int(match[1]),
-                    "type": "numeric_range"
-                })
-        
-        return ranges
+    def _extract_risk_level(self, match, extracted: Dict[str, List]):
+        """위험도 레벨 추출 (긴 표현 우선: "매우높음"은 "높음"으로 중복 집계하지 않음)"""
+        extracted["risk_levels"].append(RiskLevel(match.group(), *match.span()))
+    
+    def _extract_loan_amount(self, match, extracted: Dict[str, List]):
+        """대출금액 추출 ("대출(금액) N원", 숫자는 뒤이은 대안이 다시 매칭)"""
+        extracted["loan_amounts"].append(LoanAmount(
+            int(match.group("loan_value")), "원", self._comparison(match, "loan_cmp"), *match.span("loan_value")
+        ))
+    
+    def _extract_customer_type(self, match, extracted: Dict[str, List]):
+        """고객 유형 추출 (별칭은 정규화된 유형으로)"""
+        extracted["customer_types"].append(CustomerType(
+            rule_patterns.CUSTOMER_TYPE_ALIASES[match.group()], *match.span()
+        ))
+    
+    def _extract_date_range(self, match, extracted: Dict[str, List]):
+        """날짜 추출 (연월일 또는 월일)"""
+        if match.group("year"):
+            date = DateValue("full_date", match.group("year"), match.group("month"), match.group("day"), *match.span())
+        else:
+            date = DateValue("month_day", None, match.group("md_month"), match.group("md_day"), *match.span())
+        extracted["date_values"].append(date)
+    
+    def _extract_numeric_range(self, match, extracted: Dict[str, List]):
+        """숫자 범위 추출 ("신용점수 N 부터 M 까지"의 N은 단일 신용점수 조건이 아니므로 범위로 대체)"""
+        maximum = match.group("range_max_le") or match.group("range_max_to") or match.group("range_max")
+        scores = extracted["credit_scores"]
+        if scores and scores[-1].start == match.start():
+            scores.pop()
+        extracted["numeric_ranges"].append(NumericRange(int(match.group("range_min")), int(maximum), *match.span()))
+    
+    def _extract_numeric_value(self, match, extracted: Dict[str, List]):
+        """단위 붙은 숫자 추출 ("N점"은 신용점수, "N원 대출"은 대출금액으로도 기록)"""
+        unit = match.group("unit")
+        rule, value_type = rule_patterns.NUMERIC_UNITS[unit]
+        comparison = self._comparison(match, "value_cmp")
+        start, end = match.span("value")
+        if value_type == "score":
+            # "신용점수 N점"은 키워드 대안이 이미 기록
+            scores = extracted["credit_scores"]
+            if not (scores and scores[-1].start == start):
+                score = self._credit_score(int(match.group("value")), comparison, start, end)
+                if score is not None:
+                    scores.append(score)
+            return
+        
+        extracted["numeric_values"].append(NumericValue(
+            match.group("value"), rule, unit, value_type, comparison, *match.span()
+        ))
+        if unit == "원" and match.group("loan_suffix") is not None:
+            amounts = extracted["loan_amounts"]
+            if not (amounts and amounts[-1].start == start):
+                amounts.append(LoanAmount(int(match.group("value")), unit, comparison, start, end))
+
+def _chunked(queries: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    chunk = []
+    for query in queries:
+        chunk.append(query)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _preprocess_chunk_with(agent: HybridPreprocessingAgent, chunk: List[str],
+                           stages: Tuple[str, ...]) -> Tuple[List[Dict], float, int]:
+    """청크 전처리 -> (결과 목록, 소요 CPU 시간, 프로세스 ID)"""
+    started = time.process_time()
+    results = [agent.preprocess_query(query, stages=stages) for query in chunk]
+    return results, time.process_time() - started, os.getpid()
+
+# 배치 워커 프로세스의 에이전트 (워커 시작 시 한 번만 준비)
+_batch_worker_agent = None
+
+def _init_batch_worker():
+    global _batch_worker_agent
+    # 부모 프로세스의 인스턴스(잠금/캐시 상태 포함)를 물려받지 않도록 워커에서 새로 생성
+    _batch_worker_agent = HybridPreprocessingAgent()
+
+def _preprocess_chunk(chunk: List[str], stages: Tuple[str, ...]) -> Tuple[List[Dict], float, int]:
+    return _preprocess_chunk_with(_batch_worker_agent, chunk, stages)
 
 # 전역 인스턴스
 hybrid_agent = HybridPreprocessingAgent()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+전처리용 토크나이저
+절 분석에 쓰는 토크나이저 인터페이스와 구현
+- korean: 어절 단위 분리 + 조사/어미 제거 + 용어 사전 최장 일치 (기본, 즉시 로드)
+- jieba: 기존 중국어 분할기 (선택, 사전 로드에 수 초 소요)
+토큰화 결과는 절 문자열 단위 LRU 캐시에 보관
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from preprocessing.term_automaton import TermAutomaton
+
+# 어절 끝에서 떼어낼 조사/어미
+JOSA_SUFFIXES = frozenset([
+    "에서는", "에게서", "으로는", "까지는", "부터는", "이거나", "이고", "이며",
+    "에서", "으로", "에게", "께서", "부터", "까지", "보다", "처럼", "이나", "이랑", "하고",
+    "과", "와", "은", "는", "이", "가", "을", "를", "의", "에", "도", "만", "로", "인"
+])
+# 긴 조사부터 검사하기 위한 길이 목록
+JOSA_LENGTHS = sorted({len(suffix) for suffix in JOSA_SUFFIXES}, reverse=True)
+
+# 어절 내부(복합어)에서 용어로 인정할 최소 길이 (한 글자 동의어가 복합어를 쪼개지 않도록)
+MIN_INNER_TERM_LENGTH = 2
+
+# 어절 앞뒤에서 떼어낼 문장부호
+PUNCTUATION = ".,!?;:()[]{}\"'"
+
+class Tokenizer:
+    """토크나이저 인터페이스 (절 문자열 -> 토큰 튜플, LRU 캐시 포함)"""
+
+    name = "base"
+
+    def __init__(self, cache_size: Optional[int] = None):
+        self.cache_size = cache_size if cache_size is not None else \
+            int(os.getenv('PREPROCESS_TOKENIZER_CACHE_SIZE', '4096'))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _tokenize(self, text: str) -> Tuple[str, ...]:
+        raise NotImplementedError
+
+    def _before_lookup(self):
+        """캐시 조회 전 훅 (사전 변경 시 캐시 무효화 등)"""
+
+    def tokenize(self, text: str) -> Tuple[str, ...]:
+        """토큰화 (캐시된 결과는 불변 튜플로 공유)"""
+        self._before_lookup()
+        if not self.cache_size:
+            return self._tokenize(text)
+        with self._lock:
+            tokens = self._cache.get(text)
+            if tokens is not None:
+                self._cache.move_to_end(text)
+                self.stats["hits"] += 1
+                return tokens
+            self.stats["misses"] += 1
+
+        tokens = self._tokenize(text)
+        with self._lock:
+            self._cache[text] = tokens
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            return {
+                "tokenizer": self.name,
+                "cache_entries": len(self._cache),
+                "cache_size": self.cache_size,
+                "hits": self.stats["hits"],
+                "misses": self.stats["misses"],
+                "hit_rate": round(self.stats["hits"] / total, 4) if total else 0.0
+            }
+
+class KoreanTokenizer(Tokenizer):
+    """어절/조사 분리 + 용어 사전 최장 일치 토크나이저
+
+    - 어절 전체가 용어/동의어면 그대로 토큰
+    - 복합 어절은 용어 사전 최장 일치로 분리 (예: "대출금액합계" -> "대출금액", "합계")
+    - 남은 꼬리에서 조사/어미 제거 (예: "고객의" -> "고객")
+    용어 사전은 딕셔너리 관리자의 표면형 역색인을 사용하며 딕셔너리 버전이 바뀌면 재구축
+    """
+
+    name = "korean"
+
+    def __init__(self, dictionary=None, cache_size: Optional[int] = None):
+        super().__init__(cache_size)
+        self.dictionary = dictionary
+        self._automaton = None
+        self._version = None
+        self._refresh()
+
+    def _before_lookup(self):
+        self._refresh()
+
+    def _refresh(self):
+        """딕셔너리 버전이 바뀌었으면 용어 오토마톤 재구축 및 캐시 비우기"""
+        version = getattr(self.dictionary, "version", None)
+        if self._automaton is not None and version == self._version:
+            return
+        surfaces = list(getattr(self.dictionary, "surface_index", {}) or {})
+        automaton = TermAutomaton(surfaces)
+        with self._lock:
+            self._automaton = automaton
+            self._version = version
+            self._cache.clear()
+
+    @staticmethod
+    def strip_josa(word: str) -> str:
+        """어절 끝 조사/어미 제거 (조사만 남으면 빈 문자열)"""
+        if word in JOSA_SUFFIXES:
+            return ""
+        for length in JOSA_LENGTHS:
+            if len(word) > length and word[-length:] in JOSA_SUFFIXES:
+                return word[:-length]
+        return word
+
+    def _split_word(self, word: str, automaton: TermAutomaton, surfaces) -> List[str]:
+        # 용어 사전은 공백 제거/소문자 정규화된 표면형 (길이가 바뀌는 문자가 있으면 원문으로 매칭)
+        key = word.lower()
+        if len(key) != len(word):
+            key = word
+        if key in surfaces:
+            return [word]
+
+        tokens = []
+        position = 0
+        for start, end, _ in automaton.find_longest(key) if len(key) >= MIN_INNER_TERM_LENGTH else ():
+            if end - start < MIN_INNER_TERM_LENGTH:
+                continue
+            if start > position:
+                tokens.append(word[position:start])
+            tokens.append(word[start:end])
+            position = end
+        tail = self.strip_josa(word[position:])
+        if tail:
+            tokens.append(tail)
+        return tokens
+
+    def _tokenize(self, text: str) -> Tuple[str, ...]:
+        automaton = self._automaton
+        surfaces = getattr(self.dictionary, "surface_index", {}) or {}
+        tokens = []
+        for word in text.split():
+            word = word.strip(PUNCTUATION)
+            if word:
+                tokens.extend(self._split_word(word, automaton, surfaces))
+        return tuple(tokens)
+
+class JiebaTokenizer(Tokenizer):
+    """jieba 분할기 (시작 시 사전을 미리 로드)"""
+
+    name = "jieba"
+
+    def __init__(self, cache_size: Optional[int] = None):
+        super().__init__(cache_size)
+        import jieba
+        jieba.setLogLevel(60)
+        jieba.initialize()
+        self._jieba = jieba
+
+    def _tokenize(self, text: str) -> Tuple[str, ...]:
+        return tuple(word for word in self._jieba.cut(text) if word.strip())
+
+def create_tokenizer(name: Optional[str] = None, dictionary=None) -> Tokenizer:
+    """PREPROCESS_TOKENIZER 설정에 맞는 토크나이저 생성 (jieba를 쓸 수 없으면 korean)"""
+    name = (name or os.getenv('PREPROCESS_TOKENIZER', 'korean')).lower()
+    if name == "jieba":
+        try:
+            return JiebaTokenizer()
+        except ImportError:
+            print("⚠️ jieba가 설치되지 않아 한국어 토크나이저를 사용합니다.")
+    elif name != "korean":
+        print(f"⚠️ 알 수 없는 토크나이저 '{name}', 한국어 토크나이저를 사용합니다.")
+    return KoreanTokenizer(dictionary)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+전처리 결과 타입과 직렬화
+혼합 전처리 에이전트의 결과를 __slots__ 불변 데이터클래스로 표현
+- 절/SQL 패턴 문맥은 부분 문자열을 복사하지 않고 정규화 질의 기준 오프셋 [start, end) 로 보관
+- 용어/SQL 패턴 문자열은 딕셔너리 객체를 그대로 참조
+- 절의 SQL 패턴은 질의 단위 SQL 패턴 매칭 객체를 공유
+serialize_result 하나로 프론트엔드(PreprocessingViewer.js)가 기대하는 JSON 구조를 생성
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from preprocessing.rule_patterns import CUSTOMER_TYPES, RISK_LEVELS
+
+# 문맥 추출 시 키워드 앞뒤로 포함할 글자 수
+CONTEXT_WINDOW = 20
+
+# 결과에 항상 포함하는 SQL 패턴 분류 (그 외 분류는 매칭이 있을 때만 포함)
+DEFAULT_SQL_CATEGORIES = ("aggregation", "comparison", "ordering")
+
+@dataclass(frozen=True, slots=True)
+class TermEntry:
+    """딕셔너리 용어 항목 (info는 딕셔너리의 용어 정보 dict 참조, order는 딕셔너리 순서)"""
+    category: str
+    term: str
+    info: Dict
+    order: int
+
+@dataclass(frozen=True, slots=True)
+class DomainTerm:
+    """질의에서 찾은 도메인 용어 (첫 출현 위치)"""
+    entry: TermEntry
+    start: int
+    end: int
+
+@dataclass(frozen=True, slots=True)
+class NumericValue:
+    """단위가 붙은 숫자 값 (rule: 규칙 이름, type: currency/percentage/duration, comparison: 뒤따르는 비교 연산자)"""
+    value: str
+    rule: str
+    unit: str
+    type: str
+    comparison: Optional[str]
+    start: int
+    end: int
+
+@dataclass(frozen=True, slots=True)
+class NumericRange:
+    """숫자 범위 (N 이상 M 이하, N 부터 M 까지, N~M)"""
+    min: int
+    max: int
+    start: int
+    end: int
+
+@dataclass(frozen=True, slots=True)
+class CreditScore:
+    """신용점수 (오프셋은 숫자 위치, range: 점수 구간 분류)"""
+    value: int
+    range: str
+    comparison: Optional[str]
+    start: int
+    end: int
+
+@dataclass(frozen=True, slots=True)
+class LoanAmount:
+    """대출금액 (오프셋은 숫자 위치)"""
+    value: int
+    unit: str
+    comparison: Optional[str]
+    start: int
+    end: int
+
+@dataclass(frozen=True, slots=True)
+class RiskLevel:
+    level: str
+    start: int
+    end: int
+
+@dataclass(frozen=True, slots=True)
+class CustomerType:
+    """고객 유형 (type: 정규화된 유형, 원문 표현은 오프셋으로 참조)"""
+    type: str
+    start: int
+    end: int
+
+@dataclass(frozen=True, slots=True)
+class DateValue:
+    """날짜 값 (type: full_date/month_day, month_day는 연도 없음)"""
+    type: str
+    year: Optional[str]
+    month: str
+    day: str
+    start: int
+    end: int
+
+@dataclass(frozen=True, slots=True)
+class SqlPatternMatch:
+    """SQL 패턴 키워드 매칭 (category: aggregation/comparison/...)"""
+    korean: str
+    sql: str
+    category: str
+    start: int
+    end: int
+
+@dataclass(frozen=True, slots=True)
+class Entities:
+    """질의 엔티티 (도메인 용어 외에는 엔티티 통합 스캐너 한 번으로 추출, 각 목록은 텍스트 순서)"""
+    domain_terms: Tuple[DomainTerm, ...] = ()
+    numeric_values: Tuple[NumericValue, ...] = ()
+    numeric_ranges: Tuple[NumericRange, ...] = ()
+    date_values: Tuple[DateValue, ...] = ()
+    customer_types: Tuple[CustomerType, ...] = ()
+    risk_levels: Tuple[RiskLevel, ...] = ()
+    credit_scores: Tuple[CreditScore, ...] = ()
+    loan_amounts: Tuple[LoanAmount, ...] = ()
+
+    def domain_term_before(self, position: int, predicate=None) -> Optional[DomainTerm]:
+        """위치 앞에서 가장 가까운 도메인 용어 (predicate로 용어 항목 조건 지정)"""
+        nearest = None
+        for found in self.domain_terms:
+            if found.start < position and (predicate is None or predicate(found.entry)):
+                if nearest is None or found.start > nearest.start:
+                    nearest = found
+        return nearest
+
+@dataclass(frozen=True, slots=True)
+class Clause:
+    """절 분석 결과 (words는 절 상세 단계에서만 보관, 토크나이저 캐시의 튜플 공유)"""
+    start: int
+    end: int
+    type: str
+    confidence: float
+    conditional_type: Optional[str]
+    connector: Optional[str]
+    domain_terms: Tuple[TermEntry, ...]
+    sql_patterns: Tuple[SqlPatternMatch, ...]
+    words: Optional[Tuple[str, ...]] = None
+
+    def text(self, source: str) -> str:
+        return source[self.start:self.end]
+
+@dataclass(frozen=True, slots=True)
+class PreprocessingResult:
+    """전처리 결과 (실행하지 않은 단계는 None, 오프셋은 normalized_query 기준)"""
+    original_query: str
+    normalized_query: str
+    stages: Tuple[str, ...]
+    mapped_query: Optional[str] = None
+    entities: Optional[Entities] = None
+    clauses: Optional[Tuple[Clause, ...]] = None
+    reasoning_chain: Optional[Tuple[str, ...]] = None
+    sql_mappings: Optional[Tuple[SqlPatternMatch, ...]] = None
+
+def extract_context(text: str, start: int, end: int) -> str:
+    """키워드 주변 문맥 추출"""
+    return text[max(0, start - CONTEXT_WINDOW):min(len(text), end + CONTEXT_WINDOW)].strip()
+
+def _ordered_unique(values, order: List[str]) -> List[str]:
+    """중복 제거 후 기준 목록 순서로 정렬"""
+    found = set(values)
+    return [value for value in order if value in found]
+
+def _serialize_entities(entities: Entities) -> Dict:
+    date_values = []
+    for date in entities.date_values:
+        if date.type == "full_date":
+            date_values.append({"year": date.year, "month": date.month, "day": date.day, "type": date.type})
+        else:
+            date_values.append({"month": date.month, "day": date.day, "type": date.type})
+    return {
+        "domain_terms": [
+            {
+                "term": found.entry.term,
+                "category": found.entry.category,
+                "sql_mapping": found.entry.info.get("sql_mapping", found.entry.term),
+                "table": found.entry.info.get("table", "")
+            } for found in entities.domain_terms
+        ],
+        "numeric_values": [
+            {"value": value.value, "pattern": value.rule, "unit": value.unit, "type": value.type,
+             "comparison": value.comparison}
+            for value in entities.numeric_values
+        ],
+        "numeric_ranges": [
+            {"min": numeric_range.min, "max": numeric_range.max, "type": "numeric_range"}
+            for numeric_range in entities.numeric_ranges
+        ],
+        "date_values": date_values,
+        "customer_types": _ordered_unique((customer.type for customer in entities.customer_types), CUSTOMER_TYPES),
+        "risk_levels": _ordered_unique((risk.level for risk in entities.risk_levels), RISK_LEVELS),
+        "credit_scores": [
+            {"value": score.value, "type": "credit_score", "range": score.range, "comparison": score.comparison}
+            for score in entities.credit_scores
+        ],
+        "loan_amounts": [
+            {"value": amount.value, "type": "loan_amount", "unit": amount.unit, "comparison": amount.comparison}
+            for amount in entities.loan_amounts
+        ]
+    }
+
+def _serialize_clause(clause: Clause, text: str) -> Dict:
+    data = {
+        "type": clause.type,
+        "confidence": clause.confidence,
+        "content": clause.text(text),
+        "keywords": [entry.term for entry in clause.domain_terms],
+        "conditional_type": clause.conditional_type,
+        "sql_patterns": [
+            {"korean": pattern.korean, "sql": pattern.sql, "type": pattern.category}
+            for pattern in clause.sql_patterns
+        ],
+        "length": clause.end - clause.start,
+        "start": clause.start,
+        "end": clause.end,
+        "connector": clause.connector
+    }
+    if clause.words is not None:
+        data["words"] = list(clause.words)
+        data["domain_terms"] = [
+            {"category": entry.category, "term": entry.term, "info": entry.info}
+            for entry in clause.domain_terms
+        ]
+    return data
+
+def group_sql_mappings(mappings: Tuple[SqlPatternMatch, ...], text: str) -> Dict[str, List[Dict]]:
+    """SQL 패턴 매칭 -> 분류별 {"korean", "sql", "context"} 목록"""
+    grouped = {category: [] for category in DEFAULT_SQL_CATEGORIES}
+    for pattern in mappings:
+        grouped.setdefault(pattern.category, []).append({
+            "korean": pattern.korean,
+            "sql": pattern.sql,
+            "context": extract_context(text, pattern.start, pattern.end)
+        })
+    return grouped
+
+def serialize_result(result: PreprocessingResult) -> Dict:
+    """전처리 결과 -> 프론트엔드 JSON 구조 (실행하지 않은 단계는 빈 값)"""
+    text = result.normalized_query
+    entities = _serialize_entities(result.entities) if result.entities is not None else {}
+    clauses = [_serialize_clause(clause, text) for clause in result.clauses or ()]
+    reasoning_chain = list(result.reasoning_chain or ())
+    sql_mappings = group_sql_mappings(result.sql_mappings, text) if result.sql_mappings is not None else {}
+    return {
+        "original_query": result.original_query,
+        "normalized_query": text,
+        "mapped_query": result.mapped_query if result.mapped_query is not None else text,
+        "entities": entities,
+        "clauses": clauses,
+        "reasoning_chain": reasoning_chain,
+        "sql_mappings": sql_mappings,
+        "preprocessing_metadata": {
+            "domain_terms_found": len(entities.get("domain_terms", [])),
+            "clauses_count": len(clauses),
+            "reasoning_steps": len(reasoning_chain),
+            "sql_patterns_mapped": len(sql_mappings),
+            "stages": list(result.stages)
+        }
+    }
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+전처리 정규식 규칙 레지스트리
+모든 규칙을 모듈 로드 시 한 번만 컴파일하고, 엔티티 규칙(신용점수/대출금액/위험도/고객 유형/
+날짜/범위/단위 숫자)은 이름 있는 그룹의 단일 alternation 스캐너로 합쳐 텍스트를 한 번만 훑도록 함
+"""
+
+import re
+
+# 문장 정규화 규칙
+NORMALIZATION = {
+    "whitespace": re.compile(r'\s+'),
+    # 한글, 영문, 숫자, 기본 문장부호 외 제거
+    "disallowed": re.compile(r'[^\w\s가-힣.,!?()]'),
+    "currency_spacing": re.compile(r'(\d+)원'),
+    "percent_word": re.compile(r'(\d+)%')
+}
+
+# 비교 표현 -> SQL 연산자 (숫자 뒤에 붙은 경우 엔티티에 함께 기록)
+COMPARISON_OPERATORS = {
+    "이상": ">=",
+    "이하": "<=",
+    "초과": ">",
+    "미만": "<"
+}
+
+# 신용점수로 인정할 범위
+CREDIT_SCORE_RANGE = (300, 850)
+
+# 단위 -> (규칙 이름, 숫자 값 유형)
+NUMERIC_UNITS = {
+    "원": ("currency", "currency"),
+    "달러": ("currency", "currency"),
+    "엔": ("currency", "currency"),
+    "위안": ("currency", "currency"),
+    "%": ("percent", "percentage"),
+    "퍼센트": ("percent", "percentage"),
+    "일": ("days", "duration"),
+    "개월": ("months", "duration"),
+    "년": ("years", "duration"),
+    "점": ("points", "score")
+}
+
+# 위험도/고객 유형 키워드 (출력 순서 기준)
+RISK_LEVELS = ["매우낮음", "낮음", "보통", "높음", "매우높음"]
+CUSTOMER_TYPES = ["개인고객", "기업고객", "소상공인", "VIP고객", "관리고객"]
+
+# 고객 유형 표현 -> 고객 유형 (단독 "개인"/"기업"/"관리"는 "개인정보", "내부관리" 등과 겹쳐 제외)
+CUSTOMER_TYPE_ALIASES = {
+    "개인고객": "개인고객", "개인신용": "개인고객",
+    "기업고객": "기업고객", "기업신용": "기업고객",
+    "소상공인": "소상공인", "소상공인고객": "소상공인",
+    "VIP고객": "VIP고객", "VIP": "VIP고객", "우수고객": "VIP고객",
+    "관리고객": "관리고객", "주의고객": "관리고객"
+}
+
+def _alternation(words) -> str:
+    """긴 표현 우선 alternation (같은 위치에서 "매우높음"이 "높음"보다 먼저 일치)"""
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+_COMPARISON = _alternation(COMPARISON_OPERATORS)
+
+# 엔티티 통합 스캐너: 텍스트를 한 번만 훑으면서 모든 규칙 엔티티를 추출
+# 각 대안의 바깥 이름 있는 그룹이 가장 늦게 닫히므로 match.lastgroup이 대안 이름(= 엔티티 추출기 이름)
+# - 키워드 대안(신용점수/대출)은 숫자를 lookahead로만 읽어, 같은 숫자를 범위/단위 숫자 대안이 이어서 매칭
+# - 숫자 대안은 선두 lookahead로 숫자가 아닌 위치를 건너뜀 (같은 위치에서는 날짜 > 범위 > 단위 붙은 숫자)
+# - 정규화 후 텍스트("750 원", "5 퍼센트")와 원문("750원", "5%") 모두 일치하도록 단위 앞 공백 허용
+ENTITY_SCANNER = re.compile(
+    rf'(?P<credit_score>(?:신용점수|크레딧스코어)(?:가|는|은|이)?\s*'
+    rf'(?=(?P<score>\d+)(?:\s*점)?(?:\s*(?P<score_cmp>{_COMPARISON}))?))'
+    rf'|(?P<loan_amount>대출(?:금액)?(?:이|은|는)?\s*'
+    rf'(?=(?P<loan_value>\d+)\s*원(?:\s*(?P<loan_cmp>{_COMPARISON}))?))'
+    rf'|(?P<risk_level>{_alternation(RISK_LEVELS)})'
+    rf'|(?P<customer_type>{_alternation(CUSTOMER_TYPE_ALIASES)})'
+    r'|(?=\d)(?:'
+    r'(?P<date_range>(?P<year>\d{4})\s*(?:년\s*|-)(?P<month>\d{1,2})\s*(?:월\s*|-)(?P<day>\d{1,2})(?:\s*일)?'
+    r'|(?P<md_month>\d{1,2})\s*월\s*(?P<md_day>\d{1,2})\s*일)'
+    r'|(?P<numeric_range>(?P<range_min>\d+)\s*(?:이상\s*(?P<range_max_le>\d+)\s*이하'
+    r'|부터\s*(?P<range_max_to>\d+)\s*까지'
+    r'|[~-]\s*(?P<range_max>\d+)))'
+    rf'|(?P<numeric_value>(?P<value>\d+)\s*(?P<unit>{_alternation(NUMERIC_UNITS)})'
+    rf'(?:\s*(?P<value_cmp>{_COMPARISON}))?(?P<loan_suffix>(?=\s*대출))?))'
+)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Aho-Corasick 다중 패턴 매칭 오토마톤
+딕셔너리 용어/동의어/SQL 패턴 키워드를 한 번에 컴파일하여
+질의를 한 번만 훑으면서 모든 출현 위치를 찾음
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+# (시작 오프셋, 끝 오프셋, 매칭된 표면형)
+Match = Tuple[int, int, str]
+
+class TermAutomaton:
+    """Aho-Corasick 오토마톤 (대소문자 구분, 문자 단위 전이)"""
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        # 상태별 전이/실패 링크/출력 (출력은 해당 상태에서 끝나는 패턴 길이 목록, 긴 것부터)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self.size = 0
+
+        for pattern in patterns:
+            self._add(pattern)
+        self._build_links()
+
+    def _add(self, pattern: str):
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        if len(pattern) not in self._output[state]:
+            self._output[state].append(len(pattern))
+            self.size += 1
+
+    def _build_links(self):
+        """BFS로 실패 링크를 계산하고 실패 상태의 출력을 합침"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                inherited = self._output[self._fail[next_state]]
+                if inherited:
+                    self._output[next_state] = sorted(set(self._output[next_state]) | set(inherited), reverse=True)
+
+    def find_all(self, text: str) -> List[Match]:
+        """겹치는 것을 포함한 모든 매칭 (끝 오프셋 순)"""
+        matches = []
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length in output[state]:
+                end = index + 1
+                matches.append((end - length, end, text[end - length:end]))
+        return matches
+
+    def find_longest(self, text: str) -> List[Match]:
+        """겹치지 않는 최장 일치 매칭 (왼쪽부터, 같은 시작 위치에서는 긴 패턴 우선)
+
+        짧은 동의어가 긴 용어의 일부를 가로채지 않도록 함 (예: "대출금액" 안의 "대출")
+        """
+        return self.select_longest(self.find_all(text))
+
+    @staticmethod
+    def select_longest(matches: List[Match]) -> List[Match]:
+        """매칭 목록에서 겹치지 않는 최장 일치만 선택"""
+        selected = []
+        position = 0
+        for start, end, surface in sorted(matches, key=lambda match: (match[0], -match[1])):
+            if start >= position:
+                selected.append((start, end, surface))
+                position = end
+        return selected
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RAG 컨텍스트 후처리
+검색 후보에 적응형 유사도 컷오프(절대/상대/knee), 근사 중복 제거(문자 shingle Jaccard), MMR 다양화,
+같은 파일 인접 청크 병합, 토큰 예산 초과 시 요약 대체를 적용하여 프롬프트에 들어갈 토큰을 줄임
+"""
+
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 인접 청크 병합 시 겹침으로 인정할 최소 문자 수 (우연한 일치 방지)
+MIN_OVERLAP_CHARS = 10
+
+def _shingles(text: str, size: int) -> set:
+    """공백 정규화 후 문자 n-gram 집합"""
+    compact = re.sub(r'\s+', ' ', text).strip()
+    if len(compact) <= size:
+        return {compact}
+    return {compact[i:i + size] for i in range(len(compact) - size + 1)}
+
+def _jaccard(a: set, b: set) -> float:
+    """두 집합의 Jaccard 유사도"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def _strip_overlap(previous: str, following: str) -> str:
+    """앞 청크 끝과 겹치는 뒤 청크의 앞부분을 제거"""
+    for size in range(min(len(previous), len(following)), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(following[:size]):
+            return following[size:].lstrip()
+    return following
+
+class ContextSelector:
+    """검색 후보 청크에서 프롬프트용 컨텍스트 청크를 선택"""
+
+    def __init__(self, token_counter, min_similarity: float = 0.2, mmr_lambda: float = 0.7,
+                 dedup_threshold: float = 0.8, shingle_size: int = 5, max_merge_tokens: Optional[int] = None,
+                 relative_cutoff: float = 0.0, knee_gap: float = 0.0):
+        self.token_counter = token_counter
+        self.min_similarity = min_similarity
+        # 최고 유사도 대비 비율 미만 청크 제외 (0이면 비활성화)
+        self.relative_cutoff = relative_cutoff
+        # 유사도 순으로 인접 후보 간 차이가 이 값 이상 벌어지는 지점에서 절단 (0이면 비활성화)
+        self.knee_gap = knee_gap
+        self.mmr_lambda = mmr_lambda
+        self.dedup_threshold = dedup_threshold
+        self.shingle_size = shingle_size
+        self.max_merge_tokens = max_merge_tokens
+
+        # 누적 통계
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "candidates": 0,
+            "below_threshold": 0,
+            "knee_cut": 0,
+            "empty_contexts": 0,
+            "duplicates_removed": 0,
+            "merged_chunks": 0,
+            "summarized_chunks": 0,
+            "tokens_before": 0,
+            "tokens_after": 0
+        }
+
+    @staticmethod
+    def _relevance(chunk: Dict) -> float:
+        """질문 관련도 (다중 도메인 검색은 전체 후보 기준 정규화 점수 사용)"""
+        return chunk.get("normalized_score", chunk["similarity_score"])
+
+    def _count_tokens(self, chunks: List[Dict]) -> int:
+        return sum(self.token_counter.count(chunk["content"]) for chunk in chunks)
+
+    def adaptive_cutoff(self, candidates: List[Dict]) -> Tuple[List[Dict], Dict]:
+        """절대/상대 유사도 컷오프와 knee 절단 -> (통과 청크(유사도 순), 컷오프 정보)"""
+        ordered = sorted(candidates, key=lambda c: c["similarity_score"], reverse=True)
+        best = ordered[0]["similarity_score"] if ordered else 0.0
+        threshold = max(self.min_similarity, best * self.relative_cutoff)
+        passed = [chunk for chunk in ordered if chunk["similarity_score"] >= threshold]
+
+        knee_cut = 0
+        if self.knee_gap > 0:
+            for i in range(1, len(passed)):
+                if passed[i - 1]["similarity_score"] - passed[i]["similarity_score"] >= self.knee_gap:
+                    knee_cut = len(passed) - i
+                    passed = passed[:i]
+                    break
+
+        return passed, {
+            "best_similarity": round(best, 4),
+            "cutoff_similarity": round(passed[-1]["similarity_score"], 4) if passed else None,
+            "below_threshold": len(ordered) - len(passed) - knee_cut,
+            "knee_cut": knee_cut,
+            "min_similarity": self.min_similarity,
+            "relative_cutoff": self.relative_cutoff,
+            "knee_gap": self.knee_gap
+        }
+
+    def _drop_duplicates(self, chunks: List[Dict]) -> Tuple[List[Dict], int]:
+        """관련도 순으로 보면서 이미 채택한 청크와 거의 같은 청크 제거"""
+        kept = []
+        removed = 0
+        for chunk in sorted(chunks, key=self._relevance, reverse=True):
+            chunk["_shingles"] = _shingles(chunk["content"], self.shingle_size)
+            if any(_jaccard(chunk["_shingles"], other["_shingles"]) >= self.dedup_threshold for other in kept):
+                removed += 1
+                continue
+            kept.append(chunk)
+        return kept, removed
+
+    def _pairwise_similarity(self, chunks: List[Dict]) -> np.ndarray:
+        """청크 간 유사도 행렬 (임베딩이 없으면 shingle Jaccard 사용)"""
+        if all(chunk.get("embedding") is not None for chunk in chunks):
+            vectors = np.asarray([chunk["embedding"] for chunk in chunks], dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+            return vectors @ vectors.T
+
+        size = len(chunks)
+        matrix = np.eye(size, dtype=np.float32)
+        for i in range(size):
+            for j in range(i + 1, size):
+                matrix[i, j] = matrix[j, i] = _jaccard(chunks[i]["_shingles"], chunks[j]["_shingles"])
+        return matrix
+
+    def _mmr(self, chunks: List[Dict], top_k: int) -> List[Dict]:
+        """최대 한계 관련도(MMR)로 top_k 선택"""
+        if len(chunks) <= 1:
+            return chunks[:top_k]
+
+        similarity = self._pairwise_similarity(chunks)
+        relevance = np.asarray([self._relevance(chunk) for chunk in chunks], dtype=np.float32)
+
+        selected = [int(np.argmax(relevance))]
+        remaining = set(range(len(chunks))) - set(selected)
+        while remaining and len(selected) < top_k:
+            candidates = sorted(remaining)
+            redundancy = similarity[np.ix_(candidates, selected)].max(axis=1)
+            scores = self.mmr_lambda * relevance[candidates] - (1 - self.mmr_lambda) * redundancy
+            best = candidates[int(np.argmax(scores))]
+            selected.append(best)
+            remaining.discard(best)
+
+        return [chunks[i] for i in selected]
+
+    @staticmethod
+    def _merge_summaries(target: Dict, source: Dict):
+        """병합 청크의 요약/핵심 사실 결합 (한쪽이라도 없으면 요약 사용 안 함)"""
+        if target.get("summary") and source.get("summary"):
+            target["summary"] = f"{target['summary']} {source['summary']}"
+            target["key_facts"] = "\n".join(filter(None, [target.get("key_facts"), source.get("key_facts")]))
+        else:
+            target.pop("summary", None)
+            target.pop("key_facts", None)
+
+    @staticmethod
+    def format_summary(metadata: Dict) -> str:
+        """요약 메타데이터를 컨텍스트 텍스트로 변환"""
+        text = f"[요약] {metadata['summary']}"
+        facts = [fact for fact in (metadata.get("key_facts") or "").split("\n") if fact.strip()]
+        if facts:
+            text += "\n[핵심 사실]\n" + "\n".join(f"- {fact}" for fact in facts)
+        return text
+
+    def _apply_token_budget(self, chunks: List[Dict], token_budget: int) -> int:
+        """토큰 예산 초과 시 하위 순위 청크부터 사전 계산된 요약으로 대체"""
+        total = self._count_tokens(chunks)
+        summarized = 0
+        for chunk in reversed(chunks):
+            if total <= token_budget:
+                break
+            if not chunk["metadata"].get("summary"):
+                continue
+            compact = self.format_summary(chunk["metadata"])
+            saved = self.token_counter.count(chunk["content"]) - self.token_counter.count(compact)
+            if saved <= 0:
+                continue
+            chunk["content"] = compact
+            chunk["summarized"] = True
+            total -= saved
+            summarized += 1
+        return summarized
+
+    def _merge_adjacent(self, chunks: List[Dict]) -> Tuple[List[Dict], int]:
+        """같은 파일의 연속 청크를 겹침 제거 후 하나로 병합"""
+        groups = {}
+        for chunk in chunks:
+            metadata = chunk["metadata"]
+            groups.setdefault((metadata.get("domain"), metadata.get("filename")), []).append(chunk)
+
+        merged = []
+        merged_count = 0
+        for group in groups.values():
+            group.sort(key=lambda c: c["metadata"].get("chunk_index", 0))
+            current = None
+            for chunk in group:
+                index = chunk["metadata"].get("chunk_index", 0)
+                if current is not None and index == current["metadata"]["chunk_end"] + 1:
+                    content = current["content"] + "\n" + _strip_overlap(current["content"], chunk["content"])
+                    if self.max_merge_tokens is None or self.token_counter.count(content) <= self.max_merge_tokens:
+                        current["content"] = content
+                        current["metadata"]["chunk_end"] = index
+                        self._merge_summaries(current["metadata"], chunk["metadata"])
+                        current["similarity_score"] = max(current["similarity_score"], chunk["similarity_score"])
+                        if "normalized_score" in chunk:
+                            current["normalized_score"] = max(current.get("normalized_score", 0.0),
+                                                              chunk["normalized_score"])
+                        merged_count += 1
+                        continue
+
+                if current is not None:
+                    merged.append(current)
+                current = dict(chunk)
+                current["metadata"] = dict(chunk["metadata"], chunk_end=index)
+            if current is not None:
+                merged.append(current)
+
+        merged.sort(key=lambda c: (self._relevance(c), c["similarity_score"]), reverse=True)
+        return merged, merged_count
+
+    def select(self, candidates: List[Dict], top_k: int,
+               token_budget: Optional[int] = None) -> Tuple[List[Dict], Dict]:
+        """후보 청크에서 컨텍스트 청크 선택 -> (선택 청크, 호출 통계)"""
+        # 후처리 없이 상위 top_k를 그대로 쓰는 경우의 토큰 수 (절감량 기준)
+        baseline = sorted(candidates, key=lambda c: c.get("rank", 0))[:top_k]
+        tokens_before = self._count_tokens(baseline)
+
+        passed, cutoff = self.adaptive_cutoff(candidates)
+
+        unique, duplicates = self._drop_duplicates(passed)
+        diversified = self._mmr(unique, top_k)
+        selected, merged_count = self._merge_adjacent(diversified)
+        summarized = self._apply_token_budget(selected, token_budget) if token_budget else 0
+
+        for i, chunk in enumerate(selected):
+            chunk.pop("_shingles", None)
+            chunk.pop("embedding", None)
+            chunk["rank"] = i + 1
+
+        tokens_after = self._count_tokens(selected)
+        call_stats = {
+            "candidates": len(candidates),
+            "selected": len(selected),
+            "chosen_k": len(diversified),
+            "below_threshold": cutoff["below_threshold"],
+            "knee_cut": cutoff["knee_cut"],
+            "cutoff": cutoff,
+            "duplicates_removed": duplicates,
+            "merged_chunks": merged_count,
+            "summarized_chunks": summarized,
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "tokens_saved": tokens_before - tokens_after
+        }
+
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["empty_contexts"] += not selected
+            for key in ("candidates", "below_threshold", "knee_cut", "duplicates_removed", "merged_chunks",
+                        "summarized_chunks", "tokens_before", "tokens_after"):
+                self.stats[key] += call_stats[key]
+
+        return selected, call_stats
+
+    def get_stats(self) -> Dict:
+        """누적 후처리 통계"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+        stats["min_similarity"] = self.min_similarity
+        stats["relative_cutoff"] = self.relative_cutoff
+        stats["knee_gap"] = self.knee_gap
+        stats["mmr_lambda"] = self.mmr_lambda
+        stats["dedup_threshold"] = self.dedup_threshold
+        return stats
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RAG 도메인 자동 라우팅
+도메인별 청크 임베딩 중심 벡터와 문자 bigram 키워드 프로필을 색인 시 증분 갱신하고,
+도메인이 지정되지 않은 질문을 가장 가까운 1~2개 도메인 컬렉션으로 보내 검색 범위를 줄임
+"""
+
+import os
+import re
+import json
+import time
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# 키워드 프로필에 남길 도메인별 최대 bigram 수 (저빈도 항목부터 제거)
+MAX_PROFILE_TERMS = 5000
+
+def _keyword_terms(text: str) -> set:
+    """한글 어절의 문자 bigram + 영문/숫자 단어 (조사가 붙어도 일치하도록 bigram 사용)"""
+    terms = set()
+    for word in re.findall(r'[가-힣]+|[A-Za-z][A-Za-z0-9_]+', text.lower()):
+        if '가' <= word[0] <= '힣':
+            terms.update(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            terms.add(word)
+    return terms
+
+class DomainProfile:
+    """단일 도메인의 임베딩 합/청크 수/키워드 문서 빈도"""
+
+    def __init__(self):
+        self.count = 0
+        self.vector_sum = None
+        self.term_counts = Counter()
+
+    def add(self, embeddings: Iterable[List[float]], documents: Iterable[str], sign: int = 1):
+        vectors = np.asarray(list(embeddings), dtype=np.float64)
+        if vectors.size:
+            total = vectors.sum(axis=0) * sign
+            self.vector_sum = total if self.vector_sum is None else self.vector_sum + total
+            self.count = max(self.count + sign * len(vectors), 0)
+        for document in documents:
+            for term in _keyword_terms(document):
+                self.term_counts[term] += sign
+                if self.term_counts[term] <= 0:
+                    del self.term_counts[term]
+
+    def mean(self) -> Optional[np.ndarray]:
+        if not self.count or self.vector_sum is None:
+            return None
+        return self.vector_sum / self.count
+
+    def to_dict(self) -> Dict:
+        terms = dict(self.term_counts.most_common(MAX_PROFILE_TERMS))
+        return {
+            "count": self.count,
+            "vector_sum": self.vector_sum.tolist() if self.vector_sum is not None else None,
+            "term_counts": terms
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "DomainProfile":
+        profile = cls()
+        profile.count = data.get("count", 0)
+        if data.get("vector_sum") is not None:
+            profile.vector_sum = np.asarray(data["vector_sum"], dtype=np.float64)
+        profile.term_counts = Counter(data.get("term_counts", {}))
+        return profile
+
+class DomainRouter:
+    """도메인 중심 벡터 + 키워드 프로필 기반 질문 라우팅"""
+
+    def __init__(self, domains: Iterable[str], profile_path: Optional[str] = None,
+                 keyword_weight: Optional[float] = None, max_domains: Optional[int] = None,
+                 margin: Optional[float] = None):
+        self.domains = list(domains)
+        self.profile_path = profile_path
+        # 중심 벡터 유사도와 키워드 점수의 가중 합
+        self.keyword_weight = keyword_weight if keyword_weight is not None else \
+            float(os.getenv('RAG_ROUTER_KEYWORD_WEIGHT', '0.3'))
+        self.max_domains = max_domains or int(os.getenv('RAG_ROUTER_MAX_DOMAINS', '2'))
+        # 1순위와 점수 차이가 이 값 이하인 도메인은 함께 검색 (애매한 질문의 재현율 보호)
+        self.margin = margin if margin is not None else float(os.getenv('RAG_ROUTER_MARGIN', '0.05'))
+
+        self._lock = threading.Lock()
+        self.profiles = {domain: DomainProfile() for domain in self.domains}
+        self.stats = {
+            "routed": 0,
+            "routed_domains": 0,
+            "latency_ms_total": 0.0,
+            "latency_ms_max": 0.0,
+            "shadow_checked": 0,
+            "shadow_top1_hits": 0,
+            "shadow_routed_hits": 0
+        }
+        self.loaded = self.load()
+
+    def observe(self, domain: str, embeddings: List[List[float]], documents: List[str]):
+        """색인된 청크로 도메인 프로필 증분 갱신"""
+        if domain not in self.profiles:
+            return
+        with self._lock:
+            self.profiles[domain].add(embeddings, documents)
+
+    def forget(self, domain: str, embeddings: List[List[float]], documents: List[str]):
+        """삭제된 청크를 도메인 프로필에서 차감"""
+        if domain not in self.profiles:
+            return
+        with self._lock:
+            self.profiles[domain].add(embeddings, documents, sign=-1)
+
+    def rebuild(self, domain_collections: Dict, batch_size: int = 1000) -> Dict:
+        """도메인 컬렉션 전체를 읽어 프로필 재구축 (스냅샷 적재 후/프로필 파일이 없을 때)"""
+        started = time.perf_counter()
+        profiles = {domain: DomainProfile() for domain in self.domains}
+        for domain, collection in domain_collections.items():
+            if domain not in profiles:
+                continue
+            offset = 0
+            while True:
+                page = collection.get(include=["embeddings", "documents"], limit=batch_size, offset=offset)
+                if not page["ids"]:
+                    break
+                profiles[domain].add(page["embeddings"], page["documents"])
+                if len(page["ids"]) < batch_size:
+                    break
+                offset += batch_size
+
+        with self._lock:
+            self.profiles = profiles
+        self.save()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        counts = {domain: profile.count for domain, profile in profiles.items()}
+        print(f"🧭 도메인 프로필 재구축: {counts} ({elapsed_ms:.1f}ms)")
+        return {"success": True, "counts": counts, "elapsed_ms": round(elapsed_ms, 1)}
+
+    @staticmethod
+    def _unit(vector: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _score(self, question_embedding: List[float], question: str) -> Dict[str, float]:
+        """도메인별 라우팅 점수 (중심화한 중심 벡터 코사인 + 키워드 IDF 가중 일치율)"""
+        query = self._unit(np.asarray(question_embedding, dtype=np.float64))
+        terms = _keyword_terms(question)
+
+        with self._lock:
+            active = {domain: profile for domain, profile in self.profiles.items() if profile.count}
+            if not active:
+                return {}
+
+            # 모든 도메인에 공통인 방향(전체 평균)을 빼야 도메인 간 차이가 드러남
+            means = {domain: profile.mean() for domain, profile in active.items()}
+            if len(active) > 1:
+                overall = sum(profile.vector_sum for profile in active.values()) / \
+                    sum(profile.count for profile in active.values())
+                centroids = {domain: self._unit(mean - overall) for domain, mean in means.items()}
+                query = self._unit(query - overall)
+            else:
+                centroids = {domain: self._unit(mean) for domain, mean in means.items()}
+
+            # 키워드 점수: 질문 bigram마다 해당 도메인이 차지하는 출현 비중의 평균
+            # (모든 도메인에 고르게 나오는 bigram은 비중이 1/도메인 수로 수렴해 변별력이 낮아짐)
+            totals = {term: sum(profile.term_counts.get(term, 0) for profile in active.values()) for term in terms}
+            known = [term for term, total in totals.items() if total]
+
+            scores = {}
+            for domain, profile in active.items():
+                semantic = float(centroids[domain] @ query)
+                keyword = sum(profile.term_counts.get(term, 0) / totals[term] for term in known) / len(known) \
+                    if known else 0.0
+                scores[domain] = (1 - self.keyword_weight) * semantic + self.keyword_weight * keyword
+        return scores
+
+    def route(self, question_embedding: List[float], question: str) -> Optional[Dict]:
+        """질문을 검색할 도메인 목록 결정 -> {"domains", "scores", "elapsed_ms"} (프로필이 없으면 None)"""
+        started = time.perf_counter()
+        scores = self._score(question_embedding, question)
+        if not scores:
+            return None
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        domains = [ranked[0]]
+        for domain in ranked[1:self.max_domains]:
+            if scores[ranked[0]] - scores[domain] <= self.margin:
+                domains.append(domain)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            self.stats["routed"] += 1
+            self.stats["routed_domains"] += len(domains)
+            self.stats["latency_ms_total"] += elapsed_ms
+            self.stats["latency_ms_max"] = max(self.stats["latency_ms_max"], elapsed_ms)
+
+        return {
+            "domains": domains,
+            "scores": {domain: round(score, 4) for domain, score in scores.items()},
+            "elapsed_ms": round(elapsed_ms, 3)
+        }
+
+    def record_shadow(self, routing: Optional[Dict], expected_domains: List[str]):
+        """도메인이 지정된 질문으로 라우팅 정확도 측정 (검색에는 영향 없음)"""
+        if not routing:
+            return
+        top1_hit = routing["domains"][0] in expected_domains
+        routed_hit = any(domain in expected_domains for domain in routing["domains"])
+        with self._lock:
+            self.stats["shadow_checked"] += 1
+            self.stats["shadow_top1_hits"] += top1_hit
+            self.stats["shadow_routed_hits"] += routed_hit
+            checked = self.stats["shadow_checked"]
+            accuracy = self.stats["shadow_top1_hits"] / checked
+        if not top1_hit:
+            print(f"🧭 라우팅 불일치: 지정 {expected_domains}, 예측 {routing['domains']} "
+                  f"(누적 정확도 {accuracy:.3f}, {checked}건)")
+
+    def save(self):
+        """프로필을 JSON으로 저장 (임시 파일 작성 후 교체)"""
+        if not self.profile_path:
+            return
+        with self._lock:
+            data = {domain: profile.to_dict() for domain, profile in self.profiles.items()}
+        try:
+            os.makedirs(os.path.dirname(self.profile_path), exist_ok=True)
+            temp_path = f"{self.profile_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"domains": data, "saved_at": time.time()}, f, ensure_ascii=False)
+            os.replace(temp_path, self.profile_path)
+        except Exception as e:
+            print(f"⚠️ 도메인 프로필 저장 실패: {e}")
+
+    def load(self) -> bool:
+        """저장된 프로필 로드 (없거나 손상되면 False)"""
+        if not self.profile_path or not os.path.exists(self.profile_path):
+            return False
+        try:
+            with open(self.profile_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)["domains"]
+            with self._lock:
+                for domain in self.domains:
+                    if domain in data:
+                        self.profiles[domain] = DomainProfile.from_dict(data[domain])
+            return True
+        except Exception as e:
+            print(f"⚠️ 도메인 프로필 로드 실패: {e}")
+            return False
+
+    def get_stats(self) -> Dict:
+        """라우팅 통계 (지연, 그림자 평가 정확도, 도메인별 청크 수)"""
+        with self._lock:
+            stats = dict(self.stats)
+            counts = {domain: profile.count for domain, profile in self.profiles.items()}
+        routed = stats["routed"] or 1
+        checked = stats["shadow_checked"] or 1
+        return {
+            "routed": stats["routed"],
+            "avg_domains": round(stats["routed_domains"] / routed, 2),
+            "avg_latency_ms": round(stats["latency_ms_total"] / routed, 3),
+            "max_latency_ms": round(stats["latency_ms_max"], 3),
+            "shadow_checked": stats["shadow_checked"],
+            "top1_accuracy": round(stats["shadow_top1_hits"] / checked, 4),
+            "routed_accuracy": round(stats["shadow_routed_hits"] / checked, 4),
+            "domain_chunks": counts,
+            "keyword_weight": self.keyword_weight,
+            "margin": self.margin
+        }
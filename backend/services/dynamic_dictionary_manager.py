@@ -24,6 +24,10 @@ class DynamicDictionaryManager:
             
         self.credit_terms = {}
         self.sql_patterns = {}
+        # 딕셔너리 변경 시마다 증가 (전처리 오토마톤 등 파생 구조의 재구축 판단용)
+        self.version = 0
+        # 정규화된 표면형(용어/동의어) -> [(카테고리, 용어)] 역색인
+        self.surface_index = {}
         self.backup_dir = os.path.join(self.dictionaries_dir, "backups")
         
         # 디렉토리 생성
@@ -56,6 +60,73 @@ class DynamicDictionaryManager:
                 
         except Exception as e:
             print(f"❌ 딕셔너리 로드 중 오류: {e}")
+        finally:
+            self._rebuild_surface_index()
+            self._mark_changed()
+    
+    def _mark_changed(self):
+        """딕셔너리 변경 기록 (버전 증가)"""
+        self.version += 1
+    
+    @staticmethod
+    def normalize_surface(surface: str) -> str:
+        """표면형 정규화 (공백 제거, 영문 소문자화)"""
+        return "".join(str(surface).split()).lower()
+    
+    @staticmethod
+    def _term_surfaces(term: str, info: Dict[str, Any]) -> List[str]:
+        """용어의 정규화된 표면형 목록 (용어 자체 + 동의어, 중복 제거)"""
+        surfaces = []
+        for surface in [term] + list(info.get("synonyms", [])):
+            normalized = DynamicDictionaryManager.normalize_surface(surface)
+            if normalized and normalized not in surfaces:
+                surfaces.append(normalized)
+        return surfaces
+    
+    def _rebuild_surface_index(self):
+        """역색인 전체 재구축 (로드/가져오기 시)"""
+        surface_index = {}
+        for category, terms in self.credit_terms.items():
+            for term, info in terms.items():
+                for surface in self._term_surfaces(term, info):
+                    surface_index.setdefault(surface, []).append((category, term))
+        self.surface_index = surface_index
+    
+    def _index_term(self, category: str, term: str, info: Optional[Dict[str, Any]],
+                    old_info: Optional[Dict[str, Any]] = None):
+        """용어 하나의 역색인 증분 갱신 (info가 None이면 삭제)"""
+        key = (category, term)
+        old_surfaces = self._term_surfaces(term, old_info) if old_info is not None else []
+        new_surfaces = self._term_surfaces(term, info) if info is not None else []
+        
+        for surface in old_surfaces:
+            if surface in new_surfaces:
+                continue
+            entries = self.surface_index.get(surface, [])
+            if key in entries:
+                entries.remove(key)
+            if not entries:
+                self.surface_index.pop(surface, None)
+        for surface in new_surfaces:
+            entries = self.surface_index.setdefault(surface, [])
+            if key not in entries:
+                entries.append(key)
+    
+    def lookup_surface(self, surface: str) -> List[Dict]:
+        """표면형(용어 또는 동의어)으로 용어 항목 조회 -> [{"category", "term", "info", "match_type"}]
+        
+        용어 자체와 일치하는 항목을 동의어 일치보다 먼저 반환
+        """
+        normalized = self.normalize_surface(surface)
+        results = []
+        for category, term in self.surface_index.get(normalized, []):
+            info = self.credit_terms.get(category, {}).get(term)
+            if info is None:
+                continue
+            match_type = "exact" if self.normalize_surface(term) == normalized else "synonym"
+            results.append({"category": category, "term": term, "info": info, "match_type": match_type})
+        results.sort(key=lambda result: result["match_type"] != "exact")
+        return results
     
     def reload_dictionaries(self):
         """딕셔너리 재로드"""
@@ -132,7 +203,10 @@ class DynamicDictionaryManager:
             if category not in self.credit_terms:
                 self.credit_terms[category] = {}
             
+            old_info = self.credit_terms[category].get(term)
             self.credit_terms[category][term] = info
+            self._index_term(category, term, info, old_info)
+            self._mark_changed()
             self.save_credit_terms()
             
             print(f"✅ 신용평가 도메인 용어 추가 완료: {category}.{term}")
@@ -151,7 +225,10 @@ class DynamicDictionaryManager:
             if term not in self.credit_terms[category]:
                 return {"success": False, "error": f"용어가 존재하지 않습니다: {term}"}
             
+            old_info = self.credit_terms[category][term]
             self.credit_terms[category][term] = info
+            self._index_term(category, term, info, old_info)
+            self._mark_changed()
             self.save_credit_terms()
             
             print(f"✅ 신용평가 도메인 용어 수정 완료: {category}.{term}")
@@ -171,6 +248,8 @@ class DynamicDictionaryManager:
                 return {"success": False, "error": f"용어가 존재하지 않습니다: {term}"}
             
             deleted_info = self.credit_terms[category].pop(term)
+            self._index_term(category, term, None, deleted_info)
+            self._mark_changed()
             self.save_credit_terms()
             
             print(f"✅ 신용평가 도메인 용어 삭제 완료: {category}.{term}")
@@ -187,6 +266,7 @@ class DynamicDictionaryManager:
                 self.sql_patterns[category] = {}
             
             self.sql_patterns[category][korean] = sql
+            self._mark_changed()
             self.save_sql_patterns()
             
             print(f"✅ SQL 패턴 추가 완료: {category}.{korean} → {sql}")
@@ -207,6 +287,7 @@ class DynamicDictionaryManager:
             
             old_sql = self.sql_patterns[category][korean]
             self.sql_patterns[category][korean] = sql
+            self._mark_changed()
             self.save_sql_patterns()
             
             print(f"✅ SQL 패턴 수정 완료: {category}.{korean} → {sql} (이전: {old_sql})")
@@ -226,6 +307,7 @@ class DynamicDictionaryManager:
                 return {"success": False, "error": f"패턴이 존재하지 않습니다: {korean}"}
             
             deleted_sql = self.sql_patterns[category].pop(korean)
+            self._mark_changed()
             self.save_sql_patterns()
             
             print(f"✅ SQL 패턴 삭제 완료: {category}.{korean} → {deleted_sql}")
@@ -236,15 +318,14 @@ class DynamicDictionaryManager:
             return {"success": False, "error": str(e)}
     
     def get_term_info(self, term: str) -> Optional[Dict]:
-        """용어 정보 조회"""
-        for category, terms in self.credit_terms.items():
-            for key, info in terms.items():
-                if term == key or term in info.get("synonyms", []):
-                    return {
-                        "category": category,
-                        "term": key,
-                        "info": info
-                    }
+        """용어 정보 조회 (역색인 O(1) 조회, 용어 자체 일치 우선)"""
+        results = self.lookup_surface(term)
+        if results:
+            return {
+                "category": results[0]["category"],
+                "term": results[0]["term"],
+                "info": results[0]["info"]
+            }
         return None
     
     def get_sql_mapping(self, term: str) -> str:
@@ -264,6 +345,8 @@ class DynamicDictionaryManager:
         """용어 검색"""
         results = []
         query_lower = query.lower()
+        # 동의어 일치는 역색인으로 확인 (용어별 동의어 목록 순회 제거)
+        synonym_hits = {(entry["category"], entry["term"]) for entry in self.lookup_surface(query)}
         
         for category, terms in self.credit_terms.items():
             for key, info in terms.items():
@@ -284,16 +367,13 @@ class DynamicDictionaryManager:
                         "info": info
                     })
                 # 동의어 매칭
-                elif "synonyms" in info:
-                    for synonym in info["synonyms"]:
-                        if query_lower == synonym.lower():
-                            results.append({
-                                "category": category,
-                                "term": key,
-                                "match_type": "synonym",
-                                "info": info
-                            })
-                            break
+                elif (category, key) in synonym_hits:
+                    results.append({
+                        "category": category,
+                        "term": key,
+                        "match_type": "synonym",
+                        "info": info
+                    })
         
         return results
     
@@ -303,7 +383,9 @@ class DynamicDictionaryManager:
             "credit_terms": {},
             "sql_patterns": {},
             "total_terms": 0,
-            "total_patterns": 0
+            "total_patterns": 0,
+            "indexed_surfaces": len(self.surface_index),
+            "version": self.version
         }
         
         # 신용평가 도메인 용어 통계
@@ -338,10 +420,13 @@ class DynamicDictionaryManager:
             # 데이터 가져오기
             if "credit_terms" in data:
                 self.credit_terms = data["credit_terms"]
+                self._rebuild_surface_index()
+                self._mark_changed()
                 self.save_credit_terms()
             
             if "sql_patterns" in data:
                 self.sql_patterns = data["sql_patterns"]
+                self._mark_changed()
                 self.save_sql_patterns()
             
             print(f"✅ 딕셔너리 가져오기 완료")
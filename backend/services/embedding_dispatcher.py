@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+임베딩 요청 마이크로 배칭
+짧은 시간 안에 동시에 들어온 embed_query 호출을 모아 프로바이더의 쿼리 배치 API(embed_queries)로 처리
+embed_queries가 없으면 쿼리/문서 임베딩이 다른 모델(e5/bge 지시문 등)을 위해 건별 embed_query로 처리
+"""
+
+import queue
+import threading
+import time
+from typing import Dict, List
+
+from langchain.embeddings.base import Embeddings
+
+class _PendingQuery:
+    """배치 처리를 기다리는 단일 쿼리"""
+
+    __slots__ = ("text", "event", "embedding", "error")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.event = threading.Event()
+        self.embedding = None
+        self.error = None
+
+class EmbeddingDispatcher(Embeddings):
+    """동시 쿼리 임베딩을 최대 배치 크기/대기 시간 기준으로 묶는 래퍼"""
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 num_workers: int = 1):
+        self.embeddings = embeddings
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        # 원격 API는 배치 요청 여러 개를 동시에 보낼 수 있도록 워커 수 조절
+        self.num_workers = max(1, num_workers)
+
+        self._queue = queue.Queue()
+        self._workers: List[threading.Thread] = []
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._busy = 0  # 처리 중인 배치 수
+        self.stats = {"queries": 0, "batches": 0, "max_batch": 0, "errors": 0}
+
+    def _ensure_worker(self):
+        """배치 워커 스레드 지연 시작"""
+        if len(self._workers) == self.num_workers and all(worker.is_alive() for worker in self._workers):
+            return
+        with self._worker_lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            while len(self._workers) < self.num_workers:
+                worker = threading.Thread(target=self._run, name=f"embedding-dispatcher-{len(self._workers)}",
+                                          daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _collect_batch(self) -> List[_PendingQuery]:
+        """첫 요청 도착 후 max_wait 동안 또는 배치가 찰 때까지 수집"""
+        batch = [self._queue.get()]
+        # 다른 배치가 처리 중이 아니고 대기 요청도 없으면 (저부하) 기다리지 않고 바로 처리
+        with self._stats_lock:
+            busy = self._busy
+        if busy == 0 and self._queue.empty():
+            return batch
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            with self._stats_lock:
+                self._busy += 1
+            try:
+                self._embed_batch(batch)
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+
+            with self._stats_lock:
+                self._busy -= 1
+                self.stats["queries"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+                self.stats["errors"] += sum(1 for pending in batch if pending.error is not None)
+
+            for pending in batch:
+                pending.event.set()
+
+    def _embed_batch(self, batch: List[_PendingQuery]):
+        """배치 쿼리 임베딩 (쿼리 배치 API가 없으면 건별 embed_query)"""
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        if embed_queries is None:
+            for pending in batch:
+                try:
+                    self._set_embedding(pending, self.embeddings.embed_query(pending.text))
+                except Exception as e:
+                    pending.error = e
+            return
+
+        embeddings = embed_queries([pending.text for pending in batch])
+        # 벡터 수가 요청 수와 다르면 어느 요청의 벡터인지 알 수 없으므로 배치 전체를 실패 처리
+        if embeddings is None or len(embeddings) != len(batch):
+            raise ValueError(f"임베딩 개수 불일치: 요청 {len(batch)}개, 응답 "
+                             f"{0 if embeddings is None else len(embeddings)}개")
+        for pending, embedding in zip(batch, embeddings):
+            self._set_embedding(pending, embedding)
+
+    @staticmethod
+    def _set_embedding(pending: _PendingQuery, embedding):
+        """빈 벡터/0 벡터(프로바이더 폴백 값)는 검색/캐시되지 않도록 오류로 처리"""
+        if embedding is None or len(embedding) == 0 or not any(embedding):
+            pending.error = ValueError(f"유효하지 않은 쿼리 임베딩입니다 (빈 벡터 또는 0 벡터): {pending.text[:50]}")
+        else:
+            pending.embedding = embedding
+
+    def embed_query(self, text: str) -> List[float]:
+        """쿼리를 배치 큐에 넣고 결과를 기다림"""
+        pending = _PendingQuery(text)
+        self._ensure_worker()
+        self._queue.put(pending)
+        pending.event.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.embedding
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """문서 임베딩은 이미 배치이므로 그대로 위임"""
+        return self.embeddings.embed_documents(texts)
+
+    def get_stats(self) -> Dict:
+        """배칭 통계"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["avg_batch"] = round(stats["queries"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["max_batch_size"] = self.max_batch_size
+        stats["max_wait_ms"] = self.max_wait * 1000
+        stats["workers"] = self.num_workers
+        return stats
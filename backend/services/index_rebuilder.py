@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RAG 벡터 인덱스(HNSW) 재구축 작업
+지정한 HNSW 파라미터로 새 컬렉션을 만들어 복사한 뒤 원자적으로 교체하고,
+교체 전후 평가 질문 세트의 recall@k와 쿼리 지연을 비교
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from services.retrieval_evaluation import load_evaluation_set, evaluate_retrieval
+
+class IndexRebuilder:
+    """컬렉션 재구축 백그라운드 작업 (한 번에 하나만 실행)"""
+
+    def __init__(self, rag_service, evaluation_set: Optional[str] = None):
+        self.rag_service = rag_service
+        self.evaluation_set = evaluation_set
+
+        self.last_report = None
+        self._run_lock = threading.Lock()
+        self._thread = None
+
+    def _evaluation_questions(self, logical_name: str) -> List[Dict]:
+        """컬렉션 범위에 맞는 평가 질문 (도메인 컬렉션은 해당 도메인 질문만)"""
+        try:
+            questions = load_evaluation_set(self.evaluation_set)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ 평가 질문 세트를 불러오지 못했습니다: {e}")
+            return []
+        if logical_name == "rag_documents":
+            return questions
+        domain = logical_name[len("rag_"):]
+        return [question for question in questions if question.get("domain") == domain]
+
+    def evaluate(self, logical_name: str, top_k: int = 5) -> Optional[Dict]:
+        """컬렉션 검색 품질/지연 측정 (전체 컬렉션은 라우팅 없이 직접 검색)"""
+        questions = self._evaluation_questions(logical_name)
+        if not questions:
+            return None
+        if logical_name == "rag_documents":
+            result = evaluate_retrieval(self.rag_service, questions, top_k, scope="global", routing=False)
+        else:
+            result = evaluate_retrieval(self.rag_service, questions, top_k, scope="domain")
+        result.pop("misses", None)
+        return result
+
+    def _run(self, logical_name: str, hnsw: Dict, evaluate: bool, top_k: int):
+        with self._run_lock:
+            report = {
+                "collection": logical_name,
+                "requested_hnsw": hnsw,
+                "started_at": datetime.now().isoformat(),
+                "status": "running"
+            }
+            self.last_report = report
+            try:
+                if evaluate:
+                    report["before"] = self.evaluate(logical_name, top_k)
+                report["rebuild"] = self.rag_service.rebuild_collection(logical_name, hnsw)
+                if evaluate:
+                    report["after"] = self.evaluate(logical_name, top_k)
+                report["status"] = "completed"
+            except Exception as e:
+                print(f"❌ {logical_name} 인덱스 재구축 실패: {e}")
+                report["status"] = "failed"
+                report["error"] = str(e)
+            report["finished_at"] = datetime.now().isoformat()
+
+    def start(self, logical_name: str, hnsw: Optional[Dict] = None, evaluate: bool = True,
+              top_k: int = 5) -> Dict:
+        """재구축 작업 시작 (이미 실행 중이면 거부)"""
+        if self._run_lock.locked() or (self._thread is not None and self._thread.is_alive()):
+            return {"success": False, "error": "이미 인덱스 재구축이 진행 중입니다."}
+
+        self._thread = threading.Thread(
+            target=self._run, args=(logical_name, hnsw or {}, evaluate, top_k),
+            name="rag-index-rebuild", daemon=True
+        )
+        self._thread.start()
+        print(f"🏗️ {logical_name} 인덱스 재구축 시작: {hnsw or '기존 파라미터'}")
+        return {"success": True, "collection": logical_name, "hnsw": hnsw or {}}
+
+    def get_status(self) -> Dict:
+        """진행 여부 및 마지막 재구축 결과"""
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "last_report": self.last_report
+        }
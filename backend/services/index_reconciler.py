@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RAG 파일 시스템 ↔ 벡터 DB 정합성 점검 및 압축
+RAG 폴더(config.UPLOAD_FOLDER)의 파일과 Chroma 청크 메타데이터(domain, filename)를 비교하여
+미색인/변경 파일 재색인, 고아 청크 삭제(RAG_RECONCILE_DELETE_ORPHANS 지정 시),
+chroma.sqlite3 VACUUM(RAG_RECONCILE_COMPACT 지정 시)
+시작 시/주기 점검은 모두 명시적으로 켠 경우에만 실행 (기본은 /api/rag/reconcile 수동 실행)
+"""
+
+import os
+import gc
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config.config import config
+from services.rag_service import get_extractor
+
+# 메타데이터 스캔 페이지 크기
+SCAN_PAGE_SIZE = 1000
+
+def _directory_size(path: str) -> int:
+    """디렉토리 전체 파일 크기 (bytes)"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def _current_rss() -> Optional[int]:
+    """현재 프로세스 RSS (bytes, 측정 불가 시 None)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class IndexReconciler:
+    """파일 시스템과 벡터 DB의 불일치를 찾아 복구하는 백그라운드 작업"""
+
+    def __init__(self, rag_service, rag_folder: str, interval: Optional[int] = None):
+        self.rag_service = rag_service
+        self.rag_folder = rag_folder
+        # 시작 시/주기 점검은 미색인 파일 전체를 임베딩할 수 있으므로 기본 비활성화
+        self.interval = interval if interval is not None else int(os.getenv('RAG_RECONCILE_INTERVAL', '0'))
+        self.run_on_startup = os.getenv('RAG_RECONCILE_ON_STARTUP', 'false').lower() == 'true'
+        # VACUUM은 Chroma 클라이언트와 별도 sqlite 연결로 실행되므로 명시적으로 켠 경우에만
+        self.compact = os.getenv('RAG_RECONCILE_COMPACT', 'false').lower() == 'true'
+        # 파일이 없는 청크(고아) 삭제는 명시적으로 켠 경우에만 (기본은 보고만)
+        self.delete_orphans = os.getenv('RAG_RECONCILE_DELETE_ORPHANS', 'false').lower() == 'true'
+
+        self.last_report = None
+        self.runs = 0
+        self._run_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def scan_files(self) -> Dict[Tuple[str, str], Dict]:
+        """디스크의 색인 대상 파일 -> {(domain, filename): {"filepath", "mtime"}}"""
+        files = {}
+        for domain in config.RAG_DOMAINS:
+            domain_path = os.path.join(self.rag_folder, domain)
+            if not os.path.isdir(domain_path):
+                continue
+            for filename in os.listdir(domain_path):
+                filepath = os.path.join(domain_path, filename)
+                if os.path.isfile(filepath) and get_extractor(filename) is not None:
+                    files[(domain, filename)] = {"filepath": filepath, "mtime": os.path.getmtime(filepath)}
+        return files
+
+    @staticmethod
+    def scan_collection(collection) -> Dict[Tuple[str, str], Dict[str, str]]:
+        """컬렉션 청크 메타데이터 -> {(domain, filename): {chunk_id: (processed_at, file_sha256)}}"""
+        documents = {}
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=SCAN_PAGE_SIZE, offset=offset)
+            ids = page["ids"]
+            for chunk_id, metadata in zip(ids, page["metadatas"]):
+                metadata = metadata or {}
+                key = (metadata.get("domain"), metadata.get("filename"))
+                documents.setdefault(key, {})[chunk_id] = (
+                    metadata.get("processed_at", ""), metadata.get("file_sha256")
+                )
+            if len(ids) < SCAN_PAGE_SIZE:
+                break
+            offset += SCAN_PAGE_SIZE
+        return documents
+
+    def _find_drift(self, files: Dict, indexed: Dict, domain_indexed: Dict) -> Dict:
+        """디스크/전체 컬렉션/도메인 컬렉션 비교 결과"""
+        orphaned = sorted(key for key in set(indexed) | set(domain_indexed) if key not in files)
+        missing = sorted(key for key in files if key not in indexed and key not in domain_indexed)
+
+        stale, mismatched, leftovers = [], [], {}
+        for key in sorted(set(files) & (set(indexed) | set(domain_indexed))):
+            chunks = indexed.get(key, {})
+            domain_chunks = domain_indexed.get(key, {})
+
+            # 전체 컬렉션과 도메인 컬렉션의 청크 구성이 다르면 재색인
+            if set(chunks) != set(domain_chunks):
+                mismatched.append(key)
+                continue
+
+            # 색인 이후 수정된 파일은 재색인 (스냅샷으로 복원한 노드처럼 mtime만 바뀐 경우는 체크섬으로 확인)
+            latest, latest_sha256 = max(chunks.values(), key=lambda value: value[0])
+            try:
+                processed_at = datetime.fromisoformat(latest).timestamp()
+            except ValueError:
+                processed_at = 0
+            if files[key]["mtime"] > processed_at:
+                if latest_sha256 is None or \
+                        self.rag_service._file_sha256(files[key]["filepath"]) != latest_sha256:
+                    stale.append(key)
+                    continue
+
+            # 더 짧은 내용으로 재색인되며 남은 이전 청크
+            old_ids = [chunk_id for chunk_id, (at, _) in chunks.items() if at != latest]
+            if old_ids:
+                leftovers[key] = old_ids
+
+        return {
+            "orphaned": orphaned,
+            "missing": missing,
+            "stale": stale,
+            "mismatched": mismatched,
+            "leftovers": leftovers
+        }
+
+    def _compact(self) -> Dict:
+        """삭제된 임베딩이 차지하던 공간을 VACUUM으로 회수
+
+        Chroma 클라이언트가 열어 둔 DB에 별도 연결로 실행하므로 트래픽이 적을 때만 사용 (RAG_RECONCILE_COMPACT)
+        """
+        persist_directory = self.rag_service.persist_directory
+        sqlite_path = os.path.join(persist_directory, "chroma.sqlite3")
+        disk_before = _directory_size(persist_directory)
+        rss_before = _current_rss()
+        result = {"vacuumed": False, "free_bytes": 0}
+
+        if os.path.exists(sqlite_path):
+            try:
+                connection = sqlite3.connect(sqlite_path, timeout=30)
+                try:
+                    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+                    free_pages = connection.execute("PRAGMA freelist_count").fetchone()[0]
+                    result["free_bytes"] = page_size * free_pages
+                    if free_pages:
+                        connection.execute("VACUUM")
+                        result["vacuumed"] = True
+                    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                finally:
+                    connection.close()
+            except sqlite3.Error as e:
+                result["error"] = str(e)
+
+        gc.collect()
+        disk_after = _directory_size(persist_directory)
+        rss_after = _current_rss()
+        result.update({
+            "disk_before": disk_before,
+            "disk_after": disk_after,
+            "disk_reclaimed": disk_before - disk_after,
+            "rss_before": rss_before,
+            "rss_after": rss_after,
+            "memory_reclaimed": rss_before - rss_after if rss_before is not None and rss_after is not None else None
+        })
+        return result
+
+    def orphan_guard(self, files: Dict) -> Optional[str]:
+        """고아 청크를 지우면 안 되는 상황이면 그 사유 (스냅샷으로 부트스트랩한 노드, 원본 파일이 없는 노드)"""
+        if getattr(self.rag_service, "snapshot_source", None):
+            return f"스냅샷에서 적재한 인덱스입니다: {self.rag_service.snapshot_source}"
+        if not files:
+            return f"RAG 폴더가 비어 있거나 없습니다: {self.rag_folder}"
+        return None
+
+    def reconcile(self, dry_run: bool = False, compact: Optional[bool] = None,
+                  delete_orphans: Optional[bool] = None) -> Dict:
+        """불일치 점검 및 복구 실행 (compact/delete_orphans 미지정 시 RAG_RECONCILE_COMPACT/DELETE_ORPHANS 설정)"""
+        if compact is None:
+            compact = self.compact
+        if delete_orphans is None:
+            delete_orphans = self.delete_orphans
+        if not self._run_lock.acquire(blocking=False):
+            return {"success": False, "error": "정합성 점검이 이미 실행 중입니다."}
+
+        started = time.perf_counter()
+        errors: List[str] = []
+        try:
+            service = self.rag_service
+            with service.write_lock:
+                files = self.scan_files()
+                indexed = self.scan_collection(service.collection)
+                domain_indexed = {}
+                for collection in service.domain_collections.values():
+                    domain_indexed.update(self.scan_collection(collection))
+                drift = self._find_drift(files, indexed, domain_indexed)
+                orphans_kept_reason = self.orphan_guard(files) if delete_orphans else None
+                if orphans_kept_reason:
+                    delete_orphans = False
+                    if drift["orphaned"]:
+                        print(f"⚠️ 고아 청크 삭제 건너뜀: {orphans_kept_reason}")
+
+                deleted_chunks = 0
+                reindexed = []
+                if not dry_run:
+                    for domain, filename in drift["orphaned"] if delete_orphans else ():
+                        deleted_chunks += len(indexed.get((domain, filename), {}))
+                        result = service.delete_document(domain, filename)
+                        if not result["success"]:
+                            errors.append(f"{domain}/{filename}: {result['error']}")
+
+                    for domain, filename in drift["stale"] + drift["mismatched"]:
+                        deleted_chunks += len(indexed.get((domain, filename), {}))
+                        result = service.delete_document(domain, filename)
+                        if not result["success"]:
+                            errors.append(f"{domain}/{filename}: {result['error']}")
+
+                    for domain, filename in drift["missing"] + drift["stale"] + drift["mismatched"]:
+                        result = service.process_document(files[(domain, filename)]["filepath"], domain, filename)
+                        if result["success"]:
+                            reindexed.append(f"{domain}/{filename}")
+                        else:
+                            errors.append(f"{domain}/{filename}: {result['error']}")
+
+                    for (domain, filename), old_ids in drift["leftovers"].items():
+                        service.delete_chunks(domain, old_ids)
+                        deleted_chunks += len(old_ids)
+
+                compaction = self._compact() if compact and not dry_run else None
+
+            report = {
+                "success": True,
+                "dry_run": dry_run,
+                "finished_at": datetime.now().isoformat(),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "files_on_disk": len(files),
+                "indexed_files": len(indexed),
+                "orphaned_files": [f"{d}/{f}" for d, f in drift["orphaned"]],
+                "orphans_deleted": delete_orphans and not dry_run,
+                "orphans_kept_reason": orphans_kept_reason,
+                "missing_files": [f"{d}/{f}" for d, f in drift["missing"]],
+                "stale_files": [f"{d}/{f}" for d, f in drift["stale"]],
+                "mismatched_files": [f"{d}/{f}" for d, f in drift["mismatched"]],
+                "leftover_chunks": sum(len(ids) for ids in drift["leftovers"].values()),
+                "deleted_chunks": deleted_chunks,
+                "reindexed_files": reindexed,
+                "compaction": compaction,
+                "errors": errors
+            }
+            self.last_report = report
+            self.runs += 1
+
+            repaired = deleted_chunks + len(reindexed)
+            if repaired:
+                print(f"🔧 RAG 정합성 복구: 청크 {deleted_chunks}개 삭제, 파일 {len(reindexed)}개 재색인")
+            if compaction and compaction["disk_reclaimed"] > 0:
+                print(f"🗜️ 벡터 DB 압축: {compaction['disk_reclaimed'] / 1024 / 1024:.1f}MB 회수")
+            return report
+
+        except Exception as e:
+            print(f"RAG 정합성 점검 중 오류: {e}")
+            return {"success": False, "error": str(e)}
+        finally:
+            self._run_lock.release()
+
+    def _loop(self):
+        if self.run_on_startup:
+            self.reconcile()
+        while self.interval > 0 and not self._stop_event.wait(self.interval):
+            self.reconcile()
+
+    def start(self):
+        """시작 시 1회 및 주기적 점검 스레드 시작"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if not self.run_on_startup and self.interval <= 0:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="rag-reconciler", daemon=True)
+        self._thread.start()
+        print(f"🔄 RAG 정합성 점검 스케줄 시작 (주기: {self.interval}초)")
+
+    def stop(self):
+        """주기 점검 중지"""
+        self._stop_event.set()
+
+    def get_status(self) -> Dict:
+        """스케줄 상태 및 마지막 점검 결과"""
+        return {
+            "running": self._run_lock.locked(),
+            "scheduled": self._thread is not None and self._thread.is_alive(),
+            "interval": self.interval,
+            "run_on_startup": self.run_on_startup,
+            "compact": self.compact,
+            "runs": self.runs,
+            "last_report": self.last_report
+        }
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+한국어 문서용 토큰 기반 청커
+문장 종결/조문(제N조) 경계를 유지하면서 임베딩 모델 토큰 수 기준으로 청크를 구성
+"""
+
+import os
+import re
+import math
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 헤딩 패턴 (레벨이 작을수록 상위 구획, title 그룹이 섹션 제목)
+HEADING_PATTERNS = [
+    (re.compile(r'^(?P<title>제\s*\d+\s*편(?:의\s*\d+)?)(?:\s+|$)'), 1),
+    (re.compile(r'^(?P<title>제\s*\d+\s*장(?:의\s*\d+)?)(?:\s+|$)'), 2),
+    (re.compile(r'^(?P<title>제\s*\d+\s*절(?:의\s*\d+)?)(?:\s+|$)'), 3),
+    (re.compile(r'^(?P<title>제\s*\d+\s*관(?:의\s*\d+)?)(?:\s+|$)'), 4),
+    (re.compile(r'^(?P<title>제\s*\d+\s*조(?:의\s*\d+)?(?:\s*\([^)]{0,40}\))?)(?:\s+|$)'), 5),
+    (re.compile(r'^\d{1,2}\.\s+\S'), 6),
+    (re.compile(r'^[가-하]\.\s+\S'), 7),
+]
+MARKDOWN_HEADING = re.compile(r'^(#{1,6})\s+\S')
+
+# 문장 경계: 문장부호 뒤 공백 (소수점 "3.5" 등은 분리하지 않음)
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?。])\s+')
+
+# 번호형 헤딩으로 인정할 최대 길이 (긴 번호 목록 문장은 본문으로 취급)
+MAX_HEADING_CHARS = 60
+
+class TokenCounter:
+    """임베딩 모델 토크나이저 기반 토큰 수 계산기 (결과 캐시)"""
+
+    def __init__(self, provider: str = 'openai', model: Optional[str] = None, cache_size: int = 16384):
+        self.provider = provider
+        self.model = model
+        self.model_max_tokens = None
+        self.tokenizer_name = "heuristic"
+        self._encode = self._load_tokenizer(provider, model)
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    def _load_tokenizer(self, provider: str, model: Optional[str]):
+        """프로바이더별 토크나이저 로드 (실패 시 휴리스틱 사용)"""
+        if provider == 'local' and model:
+            try:
+                from transformers import AutoTokenizer
+
+                candidates = [model] if '/' in model else [model, f"sentence-transformers/{model}"]
+                for name in candidates:
+                    try:
+                        tokenizer = AutoTokenizer.from_pretrained(name)
+                        self.tokenizer_name = name
+                        # sentence-transformers 모델은 보통 256~512 토큰으로 제한
+                        if tokenizer.model_max_length and tokenizer.model_max_length < 100000:
+                            self.model_max_tokens = int(tokenizer.model_max_length)
+                        return lambda text: tokenizer.encode(text, add_special_tokens=False)
+                    except Exception:
+                        continue
+            except ImportError:
+                pass
+
+            # ONNX 내보내기 디렉토리는 tokenizer.json만으로 토큰화
+            tokenizer_file = os.path.join(os.getenv('LOCAL_ONNX_MODEL_PATH') or model, "tokenizer.json")
+            if os.path.isfile(tokenizer_file):
+                try:
+                    from tokenizers import Tokenizer
+
+                    tokenizer = Tokenizer.from_file(tokenizer_file)
+                    self.tokenizer_name = tokenizer_file
+                    self.model_max_tokens = int(os.getenv('LOCAL_EMBEDDING_MAX_LENGTH', '256'))
+                    return lambda text: tokenizer.encode(text, add_special_tokens=False).ids
+                except Exception:
+                    pass
+        else:
+            try:
+                import tiktoken
+
+                try:
+                    encoding = tiktoken.encoding_for_model(model or 'text-embedding-ada-002')
+                except KeyError:
+                    encoding = tiktoken.get_encoding('cl100k_base')
+                self.tokenizer_name = encoding.name
+                self.model_max_tokens = 8191
+                return encoding.encode
+            except Exception:
+                pass
+
+        print(f"⚠️ 임베딩 토크나이저를 불러오지 못해 근사 토큰 계산을 사용합니다: {provider}/{model}")
+        return None
+
+    def _count(self, text: str) -> int:
+        """토큰 수 계산"""
+        if self._encode is not None:
+            return len(self._encode(text))
+
+        # 근사치: 영문/숫자는 약 4자당 1토큰, 한글 등 비ASCII 문자는 1자당 1토큰
+        ascii_chars = sum(1 for ch in text if ord(ch) < 128 and not ch.isspace())
+        other_chars = sum(1 for ch in text if ord(ch) >= 128)
+        return math.ceil(ascii_chars / 4) + other_chars
+
+    def cache_info(self) -> Dict:
+        """토큰 수 캐시 통계"""
+        info = self.count.cache_info()
+        return {
+            "tokenizer": self.tokenizer_name,
+            "hits": info.hits,
+            "misses": info.misses,
+            "entries": info.currsize
+        }
+
+class KoreanTokenChunker:
+    """한국어 문장/조문 경계를 지키는 토큰 기반 청커"""
+
+    def __init__(self, token_counter: TokenCounter, max_tokens: int = 800, overlap_tokens: int = 80,
+                 min_fill_ratio: float = 0.5):
+        if token_counter.model_max_tokens:
+            max_tokens = min(max_tokens, token_counter.model_max_tokens)
+        self.token_counter = token_counter
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 4)
+        self.min_fill_tokens = int(max_tokens * min_fill_ratio)
+
+    def count_tokens(self, text: str) -> int:
+        """토큰 수 계산 (캐시 사용)"""
+        return self.token_counter.count(text)
+
+    def _parse_heading(self, line: str) -> Optional[Tuple[int, str, str]]:
+        """헤딩 줄이면 (레벨, 제목, 같은 줄의 본문) 반환"""
+        markdown = MARKDOWN_HEADING.match(line)
+        if markdown:
+            return len(markdown.group(1)), line, ""
+
+        for pattern, level in HEADING_PATTERNS:
+            match = pattern.match(line)
+            if not match:
+                continue
+
+            if level >= 6:
+                # 번호 목록(1., 가.)은 짧고 문장으로 끝나지 않는 경우만 헤딩으로 취급
+                if len(line) > MAX_HEADING_CHARS or line.endswith(('.', '다', '요')):
+                    return None
+                return level, line, ""
+
+            # "제1장 총칙"처럼 짧은 줄은 전체를 제목으로, "제3조(정의) 본문..."은 본문 분리
+            if level < 5 and len(line) <= MAX_HEADING_CHARS:
+                return level, line, ""
+            return level, match.group('title'), line[match.end():].strip()
+        return None
+
+    def _split_oversized(self, sentence: str) -> List[str]:
+        """최대 토큰 수를 넘는 문장을 어절 단위로 분할"""
+        pieces = []
+        current = []
+        current_tokens = 0
+
+        for word in sentence.split(' '):
+            word_tokens = self.count_tokens(word) + 1
+            if word_tokens > self.max_tokens:
+                # 공백 없는 초장문은 문자 단위로 분할
+                if current:
+                    pieces.append(' '.join(current))
+                    current, current_tokens = [], 0
+                step = max(1, len(word) * self.max_tokens // word_tokens)
+                pieces.extend(word[i:i + step] for i in range(0, len(word), step))
+                continue
+
+            if current and current_tokens + word_tokens > self.max_tokens:
+                pieces.append(' '.join(current))
+                current, current_tokens = [], 0
+            current.append(word)
+            current_tokens += word_tokens
+
+        if current:
+            pieces.append(' '.join(current))
+        return pieces
+
+    def _iter_units(self, segments: Iterable[Dict]) -> Iterator[Dict]:
+        """세그먼트를 문장 단위(헤딩 포함)로 분해"""
+        for segment in segments:
+            page = segment.get("page")
+            for raw_line in segment["text"].splitlines():
+                line = raw_line.strip()
+                if not line:
+                    continue
+
+                # sep: 앞 단위와의 구분자 (줄이 바뀌면 개행, 같은 줄이면 공백)
+                sep = "\n"
+                heading = self._parse_heading(line)
+                if heading is not None:
+                    level, title, line = heading
+                    yield {"text": title, "tokens": self.count_tokens(title), "heading": level, "page": page, "sep": sep}
+                    if not line:
+                        continue
+                    sep = " "
+
+                for sentence in SENTENCE_BOUNDARY.split(line):
+                    sentence = sentence.strip()
+                    if not sentence:
+                        continue
+                    tokens = self.count_tokens(sentence)
+                    pieces = self._split_oversized(sentence) if tokens > self.max_tokens else [sentence]
+                    for piece in pieces:
+                        piece_tokens = tokens if len(pieces) == 1 else self.count_tokens(piece)
+                        yield {"text": piece, "tokens": piece_tokens, "heading": None, "page": page, "sep": sep}
+                        sep = " "
+
+    def iter_chunks(self, segments: Iterable[Dict]) -> Iterator[Tuple[str, Dict]]:
+        """세그먼트 스트림을 (청크 텍스트, 메타데이터)로 변환"""
+        section_stack: List[Tuple[int, str]] = []
+        units: List[Dict] = []
+        tokens = 0
+        last_heading = None  # 현재 청크 안에서 마지막 헤딩 위치
+
+        def build(chunk_units: List[Dict]) -> Tuple[str, Dict]:
+            metadata = {
+                "section_path": chunk_units[0]["section_path"],
+                "token_count": sum(unit["tokens"] for unit in chunk_units) + len(chunk_units) - 1
+            }
+            if chunk_units[0]["page"] is not None:
+                metadata["page"] = chunk_units[0]["page"]
+            text = chunk_units[0]["text"] + "".join(unit["sep"] + unit["text"] for unit in chunk_units[1:])
+            return text, metadata
+
+        def overlap_tail(chunk_units: List[Dict]) -> List[Dict]:
+            tail = []
+            tail_tokens = 0
+            for unit in reversed(chunk_units):
+                if unit["heading"] is not None or tail_tokens + unit["tokens"] > self.overlap_tokens:
+                    break
+                tail.insert(0, unit)
+                tail_tokens += unit["tokens"] + 1
+            return tail
+
+        for unit in self._iter_units(segments):
+            if unit["heading"] is not None:
+                # 섹션 경로 갱신 (같거나 하위 레벨 헤딩은 스택에서 제거)
+                while section_stack and section_stack[-1][0] >= unit["heading"]:
+                    section_stack.pop()
+                section_stack.append((unit["heading"], unit["text"]))
+
+                # 충분히 채워진 청크는 새 섹션 시작 전에 마감
+                if units and tokens >= self.min_fill_tokens:
+                    yield build(units)
+                    units, tokens, last_heading = [], 0, None
+
+                if units:
+                    last_heading = len(units)
+
+            unit["section_path"] = " > ".join(title for _, title in section_stack)
+
+            if units and tokens + unit["tokens"] + 1 > self.max_tokens:
+                if last_heading:
+                    # 마지막 섹션을 통째로 다음 청크로 넘겨 조문 중간 분할 방지
+                    carried = units[last_heading:]
+                    yield build(units[:last_heading])
+                    units = carried
+                else:
+                    yield build(units)
+                    units = overlap_tail(units)
+                tokens = sum(u["tokens"] + 1 for u in units)
+                last_heading = None
+
+                # 넘긴 섹션만으로도 가득 찬 경우 그대로 마감
+                if units and tokens + unit["tokens"] + 1 > self.max_tokens:
+                    yield build(units)
+                    units, tokens = [], 0
+
+            units.append(unit)
+            tokens += unit["tokens"] + 1
+
+        if units:
+            yield build(units)
+
+    def split_text(self, text: str) -> List[str]:
+        """텍스트를 청크 문자열 목록으로 분할"""
+        return [chunk for chunk, _ in self.iter_chunks([{"text": text}])]
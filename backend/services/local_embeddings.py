@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+로컬 임베딩 CPU 추론 엔진
+ONNX Runtime(선택적 int8 동적 양자화) 또는 PyTorch sentence-transformers 경로를
+스레드 수/배치 크기 설정과 함께 초기화하고 시작 시 워밍업 수행
+"""
+
+import os
+from typing import List, Optional
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+# ONNX 모델 파일명 (optimum 내보내기 기본값)
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_FILE = "model.int8.onnx"
+
+def _cache_dir(model_path: str) -> str:
+    """모델별 ONNX 내보내기/양자화 캐시 디렉토리 (LOCAL_ONNX_CACHE_DIR)"""
+    return os.path.join(
+        os.getenv('LOCAL_ONNX_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'kcb_onnx')),
+        model_path.strip('/').replace('/', '__')
+    )
+
+class LocalOnnxEmbeddings(Embeddings):
+    """ONNX Runtime 기반 sentence-transformers 임베딩 (mean pooling + L2 정규화)"""
+
+    def __init__(self, model_path: str, quantize: bool = False, intra_op_threads: int = 0,
+                 batch_size: int = 32, max_length: int = 256):
+        import onnxruntime as ort
+
+        self.model_path = self._resolve_model_dir(model_path)
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+        onnx_file = os.path.join(self.model_path, ONNX_MODEL_FILE)
+        if quantize:
+            onnx_file = self._quantize(onnx_file)
+        self.quantized = onnx_file != os.path.join(self.model_path, ONNX_MODEL_FILE)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(onnx_file, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.tokenizer = self._load_tokenizer()
+
+    @staticmethod
+    def _resolve_model_dir(model_path: str) -> str:
+        """model.onnx가 있는 디렉토리 반환 (없으면 optimum으로 1회 내보내기)"""
+        if os.path.isfile(os.path.join(model_path, ONNX_MODEL_FILE)):
+            return model_path
+
+        export_dir = _cache_dir(model_path)
+        if os.path.isfile(os.path.join(export_dir, ONNX_MODEL_FILE)):
+            return export_dir
+
+        try:
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+            from transformers import AutoTokenizer
+        except ImportError:
+            raise ValueError(f"ONNX 모델을 찾을 수 없습니다: {model_path} (optimum 설치 시 자동 내보내기 가능)")
+
+        print(f"🔄 ONNX 모델 내보내기: {model_path} -> {export_dir}")
+        ORTModelForFeatureExtraction.from_pretrained(model_path, export=True).save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model_path).save_pretrained(export_dir)
+        return export_dir
+
+    def _quantize(self, onnx_file: str) -> str:
+        """가중치 int8 동적 양자화 (모델 디렉토리에 없으면 LOCAL_ONNX_CACHE_DIR에 생성, 실패 시 fp32 사용)"""
+        prebuilt_file = os.path.join(self.model_path, ONNX_QUANTIZED_FILE)
+        if os.path.isfile(prebuilt_file):
+            return prebuilt_file
+
+        # 모델 디렉토리는 읽기 전용일 수 있으므로 캐시 디렉토리에 저장
+        quantized_file = os.path.join(_cache_dir(os.path.abspath(self.model_path)), ONNX_QUANTIZED_FILE)
+        if not os.path.isfile(quantized_file):
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+
+            print(f"🔄 ONNX 모델 int8 동적 양자화: {quantized_file}")
+            try:
+                os.makedirs(os.path.dirname(quantized_file), exist_ok=True)
+                quantize_dynamic(onnx_file, quantized_file, weight_type=QuantType.QInt8)
+            except OSError as e:
+                print(f"⚠️ int8 양자화 모델을 저장하지 못해 fp32 모델을 사용합니다: {e}")
+                if os.path.isfile(quantized_file):
+                    os.remove(quantized_file)
+                return onnx_file
+        return quantized_file
+
+    def _load_tokenizer(self):
+        """tokenizer.json 로드 (패딩/절단 설정)"""
+        from tokenizers import Tokenizer
+
+        tokenizer = Tokenizer.from_file(os.path.join(self.model_path, "tokenizer.json"))
+        tokenizer.enable_truncation(max_length=self.max_length)
+        pad_token = "[PAD]" if tokenizer.token_to_id("[PAD]") is not None else "<pad>"
+        tokenizer.enable_padding(pad_id=tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+        return tokenizer
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """단일 forward pass"""
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.asarray([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.asarray([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        feeds = {name: value for name, value in feeds.items() if name in self.input_names}
+
+        output = self.session.run(None, feeds)[0]
+        if output.ndim == 3:
+            # 토큰 임베딩 mean pooling
+            mask = attention_mask[..., None].astype(np.float32)
+            output = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        norms = np.linalg.norm(output, axis=1, keepdims=True)
+        return output / np.clip(norms, 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """문서들을 임베딩 (길이순 정렬 후 배치 처리로 패딩 최소화)"""
+        if not texts:
+            return []
+
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            indexes = order[start:start + self.batch_size]
+            batch = self._embed_batch([texts[i] for i in indexes])
+            for i, vector in zip(indexes, batch):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """단일 쿼리 임베딩"""
+        return self._embed_batch([text])[0].tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """쿼리 배치 임베딩 (EmbeddingDispatcher용, 쿼리/문서 임베딩이 같은 모델)"""
+        return self.embed_documents(texts)
+
+def init_local_embeddings(model: str) -> Embeddings:
+    """LOCAL_EMBEDDING_ENGINE 설정에 따라 로컬 임베딩 엔진 생성 및 워밍업"""
+    engine = os.getenv('LOCAL_EMBEDDING_ENGINE', 'torch')
+    threads = int(os.getenv('LOCAL_EMBEDDING_THREADS', '0'))
+    batch_size = int(os.getenv('LOCAL_EMBEDDING_BATCH_SIZE', '32'))
+
+    if engine == 'onnx':
+        embeddings = LocalOnnxEmbeddings(
+            os.getenv('LOCAL_ONNX_MODEL_PATH') or model,
+            quantize=os.getenv('LOCAL_EMBEDDING_QUANTIZE', 'false').lower() == 'true',
+            intra_op_threads=threads,
+            batch_size=batch_size,
+            max_length=int(os.getenv('LOCAL_EMBEDDING_MAX_LENGTH', '256'))
+        )
+    else:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        class HuggingFaceQueryBatchEmbeddings(HuggingFaceEmbeddings):
+            """sentence-transformers 임베딩 (embed_query가 embed_documents와 같으므로 쿼리 배치 허용)"""
+
+            def embed_queries(self, texts: List[str]) -> List[List[float]]:
+                return self.embed_documents(texts)
+
+        if threads > 0:
+            import torch
+            torch.set_num_threads(threads)
+
+        # 로컬 임베딩 모델 사용 (sentence-transformers)
+        embeddings = HuggingFaceQueryBatchEmbeddings(
+            model_name=model,
+            model_kwargs={'device': 'cpu'},  # GPU 사용 시 'cuda'로 변경
+            encode_kwargs={'normalize_embeddings': True, 'batch_size': batch_size}
+        )
+
+    # 첫 요청 지연을 없애기 위한 워밍업 (그래프 최적화/메모리 할당)
+    if os.getenv('LOCAL_EMBEDDING_WARMUP', 'true').lower() == 'true':
+        embeddings.embed_documents(["워밍업 문장입니다."] * min(batch_size, 4))
+        embeddings.embed_query("워밍업")
+        print(f"✅ 로컬 임베딩 워밍업 완료 ({engine})")
+
+    return embeddings
@@ -1,47 +1,331 @@
 import os
+import sys
 import json
+import math
+import hashlib
+import copy
+import threading
+import itertools
+import csv
+import codecs
+import shutil
+import zipfile
+import subprocess
+import xml.etree.ElementTree as ET
 import chromadb
 from chromadb.config import Settings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.embeddings.base import Embeddings
 from openai import OpenAI
 import requests
 import numpy as np
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union, Iterator, Tuple
 import pickle
 from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from config.config import config
+from services.korean_chunker import TokenCounter, KoreanTokenChunker
+from services.context_selector import ContextSelector
+from services.embedding_dispatcher import EmbeddingDispatcher
+from services.local_embeddings import init_local_embeddings
+from services.domain_router import DomainRouter
+
+# 청크 요약 프롬프트 (로컬 LLM, 오프라인 사전 계산)
+CHUNK_SUMMARY_PROMPT = """다음 문서 조각을 SQL 생성 참고용으로 압축하세요.
+- summary: 2문장 이내 요약
+- key_facts: 수치, 조건, 용어 정의 등 핵심 사실 (최대 5개)
+반드시 JSON으로만 답하세요: {{"summary": "...", "key_facts": ["...", "..."]}}
+
+[문서 조각]
+{text}"""
+
+# 스냅샷 파일 포맷 버전 (컬럼 구성이 바뀌면 증가)
+SNAPSHOT_FORMAT_VERSION = 1
+
+# HNSW 파라미터 이름 -> Chroma 컬렉션 메타데이터 키
+HNSW_METADATA_KEYS = {
+    "M": "hnsw:M",
+    "construction_ef": "hnsw:construction_ef",
+    "search_ef": "hnsw:search_ef"
+}
+
+# 스트리밍 추출 시 한 번에 다루는 최대 텍스트 크기 (문자 수)
+TEXT_BLOCK_CHARS = 64 * 1024
+
+# 파일 확장자 -> 텍스트 추출기 레지스트리
+# 추출기는 {"text": ..., "page"|"record": ...} 형태의 세그먼트를 순차적으로 생성한다
+DOCUMENT_EXTRACTORS = {}
+
+def register_extractor(*extensions):
+    """문서 추출기 등록 데코레이터"""
+    def decorator(func):
+        for extension in extensions:
+            DOCUMENT_EXTRACTORS[extension.lower()] = func
+        return func
+    return decorator
+
+def get_extractor(filename: str):
+    """파일명 확장자에 해당하는 추출기 반환 (없으면 None)"""
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    return DOCUMENT_EXTRACTORS.get(extension)
+
+def _detect_text_encoding(filepath: str) -> str:
+    """파일 앞부분으로 텍스트 인코딩 추정 (UTF-8 실패 시 CP949)"""
+    with open(filepath, 'rb') as f:
+        sample = f.read(TEXT_BLOCK_CHARS)
+    for encoding in ('utf-8-sig', 'cp949'):
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'utf-8'
+
+@register_extractor('txt', 'md')
+def extract_text_blocks(filepath: str) -> Iterator[Dict]:
+    """텍스트 파일을 문단 경계 기준 블록 단위로 스트리밍"""
+    encoding = _detect_text_encoding(filepath)
+    buffer = []
+    size = 0
+    
+    with open(filepath, 'r', encoding=encoding, errors='replace') as f:
+        # 줄 길이에 상한을 두어 개행 없는 대용량 파일도 메모리 사용량 제한
+        for line in iter(lambda: f.readline(TEXT_BLOCK_CHARS), ''):
+            buffer.append(line)
+            size += len(line)
+            
+            # 빈 줄(문단 경계)에서 끊고, 문단이 너무 길면 강제로 끊음
+            if (size >= TEXT_BLOCK_CHARS and not line.strip()) or size >= TEXT_BLOCK_CHARS * 4:
+                yield {"text": "".join(buffer)}
+                buffer = []
+                size = 0
+    
+    if buffer:
+        yield {"text": "".join(buffer)}
+
+@register_extractor('pdf')
+def extract_pdf_pages(filepath: str) -> Iterator[Dict]:
+    """PDF 페이지 단위 텍스트 추출"""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ValueError("PDF 처리를 위해 pypdf 패키지가 필요합니다.")
+    
+    reader = PdfReader(filepath)
+    for page_number, page in enumerate(reader.pages, 1):
+        text = page.extract_text() or ""
+        if text.strip():
+            yield {"text": text, "page": page_number}
+
+@register_extractor('docx')
+def extract_docx_paragraphs(filepath: str) -> Iterator[Dict]:
+    """DOCX 본문 XML을 iterparse로 읽어 문단 블록 단위로 스트리밍"""
+    namespace = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+    buffer = []
+    size = 0
+    
+    with zipfile.ZipFile(filepath) as archive:
+        with archive.open('word/document.xml') as document_xml:
+            for _, element in ET.iterparse(document_xml, events=('end',)):
+                if element.tag != f'{namespace}p':
+                    continue
+                
+                paragraph = "".join(node.text or "" for node in element.iter(f'{namespace}t'))
+                element.clear()
+                
+                buffer.append(paragraph)
+                size += len(paragraph)
+                if size >= TEXT_BLOCK_CHARS:
+                    yield {"text": "\n".join(buffer)}
+                    buffer = []
+                    size = 0
+    
+    if buffer:
+        yield {"text": "\n".join(buffer)}
+
+@register_extractor('doc')
+def extract_doc_text(filepath: str) -> Iterator[Dict]:
+    """구형 DOC 파일 텍스트 추출 (antiword 필요)"""
+    if not shutil.which('antiword'):
+        raise ValueError("DOC 형식 처리를 위해 antiword가 필요합니다. DOCX로 변환 후 업로드해주세요.")
+    
+    process = subprocess.Popen(['antiword', filepath], stdout=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+    buffer = []
+    size = 0
+    try:
+        for line in process.stdout:
+            buffer.append(line)
+            size += len(line)
+            if size >= TEXT_BLOCK_CHARS and not line.strip():
+                yield {"text": "".join(buffer)}
+                buffer = []
+                size = 0
+    finally:
+        process.stdout.close()
+        process.wait()
+    
+    if buffer:
+        yield {"text": "".join(buffer)}
+
+def _record_to_text(record) -> str:
+    """CSV/JSON 레코드를 검색용 텍스트로 변환"""
+    if isinstance(record, dict):
+        parts = []
+        for key, value in record.items():
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, ensure_ascii=False)
+            parts.append(f"{key}: {value}")
+        return "\n".join(parts)
+    if isinstance(record, str):
+        return record
+    return json.dumps(record, ensure_ascii=False)
+
+@register_extractor('csv')
+def extract_csv_records(filepath: str) -> Iterator[Dict]:
+    """CSV 파일을 행(레코드) 단위로 스트리밍"""
+    encoding = _detect_text_encoding(filepath)
+    with open(filepath, 'r', encoding=encoding, errors='replace', newline='') as f:
+        reader = csv.DictReader(f)
+        for row_number, row in enumerate(reader, 1):
+            row = {key: value for key, value in row.items() if key is not None and value not in (None, "")}
+            if row:
+                yield {"text": _record_to_text(row), "record": row_number}
+
+def _iter_json_values(f) -> Iterator:
+    """JSON 배열 원소 또는 JSON Lines 값을 하나씩 디코딩 (배열 전체를 메모리에 올리지 않음)"""
+    decoder = json.JSONDecoder()
+    read_size = TEXT_BLOCK_CHARS
+    buffer = f.read(read_size)
+    eof = not buffer
+    pos = 0
+    
+    # 최상위가 배열이면 원소 단위로 스트리밍
+    stripped = buffer.lstrip()
+    in_array = stripped.startswith('[')
+    if in_array:
+        pos = buffer.index('[') + 1
+    
+    while True:
+        # 공백/구분자 건너뛰기
+        while pos < len(buffer) and (buffer[pos].isspace() or (in_array and buffer[pos] == ',')):
+            pos += 1
+        
+        if pos >= len(buffer):
+            if eof:
+                return
+            buffer = f.read(read_size)
+            eof = not buffer
+            pos = 0
+            continue
+        
+        if in_array and buffer[pos] == ']':
+            return
+        
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+            # 버퍼 끝에서 끝난 값은 잘린 숫자일 수 있으므로 더 읽어서 재시도
+            if end == len(buffer) and not eof:
+                raise json.JSONDecodeError("incomplete", buffer, end)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(read_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            # 큰 값은 읽기 크기를 늘려 재파싱 횟수 제한
+            read_size = min(read_size * 2, TEXT_BLOCK_CHARS * 64)
+            continue
+        
+        yield value
+        pos = end
+        read_size = TEXT_BLOCK_CHARS
+        if pos > TEXT_BLOCK_CHARS:
+            buffer = buffer[pos:]
+            pos = 0
+
+@register_extractor('json')
+def extract_json_records(filepath: str) -> Iterator[Dict]:
+    """JSON 배열/JSON Lines 파일을 레코드 단위로 스트리밍"""
+    encoding = _detect_text_encoding(filepath)
+    with open(filepath, 'r', encoding=encoding, errors='replace') as f:
+        for record_number, value in enumerate(_iter_json_values(f), 1):
+            text = _record_to_text(value)
+            if text.strip():
+                yield {"text": text, "record": record_number}
 
 class EnterpriseEmbeddings(Embeddings):
     """기업/공급업체 임베딩 서비스 클래스"""
     
-    def __init__(self, base_url: str, model: str, api_key: str = None):
+    def __init__(self, base_url: str, model: str, api_key: str = None, batch_size: int = 64):
         self.base_url = base_url
         self.model = model
         self.api_key = api_key
+        self.batch_size = batch_size
+    
+    def _headers(self) -> Dict:
+        headers = {
+            'Content-Type': 'application/json'
+        }
+        
+        if self.api_key:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        return headers
+    
+    def _embed_batch(self, batch: List[str]) -> Optional[List[List[float]]]:
+        """OpenAI 호환 API의 목록 입력으로 배치 요청 (실패 시 None)"""
+        try:
+            response = requests.post(
+                f"{self.base_url}/v1/embeddings",
+                headers=self._headers(),
+                json={"model": self.model, "input": batch},
+                timeout=60
+            )
+            if response.status_code == 200:
+                data = sorted(response.json()['data'], key=lambda item: item.get('index', 0))
+                if len(data) == len(batch):
+                    return [item['embedding'] for item in data]
+            print(f"기업 임베딩 배치 API 오류: {response.status_code} - {response.text}")
+        except Exception as e:
+            print(f"기업 임베딩 배치 호출 중 오류: {e}")
+        return None
     
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """문서들을 임베딩"""
+        """문서들을 임베딩 (배치 입력을 지원하지 않는 서버는 건별 호출로 대체)"""
         embeddings = []
-        for text in texts:
-            embedding = self.embed_query(text)
-            if embedding:
-                embeddings.append(embedding)
-            else:
-                # 에러 시 0으로 채운 벡터 반환
-                embeddings.append([0.0] * 384)  # 기본 차원
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            vectors = self._embed_batch(batch)
+            if vectors is not None:
+                embeddings.extend(vectors)
+                continue
+            
+            for text in batch:
+                embedding = self.embed_query(text)
+                if embedding:
+                    embeddings.append(embedding)
+                else:
+                    # 에러 시 0으로 채운 벡터 반환
+                    embeddings.append([0.0] * 384)  # 기본 차원
+        return embeddings
+    
+    def embed_queries(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """쿼리 배치 임베딩 (EmbeddingDispatcher용, 실패한 항목은 0 벡터 대신 None)"""
+        embeddings = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            vectors = self._embed_batch(batch)
+            embeddings.extend(vectors if vectors is not None else [self.embed_query(text) for text in batch])
         return embeddings
     
     def embed_query(self, text: str) -> List[float]:
         """단일 쿼리 임베딩"""
         try:
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            
-            if self.api_key:
-                headers['Authorization'] = f'Bearer {self.api_key}'
+            headers = self._headers()
             
             payload = {
                 "model": self.model,
@@ -66,9 +350,90 @@ class EnterpriseEmbeddings(Embeddings):
             print(f"기업 임베딩 호출 중 오류: {e}")
             return None
 
+class OpenAIQueryBatchEmbeddings(OpenAIEmbeddings):
+    """OpenAI 임베딩 (쿼리와 문서 임베딩이 같으므로 쿼리 배치를 embed_documents로 처리)"""
+    
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """쿼리 배치 임베딩 (EmbeddingDispatcher용)"""
+        return self.embed_documents(texts)
+
+class RetrievalCache:
+    """검색 결과 LRU 캐시 (도메인별 인덱스 버전으로 무효화)"""
+    
+    GLOBAL_SCOPE = "*"
+    
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (검색 대상 도메인 집합, 결과)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def normalize_query(question: str) -> str:
+        """캐시 키용 질문 정규화 (공백 통합, 소문자화)"""
+        return " ".join(question.split()).lower()
+    
+    def get(self, key):
+        """캐시 조회 (없으면 None)"""
+        if self.max_entries <= 0:
+            return None
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+    
+    def put(self, key, scopes: set, value):
+        """캐시 저장 (용량 초과 시 가장 오래된 항목 제거)"""
+        if self.max_entries <= 0:
+            return
+        
+        with self._lock:
+            self._entries[key] = (scopes, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate_domain(self, domain: str) -> int:
+        """해당 도메인 또는 전체 컬렉션을 검색한 항목만 제거"""
+        with self._lock:
+            stale_keys = [
+                key for key, (scopes, _) in self._entries.items()
+                if domain in scopes or self.GLOBAL_SCOPE in scopes
+            ]
+            for key in stale_keys:
+                del self._entries[key]
+            self.invalidations += len(stale_keys)
+            return len(stale_keys)
+    
+    def clear(self):
+        """캐시 전체 비우기"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict:
+        """캐시 적중률 통계"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.max_entries > 0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "invalidated_entries": self.invalidations
+            }
+
 class RAGService:
-    def __init__(self, persist_directory=None):
-        """RAG 서비스 초기화"""
+    def __init__(self, persist_directory=None, embeddings: Optional[Embeddings] = None):
+        """RAG 서비스 초기화 (embeddings 지정 시 환경 변수의 임베딩 설정 대신 사용)"""
         if persist_directory is None:
             # 상위 디렉토리의 database/chromadb 폴더 사용
             current_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -91,65 +456,148 @@ class RAGService:
         self.embedding_base_url = os.getenv('EMBEDDING_BASE_URL')
         
         # 임베딩 모델 초기화
-        self.embeddings = self._init_embeddings()
+        self.embeddings = embeddings if embeddings is not None else self._init_embeddings()
+        
+        # 동시 요청의 쿼리 임베딩을 하나의 embed_documents 배치로 묶음 (모든 프로바이더 공통)
+        if os.getenv('EMBEDDING_DISPATCH', 'true').lower() == 'true':
+            self.embeddings = EmbeddingDispatcher(
+                self.embeddings,
+                max_batch_size=int(os.getenv('EMBEDDING_DISPATCH_MAX_BATCH', '32')),
+                max_wait_ms=float(os.getenv('EMBEDDING_DISPATCH_MAX_WAIT_MS', '5')),
+                num_workers=int(os.getenv('EMBEDDING_DISPATCH_WORKERS', '1' if self.embedding_provider == 'local' else '4'))
+            )
         
         # 텍스트 분할기 초기화
+        self.chunk_size = int(os.getenv('RAG_CHUNK_SIZE', '1000'))
+        self.chunk_overlap = int(os.getenv('RAG_CHUNK_OVERLAP', '200'))
+        self.ingest_batch_size = int(os.getenv('RAG_INGEST_BATCH_SIZE', '64'))
+        self.snapshot_batch_size = int(os.getenv('RAG_SNAPSHOT_BATCH_SIZE', '2000'))
+        # 이 프로세스에서 적재한 스냅샷 경로 (정합성 점검이 스냅샷 청크를 고아로 지우지 않도록)
+        self.snapshot_source = None
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
             length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
         
-        # 컬렉션 초기화
-        self.collection = self.client.get_or_create_collection(
-            name="rag_documents",
-            metadata={"hnsw:space": "cosine"}
+        # 한국어 토큰 기반 청커 (RAG_CHUNKER=recursive 이면 기존 문자 기반 분할기 사용)
+        self.chunker_type = os.getenv('RAG_CHUNKER', 'korean')
+        self.token_counter = TokenCounter(self.embedding_provider, self.embedding_model)
+        self.text_chunker = KoreanTokenChunker(
+            self.token_counter,
+            max_tokens=int(os.getenv('RAG_CHUNK_MAX_TOKENS', '800')),
+            overlap_tokens=int(os.getenv('RAG_CHUNK_OVERLAP_TOKENS', '80'))
         )
         
+        # HNSW 파라미터 기본값 (컬렉션별 값과 실제 컬렉션 이름은 레지스트리 파일에 저장)
+        self.hnsw_defaults = {
+            name: int(value) for name, value in {
+                "M": os.getenv('RAG_HNSW_M'),
+                "construction_ef": os.getenv('RAG_HNSW_CONSTRUCTION_EF'),
+                "search_ef": os.getenv('RAG_HNSW_SEARCH_EF')
+            }.items() if value
+        }
+        self.registry_path = os.path.join(self.persist_directory, "collection_registry.json")
+        self.collection_registry = self._load_registry()
+        
+        # 컬렉션 초기화
+        self.collection = self._open_collection("rag_documents")
+        
         # 도메인별 컬렉션도 생성
         self.domain_collections = {}
         self._init_domain_collections()
+        
+        # 다중 도메인 동시 검색용 스레드 풀
+        self.retrieval_executor = ThreadPoolExecutor(
+            max_workers=max(len(self.domain_collections), 1),
+            thread_name_prefix="rag-retrieval"
+        )
+        
+        # 인덱스 스냅샷 저장 경로 (신규 노드 부트스트랩용)
+        self.snapshot_dir = os.getenv('RAG_SNAPSHOT_DIR') or os.path.join(
+            os.path.dirname(self.persist_directory), "snapshots"
+        )
+        
+        # 문서 추가/삭제와 정합성 점검(IndexReconciler)이 겹치지 않도록 쓰기 잠금
+        self.write_lock = threading.RLock()
+        
+        # 검색 결과 캐시 (문서 추가/삭제 시 해당 도메인의 인덱스 버전 증가)
+        self.index_versions = {domain: 0 for domain in self.domain_collections}
+        self.retrieval_cache = RetrievalCache(
+            max_entries=int(os.getenv('RAG_CACHE_MAX_ENTRIES', '1024'))
+        )
+        
+        # 도메인 미지정 질문을 도메인 중심 벡터/키워드 프로필로 1~2개 도메인 컬렉션에 라우팅
+        self.domain_routing = os.getenv('RAG_DOMAIN_ROUTING', 'true').lower() == 'true'
+        # 도메인이 지정된 질문으로 라우팅 정확도를 함께 기록
+        self.routing_shadow = os.getenv('RAG_ROUTER_SHADOW', 'true').lower() == 'true'
+        self.domain_router = DomainRouter(
+            self.domain_collections.keys(),
+            profile_path=os.path.join(self.persist_directory, "domain_profiles.json")
+        )
+        if not self.domain_router.loaded and self.collection.count() > 0:
+            self.domain_router.rebuild(self.domain_collections)
+        
+        # 청크 요약 사전 계산 (로컬 LLM) 및 컨텍스트 토큰 예산
+        self.chunk_summaries = os.getenv('RAG_CHUNK_SUMMARIES', 'false').lower() == 'true'
+        self.summary_max_tokens = int(os.getenv('RAG_SUMMARY_MAX_TOKENS', '300'))
+        self.summary_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('RAG_SUMMARY_WORKERS', '4')),
+            thread_name_prefix="rag-summary"
+        )
+        self.context_token_budget = int(os.getenv('RAG_CONTEXT_TOKEN_BUDGET', '2000'))
+        if self.chunk_summaries and not self.llm_base_url:
+            print("⚠️ RAG_CHUNK_SUMMARIES가 켜져 있지만 LLM_BASE_URL이 없어 요약을 생성하지 않습니다.")
+        
+        # 컨텍스트 후처리 (적응형 유사도 컷오프, 근사 중복 제거, MMR, 인접 청크 병합)
+        self.context_fetch_factor = int(os.getenv('RAG_CONTEXT_FETCH_FACTOR', '4'))
+        self.context_selector = ContextSelector(
+            self.token_counter,
+            min_similarity=float(os.getenv('RAG_MIN_SIMILARITY', '0.2')),
+            mmr_lambda=float(os.getenv('RAG_MMR_LAMBDA', '0.7')),
+            dedup_threshold=float(os.getenv('RAG_DEDUP_THRESHOLD', '0.8')),
+            max_merge_tokens=self.text_chunker.max_tokens * 2,
+            relative_cutoff=float(os.getenv('RAG_RELATIVE_CUTOFF', '0.5')),
+            knee_gap=float(os.getenv('RAG_KNEE_GAP', '0.15'))
+        )
     
     def _init_embeddings(self):
         """임베딩 모델 초기화"""
         try:
             if self.embedding_provider == 'openai':
                 # OpenAI 임베딩 사용
-                return OpenAIEmbeddings(
+                return OpenAIQueryBatchEmbeddings(
                     model=self.embedding_model,
                     openai_api_key=os.getenv('OPENAI_API_KEY')
                 )
             elif self.embedding_provider == 'local':
-                # 로컬 임베딩 모델 사용 (sentence-transformers)
-                return HuggingFaceEmbeddings(
-                    model_name=self.embedding_model,
-                    model_kwargs={'device': 'cpu'},  # GPU 사용 시 'cuda'로 변경
-                    encode_kwargs={'normalize_embeddings': True}
-                )
+                # 로컬 임베딩 모델 사용 (LOCAL_EMBEDDING_ENGINE=torch|onnx)
+                return init_local_embeddings(self.embedding_model)
             elif self.embedding_provider == 'enterprise':
                 # 기업/공급업체 임베딩 서비스 사용
                 return EnterpriseEmbeddings(
                     base_url=self.embedding_base_url,
                     model=self.embedding_model,
-                    api_key=os.getenv('EMBEDDING_API_KEY')
+                    api_key=os.getenv('EMBEDDING_API_KEY'),
+                    batch_size=int(os.getenv('EMBEDDING_API_BATCH_SIZE', '64'))
                 )
             else:
                 # 기본값으로 OpenAI 임베딩 사용
                 print(f"알 수 없는 임베딩 프로바이더: {self.embedding_provider}, OpenAI 임베딩을 사용합니다.")
-                return OpenAIEmbeddings(
+                return OpenAIQueryBatchEmbeddings(
                     model="text-embedding-ada-002",
                     openai_api_key=os.getenv('OPENAI_API_KEY')
                 )
         except Exception as e:
             print(f"임베딩 모델 초기화 오류: {e}")
             # 폴백으로 OpenAI 임베딩 사용
-            return OpenAIEmbeddings(
+            return OpenAIQueryBatchEmbeddings(
                 model="text-embedding-ada-002",
                 openai_api_key=os.getenv('OPENAI_API_KEY')
             )
     
-    def call_local_llm(self, prompt, system_prompt="당신은 문서 분석 전문가입니다."):
+    def call_local_llm(self, prompt, system_prompt="당신은 문서 분석 전문가입니다.", max_tokens=1000):
         """로컬 LLM API 호출 함수"""
         try:
             headers = {
@@ -165,7 +613,7 @@ class RAGService:
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt}
                 ],
-                "max_tokens": 1000,
+                "max_tokens": max_tokens,
                 "temperature": 0.1
             }
             
@@ -187,121 +635,662 @@ class RAGService:
             print(f"로컬 LLM 호출 중 오류: {e}")
             return None
     
+    def summarize_chunk(self, text: str) -> Optional[Dict]:
+        """로컬 LLM으로 청크 요약/핵심 사실 생성 -> 메타데이터 필드"""
+        if not self.llm_base_url:
+            return None
+        
+        response = self.call_local_llm(
+            CHUNK_SUMMARY_PROMPT.format(text=text),
+            system_prompt="당신은 금융 문서를 간결하게 요약하는 전문가입니다.",
+            max_tokens=self.summary_max_tokens
+        )
+        if not response:
+            return None
+        
+        try:
+            parsed = json.loads(response[response.index('{'):response.rindex('}') + 1])
+            summary = str(parsed.get("summary", "")).strip()
+            key_facts = [str(fact).strip() for fact in parsed.get("key_facts", []) if str(fact).strip()]
+        except (ValueError, AttributeError):
+            # JSON 형식이 아니면 응답 전체를 요약으로 사용
+            summary, key_facts = response.strip(), []
+        
+        if not summary:
+            return None
+        return {
+            "summary": summary,
+            # Chroma 메타데이터는 스칼라만 허용하므로 줄바꿈으로 결합
+            "key_facts": "\n".join(key_facts),
+            "summary_token_count": self.token_counter.count(summary + "\n".join(key_facts))
+        }
+    
+    def _summarize_batch(self, documents: List[str]) -> List[Optional[Dict]]:
+        """청크 요약 병렬 생성"""
+        return list(self.summary_executor.map(self.summarize_chunk, documents))
+    
     def _init_domain_collections(self):
         """도메인별 컬렉션 초기화"""
-        domains = ['personal_credit', 'corporate_credit', 'policy_regulation']
-        for domain in domains:
-            self.domain_collections[domain] = self.client.get_or_create_collection(
-                name=f"rag_{domain}",
-                metadata={"hnsw:space": "cosine"}
+        for domain in config.RAG_DOMAINS.keys():
+            self.domain_collections[domain] = self._open_collection(f"rag_{domain}")
+    
+    def _load_registry(self) -> Dict:
+        """컬렉션 레지스트리 로드 (논리 이름 -> 실제 컬렉션 이름/HNSW 파라미터)"""
+        if not os.path.exists(self.registry_path):
+            return {}
+        try:
+            with open(self.registry_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ 컬렉션 레지스트리 로드 실패: {e}")
+            return {}
+    
+    def _save_registry(self):
+        """컬렉션 레지스트리 저장 (임시 파일 작성 후 교체하여 원자적으로 반영)"""
+        os.makedirs(self.persist_directory, exist_ok=True)
+        temp_path = f"{self.registry_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.collection_registry, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.registry_path)
+    
+    def _hnsw_params(self, logical_name: str) -> Dict:
+        """컬렉션에 적용할 HNSW 파라미터 (레지스트리 값 우선)"""
+        return dict(self.hnsw_defaults, **self.collection_registry.get(logical_name, {}).get("hnsw", {}))
+    
+    @staticmethod
+    def _hnsw_metadata(params: Dict) -> Dict:
+        metadata = {"hnsw:space": "cosine"}
+        metadata.update({HNSW_METADATA_KEYS[name]: value for name, value in params.items() if name in HNSW_METADATA_KEYS})
+        return metadata
+    
+    def _open_collection(self, logical_name: str):
+        """레지스트리의 실제 컬렉션 열기 (없으면 HNSW 파라미터로 생성, search_ef는 기존 컬렉션에도 반영)"""
+        physical_name = self.collection_registry.get(logical_name, {}).get("name", logical_name)
+        params = self._hnsw_params(logical_name)
+        collection = self.client.get_or_create_collection(
+            name=physical_name,
+            metadata=self._hnsw_metadata(params)
+        )
+        if "search_ef" in params:
+            self._apply_search_ef(collection, params["search_ef"])
+        return collection
+    
+    @staticmethod
+    def _hnsw_configuration(collection) -> Dict:
+        """컬렉션에 실제 적용된 HNSW 설정 (chromadb 1.x 이상)"""
+        try:
+            return dict(collection.configuration.get("hnsw") or {})
+        except Exception:
+            return {}
+    
+    @staticmethod
+    def _supports_search_ef(collection) -> bool:
+        """컬렉션 설정 조회/변경 API 지원 여부 (chromadb 1.x 이상)"""
+        return hasattr(collection, "configuration") and hasattr(collection, "modify")
+    
+    def _apply_search_ef(self, collection, search_ef: int) -> Optional[str]:
+        """검색 시 ef 값 변경 (재구축 없이 적용 가능, 실패 시 오류 메시지 반환)"""
+        if not self._supports_search_ef(collection):
+            error = f"설치된 chromadb {chromadb.__version__}은(는) search_ef 변경을 지원하지 않습니다 (1.0 이상 필요)"
+            print(f"⚠️ {collection.name} {error}")
+            return error
+        if self._hnsw_configuration(collection).get("ef_search") == search_ef:
+            return None
+        try:
+            collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+        except Exception as e:
+            print(f"⚠️ {collection.name} search_ef 변경 실패: {e}")
+            return str(e)
+        if self._hnsw_configuration(collection).get("ef_search") != search_ef:
+            error = f"search_ef 변경이 반영되지 않았습니다: {collection.name}"
+            print(f"⚠️ {error}")
+            return error
+        return None
+    
+    def _collection_names(self) -> List[str]:
+        """논리 컬렉션 이름 목록 (전체 + 도메인별)"""
+        return ["rag_documents"] + [f"rag_{domain}" for domain in config.RAG_DOMAINS]
+    
+    def resolve_collection_name(self, name: str) -> Optional[str]:
+        """도메인 이름 또는 컬렉션 이름 -> 논리 컬렉션 이름"""
+        if name in config.RAG_DOMAINS:
+            name = f"rag_{name}"
+        return name if name in self._collection_names() else None
+    
+    def _get_collection(self, logical_name: str):
+        if logical_name == "rag_documents":
+            return self.collection
+        return self.domain_collections[logical_name[len("rag_"):]]
+    
+    def _set_collection(self, logical_name: str, collection):
+        if logical_name == "rag_documents":
+            self.collection = collection
+        else:
+            self.domain_collections[logical_name[len("rag_"):]] = collection
+    
+    def get_index_config(self) -> Dict:
+        """컬렉션별 실제 이름/청크 수/HNSW 설정"""
+        configs = {}
+        for logical_name in self._collection_names():
+            collection = self._get_collection(logical_name)
+            entry = self.collection_registry.get(logical_name, {})
+            configs[logical_name] = {
+                "collection_name": collection.name,
+                "count": collection.count(),
+                "hnsw": self._hnsw_configuration(collection),
+                "rebuilt_at": entry.get("rebuilt_at")
+            }
+        return configs
+    
+    def set_search_ef(self, logical_name: str, search_ef: int) -> Dict:
+        """컬렉션 search_ef 변경 (재구축 없이 즉시 적용, 레지스트리에 저장)"""
+        with self.write_lock:
+            error = self._apply_search_ef(self._get_collection(logical_name), int(search_ef))
+            if error:
+                return {"success": False, "collection": logical_name, "error": error}
+            entry = self.collection_registry.setdefault(logical_name, {})
+            entry.setdefault("hnsw", {})["search_ef"] = int(search_ef)
+            self._save_registry()
+            for domain in self.domain_collections:
+                self._bump_index_version(domain)
+        return {"success": True, "collection": logical_name, "search_ef": int(search_ef)}
+    
+    def rebuild_collection(self, logical_name: str, hnsw: Optional[Dict] = None) -> Dict:
+        """새 HNSW 파라미터로 새 컬렉션에 복사 후 교체
+
+        복사는 쓰기 잠금 없이 수행하고 (복사 중 검색/적재는 기존 컬렉션이 처리),
+        교체 직전에 잠금을 잡고 복사 이후 기존 컬렉션에 반영된 변경을 다시 적용한다.
+        """
+        hnsw = {name: int(value) for name, value in (hnsw or {}).items() if name in HNSW_METADATA_KEYS}
+        started = datetime.now()
+        with self.write_lock:
+            old_collection = self._get_collection(logical_name)
+            entry = self.collection_registry.get(logical_name, {})
+            overrides = dict(entry.get("hnsw", {}), **hnsw)
+            params = dict(self.hnsw_defaults, **overrides)
+            physical_name = f"{logical_name}_r{started.strftime('%Y%m%d%H%M%S%f')}"
+            
+            new_collection = self.client.create_collection(
+                name=physical_name,
+                metadata=self._hnsw_metadata(params)
+            )
+        
+        try:
+            copied = 0
+            for page in self._iter_collection_batches(old_collection, ["documents", "metadatas", "embeddings"],
+                                                      self.snapshot_batch_size):
+                new_collection.upsert(
+                    ids=page["ids"],
+                    documents=page["documents"],
+                    metadatas=page["metadatas"],
+                    embeddings=page["embeddings"]
+                )
+                copied += len(page["ids"])
+            
+            with self.write_lock:
+                if self._get_collection(logical_name) is not old_collection:
+                    raise RuntimeError(f"재구축 중 {logical_name} 컬렉션이 교체되었습니다")
+                
+                # 복사 이후 기존 컬렉션에 반영된 추가/수정/삭제 재적용
+                replayed = self._replay_collection_changes(old_collection, new_collection)
+                if new_collection.count() != old_collection.count():
+                    raise RuntimeError(f"복사된 청크 수가 다릅니다: {new_collection.count()} != {old_collection.count()}")
+                
+                # 레지스트리 교체 후 참조 전환 (재시작해도 새 컬렉션을 사용)
+                self.collection_registry[logical_name] = {
+                    "name": physical_name,
+                    "hnsw": overrides,
+                    "rebuilt_at": datetime.now().isoformat()
+                }
+                self._save_registry()
+                self._set_collection(logical_name, new_collection)
+                for domain in self.domain_collections:
+                    self._bump_index_version(domain)
+        except Exception:
+            self.client.delete_collection(physical_name)
+            raise
+        
+        try:
+            self.client.delete_collection(old_collection.name)
+        except Exception as e:
+            print(f"⚠️ 이전 컬렉션 삭제 실패 ({old_collection.name}): {e}")
+        
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"🏗️ {logical_name} 인덱스 재구축 완료: {old_collection.name} -> {physical_name}, "
+              f"{copied}개 청크, 재적용 {replayed['upserted']}개/삭제 {replayed['deleted']}개 ({elapsed:.1f}초)")
+        return {
+            "success": True,
+            "collection": logical_name,
+            "previous_name": old_collection.name,
+            "collection_name": physical_name,
+            "chunks": new_collection.count(),
+            "replayed": replayed,
+            "hnsw": self._hnsw_configuration(new_collection),
+            "elapsed_seconds": round(elapsed, 2)
+        }
+    
+    def _replay_collection_changes(self, source, target) -> Dict:
+        """source 기준으로 target 차이를 맞춤 (메타데이터 비교, write_lock 안에서 호출)
+
+        재적재는 processed_at, 요약/청크 수 갱신은 해당 메타데이터 값이 바뀌므로
+        id별 메타데이터를 비교하면 복사 이후의 변경을 모두 찾을 수 있다.
+        """
+        source_metadatas = {}
+        for page in self._iter_collection_batches(source, ["metadatas"], self.snapshot_batch_size):
+            source_metadatas.update(zip(page["ids"], page["metadatas"]))
+        target_metadatas = {}
+        for page in self._iter_collection_batches(target, ["metadatas"], self.snapshot_batch_size):
+            target_metadatas.update(zip(page["ids"], page["metadatas"]))
+        
+        changed = [chunk_id for chunk_id, metadata in source_metadatas.items()
+                   if target_metadatas.get(chunk_id) != metadata]
+        removed = [chunk_id for chunk_id in target_metadatas if chunk_id not in source_metadatas]
+        
+        for start in range(0, len(changed), self.snapshot_batch_size):
+            page = source.get(ids=changed[start:start + self.snapshot_batch_size],
+                              include=["documents", "metadatas", "embeddings"])
+            target.upsert(
+                ids=page["ids"],
+                documents=page["documents"],
+                metadatas=page["metadatas"],
+                embeddings=page["embeddings"]
             )
+        for start in range(0, len(removed), self.snapshot_batch_size):
+            target.delete(ids=removed[start:start + self.snapshot_batch_size])
+        
+        return {"upserted": len(changed), "deleted": len(removed)}
+    
+    def _bump_index_version(self, domain: str):
+        """도메인 인덱스 버전 증가 및 관련 캐시 무효화"""
+        self.index_versions[domain] = self.index_versions.get(domain, 0) + 1
+        self.retrieval_cache.invalidate_domain(domain)
+    
+    def _chunk_length(self, text: str) -> int:
+        """청커 기준 길이 (토큰 청커는 토큰 수, 기존 분할기는 문자 수)"""
+        if self.chunker_type == 'korean':
+            return self.text_chunker.count_tokens(text)
+        return len(text)
+    
+    def _chunk_limit(self) -> int:
+        """청크 최대 길이"""
+        return self.text_chunker.max_tokens if self.chunker_type == 'korean' else self.chunk_size
+    
+    def _split_text(self, text: str) -> List[str]:
+        """단일 텍스트 분할"""
+        if self.chunker_type == 'korean':
+            return self.text_chunker.split_text(text)
+        return self.text_splitter.split_text(text)
+    
+    def _iter_record_chunks(self, segments: Iterator[Dict]) -> Iterator[Tuple[str, Dict]]:
+        """CSV/JSON 레코드를 레코드 경계를 유지하며 청크로 묶음"""
+        limit = self._chunk_limit()
+        records = []
+        records_size = 0
+        
+        def flush_records():
+            text = "\n\n".join(record["text"] for record in records)
+            return text, {"record_start": records[0]["record"], "record_end": records[-1]["record"]}
+        
+        for segment in segments:
+            size = self._chunk_length(segment["text"])
+            
+            if records and records_size + size > limit:
+                yield flush_records()
+                records = []
+                records_size = 0
+            
+            if size > limit:
+                # 청크 크기를 넘는 단일 레코드만 분할
+                for piece in self._split_text(segment["text"]):
+                    yield piece, {"record_start": segment["record"], "record_end": segment["record"]}
+                continue
+            
+            records.append(segment)
+            records_size += size
+        
+        if records:
+            yield flush_records()
+    
+    def _iter_chunks(self, segments: Iterator[Dict]) -> Iterator[Tuple[str, Dict]]:
+        """추출 세그먼트를 청크로 변환 (CSV/JSON 레코드는 레코드 경계를 유지)"""
+        segments = iter(segments)
+        first = next(segments, None)
+        if first is None:
+            return
+        segments = itertools.chain([first], segments)
+        
+        if "record" in first:
+            yield from self._iter_record_chunks(segments)
+        elif self.chunker_type == 'korean':
+            yield from self.text_chunker.iter_chunks(segments)
+        else:
+            for segment in segments:
+                extra = {"page": segment["page"]} if "page" in segment else {}
+                for piece in self.text_splitter.split_text(segment["text"]):
+                    yield piece, dict(extra)
+    
+    def _target_collections(self, domain: str) -> List:
+        """문서를 저장할 컬렉션 목록 (전체 + 도메인별)"""
+        collections = [self.collection]
+        if domain in self.domain_collections:
+            collections.append(self.domain_collections[domain])
+        return collections
+    
+    def _add_chunk_batch(self, domain: str, ids: List[str], documents: List[str], metadatas: List[Dict]):
+        """청크 배치 임베딩 생성 및 저장"""
+        if self.chunk_summaries:
+            for metadata, summary in zip(metadatas, self._summarize_batch(documents)):
+                if summary:
+                    metadata.update(summary)
+        
+        embeddings = self.embeddings.embed_documents(documents)
+        for collection in self._target_collections(domain):
+            collection.upsert(
+                ids=ids,
+                documents=documents,
+                metadatas=metadatas,
+                embeddings=embeddings
+            )
+        self.domain_router.observe(domain, embeddings, documents)
+    
+    def _update_total_chunks(self, domain: str, filename: str, total_chunks: int):
+        """스트리밍 처리 후 확정된 전체 청크 수를 메타데이터에 반영"""
+        for start in range(0, total_chunks, self.ingest_batch_size):
+            ids = [f"{domain}_{filename}_{i}" for i in range(start, min(start + self.ingest_batch_size, total_chunks))]
+            for collection in self._target_collections(domain):
+                existing = collection.get(ids=ids, include=["metadatas"])
+                metadatas = []
+                for metadata in existing["metadatas"]:
+                    metadata = dict(metadata)
+                    metadata["total_chunks"] = total_chunks
+                    metadatas.append(metadata)
+                collection.update(ids=existing["ids"], metadatas=metadatas)
     
     def process_document(self, filepath: str, domain: str, filename: str) -> Dict:
-        """문서를 처리하여 벡터 데이터베이스에 저장"""
-        try:
-            # 파일 읽기
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
+        """문서를 처리하여 벡터 데이터베이스에 저장 (추출 -> 청킹 -> 배치 임베딩 스트리밍)"""
+        with self.write_lock:
+            chunk_count = 0
+            try:
+                extractor = get_extractor(filename)
+                if extractor is None:
+                    raise ValueError(f"지원하지 않는 파일 형식입니다: {filename}")
             
-            # 텍스트 청킹
-            chunks = self.text_splitter.split_text(content)
+                # 이미 색인된 파일이면 이전 청크를 먼저 삭제
+                # (청크 수가 줄면 남는 청크가 검색되고, 라우팅 프로필에 같은 파일이 중복 반영되므로)
+                if self.collection.get(where={"$and": [{"domain": domain}, {"filename": filename}]},
+                                       limit=1, include=[])["ids"]:
+                    removed = self.delete_document(domain, filename)
+                    if not removed["success"]:
+                        raise RuntimeError(f"이전 청크 삭제 실패: {removed['error']}")
             
-            # 청크별 메타데이터 생성
-            metadatas = []
-            documents = []
-            ids = []
+                processed_at = datetime.now().isoformat()
+                file_sha256 = self._file_sha256(filepath)
+                ids, documents, metadatas = [], [], []
             
-            for i, chunk in enumerate(chunks):
-                chunk_id = f"{domain}_{filename}_{i}"
-                metadata = {
-                    "domain": domain,
-                    "filename": filename,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks),
-                    "filepath": filepath,
-                    "processed_at": datetime.now().isoformat()
-                }
+                for chunk, extra in self._iter_chunks(extractor(filepath)):
+                    metadata = {
+                        "domain": domain,
+                        "filename": filename,
+                        "chunk_index": chunk_count,
+                        "total_chunks": 0,  # 스트리밍 완료 후 갱신
+                        "filepath": filepath,
+                        "processed_at": processed_at,
+                        "file_sha256": file_sha256  # 정합성 점검 시 변경 여부 판단
+                    }
+                    metadata.update(extra)
                 
-                ids.append(chunk_id)
-                documents.append(chunk)
-                metadatas.append(metadata)
-            
-            # 임베딩 생성 및 저장
-            if documents:
-                # 전체 컬렉션에 저장
-                self.collection.add(
-                    documents=documents,
-                    metadatas=metadatas,
-                    ids=ids
-                )
+                    ids.append(f"{domain}_{filename}_{chunk_count}")
+                    documents.append(chunk)
+                    metadatas.append(metadata)
+                    chunk_count += 1
                 
-                # 도메인별 컬렉션에도 저장
-                if domain in self.domain_collections:
-                    self.domain_collections[domain].add(
-                        documents=documents,
-                        metadatas=metadatas,
-                        ids=ids
-                    )
+                    # 배치 단위로 임베딩/저장하여 메모리 사용량 제한
+                    if len(documents) >= self.ingest_batch_size:
+                        self._add_chunk_batch(domain, ids, documents, metadatas)
+                        ids, documents, metadatas = [], [], []
             
-            return {
-                "success": True,
-                "filename": filename,
-                "domain": domain,
-                "chunks_created": len(chunks),
-                "total_chunks": len(chunks)
-            }
+                if documents:
+                    self._add_chunk_batch(domain, ids, documents, metadatas)
             
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "filename": filename,
-                "domain": domain
-            }
+                if chunk_count:
+                    self._update_total_chunks(domain, filename, chunk_count)
+                    self._bump_index_version(domain)
+                    self.domain_router.save()
+            
+                return {
+                    "success": True,
+                    "filename": filename,
+                    "domain": domain,
+                    "chunks_created": chunk_count,
+                    "total_chunks": chunk_count
+                }
+            
+            except Exception as e:
+                # 일부만 저장된 청크 정리
+                if chunk_count:
+                    self.delete_document(domain, filename)
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "filename": filename,
+                    "domain": domain
+                }
+    
+    def _resolve_domains(self, domain: Union[str, List[str], None]) -> Optional[List[str]]:
+        """검색 대상 도메인 목록 정규화 (None이면 전체 컬렉션 검색)"""
+        if not domain:
+            return None
+        
+        if isinstance(domain, str):
+            domain = domain.split(',')
+        
+        domains = []
+        for name in domain:
+            name = name.strip()
+            if name in self.domain_collections and name not in domains:
+                domains.append(name)
+        
+        return domains or None
+    
+    def _query_collection(self, collection, question_embedding: List[float], top_k: int,
+                          include_embeddings: bool = False) -> List[Dict]:
+        """단일 컬렉션 유사도 검색"""
+        n_results = min(top_k, collection.count())
+        if n_results <= 0:
+            return []
+        
+        include = ["documents", "metadatas", "distances"]
+        if include_embeddings:
+            include.append("embeddings")
+        results = collection.query(
+            query_embeddings=[question_embedding],
+            n_results=n_results,
+            include=include
+        )
+        
+        # 결과 포맷팅
+        chunks = []
+        if results['documents'] and results['documents'][0]:
+            for i, (chunk_id, doc, metadata, distance) in enumerate(zip(
+                results['ids'][0],
+                results['documents'][0], 
+                results['metadatas'][0], 
+                results['distances'][0]
+            )):
+                chunks.append({
+                    "id": chunk_id,
+                    "content": doc,
+                    "metadata": metadata,
+                    "similarity_score": 1 - distance,  # 코사인 유사도로 변환
+                    "rank": i + 1
+                })
+            
+            # MMR 다양화용 청크 임베딩
+            if include_embeddings:
+                for chunk, embedding in zip(chunks, results['embeddings'][0]):
+                    chunk["embedding"] = [float(x) for x in embedding]
+        
+        return chunks
+    
+    def _normalize_scores(self, chunks: List[Dict]):
+        """유사도 점수를 0~1 범위로 min-max 정규화 (주어진 청크 전체 기준)"""
+        if not chunks:
+            return
+        
+        scores = [chunk["similarity_score"] for chunk in chunks]
+        low, high = min(scores), max(scores)
+        for chunk in chunks:
+            if high > low:
+                chunk["normalized_score"] = (chunk["similarity_score"] - low) / (high - low)
+            else:
+                chunk["normalized_score"] = 1.0
     
-    def retrieve_relevant_chunks(self, question: str, domain: Optional[str] = None, top_k: int = 5) -> List[Dict]:
-        """질문과 관련된 문서 청크들을 검색"""
+    def _retrieve_multi_domain(self, question_embedding: List[float], domains: List[str],
+                               top_k: int, per_domain_quota: Optional[int] = None,
+                               include_embeddings: bool = False) -> List[Dict]:
+        """여러 도메인 컬렉션을 동시에 검색하고 정규화 점수로 병합
+
+        정규화는 모든 도메인 후보를 합친 뒤 한 번만 수행 (도메인별로 하면 관련 없는 도메인의
+        최상위 청크도 1.0이 되어 관련 도메인의 최상위 청크와 동점이 됨)
+        """
+        # 하나의 질문 임베딩을 공유하여 도메인별 컬렉션 동시 검색
+        futures = {
+            domain: self.retrieval_executor.submit(
+                self._query_collection, self.domain_collections[domain], question_embedding, top_k,
+                include_embeddings
+            )
+            for domain in domains
+        }
+        
+        candidates = []
+        for domain, future in futures.items():
+            domain_chunks = future.result()
+            for chunk in domain_chunks:
+                chunk["domain"] = domain
+            candidates.extend(domain_chunks)
+        self._normalize_scores(candidates)
+        
+        # 정규화 점수 기준 전역 정렬 (원래 유사도 순서와 같음)
+        candidates.sort(key=lambda c: (c["normalized_score"], c["similarity_score"]), reverse=True)
+        
+        # 도메인별 할당량 내에서 먼저 선택 (절대 유사도 컷오프 미만 청크는 할당량 자리를 차지하지 않음)
+        if per_domain_quota is None:
+            per_domain_quota = math.ceil(top_k / len(domains))
+        min_similarity = self.context_selector.min_similarity
+        
+        selected = []
+        selected_ids = set()
+        domain_counts = {}
+        for chunk in candidates:
+            if len(selected) >= top_k:
+                break
+            if chunk["similarity_score"] >= min_similarity and \
+                    domain_counts.get(chunk["domain"], 0) < per_domain_quota:
+                selected.append(chunk)
+                selected_ids.add(chunk["id"])
+                domain_counts[chunk["domain"]] = domain_counts.get(chunk["domain"], 0) + 1
+        
+        # 할당량을 채우지 못한 도메인이 있으면 남은 자리를 점수순으로 채움
+        if len(selected) < top_k:
+            for chunk in candidates:
+                if len(selected) >= top_k:
+                    break
+                if chunk["id"] not in selected_ids:
+                    selected.append(chunk)
+                    selected_ids.add(chunk["id"])
+        
+        selected.sort(key=lambda c: (c["normalized_score"], c["similarity_score"]), reverse=True)
+        for i, chunk in enumerate(selected):
+            chunk["rank"] = i + 1
+        
+        return selected
+    
+    def _cache_key(self, question: str, domains: Optional[List[str]], top_k: int,
+                   per_domain_quota: Optional[int], include_embeddings: bool = False, routing: bool = True):
+        """검색 캐시 키 생성 (정규화 질문, 도메인, top_k, 인덱스 버전)"""
+        if domains:
+            scope = tuple(domains)
+            versions = tuple(self.index_versions.get(d, 0) for d in domains)
+        else:
+            # 전체 컬렉션은 모든 도메인 문서를 포함하므로 전체 버전을 키에 포함
+            scope = (RetrievalCache.GLOBAL_SCOPE, routing and self.domain_routing)
+            versions = tuple(sorted(self.index_versions.items()))
+        return (RetrievalCache.normalize_query(question), scope, top_k, per_domain_quota,
+                include_embeddings, versions)
+    
+    def retrieve_relevant_chunks(self, question: str, domain: Union[str, List[str], None] = None,
+                                 top_k: int = 5, per_domain_quota: Optional[int] = None,
+                                 include_embeddings: bool = False, routing: bool = True,
+                                 use_cache: bool = True, record_shadow: bool = True) -> List[Dict]:
+        """질문과 관련된 문서 청크들을 검색 (도메인 목록 지정 시 다중 도메인 동시 검색,
+        routing=False 이면 도메인 미지정 질문을 라우팅 없이 전체 컬렉션에서 검색,
+        use_cache=False 이면 검색 캐시를 조회/저장하지 않음,
+        record_shadow=False 이면 도메인 지정 질문을 라우팅 정확도 통계에 기록하지 않음 (평가/내부 호출))"""
         try:
+            domains = self._resolve_domains(domain)
+            
+            # 캐시 조회
+            cache_key = self._cache_key(question, domains, top_k, per_domain_quota, include_embeddings, routing)
+            cached = self.retrieval_cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                return cached
+            
             # 질문 임베딩 생성
             question_embedding = self.embeddings.embed_query(question)
             
-            # 검색할 컬렉션 선택
-            collection = self.domain_collections.get(domain, self.collection) if domain else self.collection
-            
-            # 유사도 검색
-            results = collection.query(
-                query_embeddings=[question_embedding],
-                n_results=top_k,
-                include=["documents", "metadatas", "distances"]
-            )
+            # 도메인 미지정 시 가까운 도메인 컬렉션으로 라우팅 (프로필이 없으면 전체 컬렉션)
+            search_domains = domains
+            if not domains and routing and self.domain_routing:
+                decision = self.domain_router.route(question_embedding, question)
+                if decision:
+                    search_domains = decision["domains"]
+                    print(f"🧭 도메인 라우팅: {search_domains} {decision['scores']} ({decision['elapsed_ms']:.2f}ms)")
+            elif domains and self.routing_shadow and record_shadow:
+                self.domain_router.record_shadow(self.domain_router.route(question_embedding, question), domains)
             
-            # 결과 포맷팅
-            chunks = []
-            if results['documents'] and results['documents'][0]:
-                for i, (doc, metadata, distance) in enumerate(zip(
-                    results['documents'][0], 
-                    results['metadatas'][0], 
-                    results['distances'][0]
-                )):
-                    chunks.append({
-                        "content": doc,
-                        "metadata": metadata,
-                        "similarity_score": 1 - distance,  # 코사인 유사도로 변환
-                        "rank": i + 1
-                    })
+            # 검색할 컬렉션 선택
+            if search_domains and len(search_domains) > 1:
+                chunks = self._retrieve_multi_domain(question_embedding, search_domains, top_k, per_domain_quota,
+                                                     include_embeddings)
+            else:
+                collection = self.domain_collections[search_domains[0]] if search_domains else self.collection
+                chunks = self._query_collection(collection, question_embedding, top_k, include_embeddings)
             
+            if use_cache:
+                scopes = set(domains) if domains else {RetrievalCache.GLOBAL_SCOPE}
+                self.retrieval_cache.put(cache_key, scopes, chunks)
             return chunks
             
         except Exception as e:
             print(f"청크 검색 중 오류: {e}")
             return []
     
-    def get_rag_context(self, question: str, domain: Optional[str] = None, top_k: int = 5) -> str:
-        """질문에 대한 RAG 컨텍스트 생성"""
-        chunks = self.retrieve_relevant_chunks(question, domain, top_k)
-        
-        if not chunks:
-            return ""
+    def retrieve_adaptive(self, question: str, domain: Union[str, List[str], None] = None,
+                          top_k: int = 5, per_domain_quota: Optional[int] = None) -> Dict:
+        """후보를 넉넉히 검색한 뒤 적응형 컷오프로 k를 정함 (관련 청크가 없으면 0개)"""
+        candidates = self.retrieve_relevant_chunks(
+            question, domain, top_k * self.context_fetch_factor, per_domain_quota
+        )
+        passed, cutoff = self.context_selector.adaptive_cutoff(candidates)
+        chunks = [dict(chunk, rank=i + 1) for i, chunk in enumerate(passed[:top_k])]
+        return {
+            "chunks": chunks,
+            "chosen_k": len(chunks),
+            "candidates": len(candidates),
+            "cutoff": cutoff
+        }
+    
+    def build_rag_context(self, question: str, domain: Union[str, List[str], None] = None,
+                          top_k: int = 5, token_budget: Optional[int] = None) -> Dict:
+        """질문에 대한 RAG 컨텍스트와 후처리 통계 생성"""
+        # 후보를 넉넉히 가져온 뒤 컷오프/중복 제거/MMR/인접 병합으로 top_k 이하로 줄임
+        candidates = self.retrieve_relevant_chunks(
+            question, domain, top_k * self.context_fetch_factor, include_embeddings=True
+        )
+        # 토큰 예산을 넘으면 하위 순위 청크부터 사전 계산된 요약으로 대체
+        if token_budget is None:
+            token_budget = self.context_token_budget
+        chunks, stats = self.context_selector.select(candidates, top_k, token_budget)
         
         # 컨텍스트 구성
         context_parts = []
@@ -310,37 +1299,140 @@ class RAGService:
             content = chunk['content']
             similarity = chunk['similarity_score']
             
-            context_part = f"[{metadata['domain']}:{metadata['filename']} - 청크 {metadata['chunk_index']+1}/{metadata['total_chunks']} - 유사도: {similarity:.3f}]\n{content}\n"
+            start = metadata['chunk_index'] + 1
+            end = metadata.get('chunk_end', metadata['chunk_index']) + 1
+            chunk_label = f"{start}-{end}" if end > start else f"{start}"
+            
+            if chunk.get('summarized'):
+                chunk_label += " 요약"
+            
+            context_part = f"[{metadata['domain']}:{metadata['filename']} - 청크 {chunk_label}/{metadata['total_chunks']} - 유사도: {similarity:.3f}]\n{content}\n"
             context_parts.append(context_part)
         
-        return "\n".join(context_parts)
+        if candidates and not chunks:
+            print(f"✂️ 관련 청크 없음 (최고 유사도 {stats['cutoff']['best_similarity']:.3f}) - RAG 컨텍스트 생략")
+        elif stats["tokens_saved"] > 0:
+            print(f"✂️ RAG 컨텍스트 후처리: {stats['tokens_before']} -> {stats['tokens_after']} 토큰 "
+                  f"(k={stats['chosen_k']}, 중복 {stats['duplicates_removed']}개 제거, 인접 청크 {stats['merged_chunks']}개 병합, "
+                  f"요약 대체 {stats['summarized_chunks']}개)")
+        
+        return {
+            "context": "\n".join(context_parts),
+            "chunks": chunks,
+            "stats": stats
+        }
+    
+    def get_rag_context(self, question: str, domain: Union[str, List[str], None] = None, top_k: int = 5) -> str:
+        """질문에 대한 RAG 컨텍스트 생성"""
+        return self.build_rag_context(question, domain, top_k)["context"]
     
     def delete_document(self, domain: str, filename: str) -> Dict:
         """특정 문서의 모든 청크를 삭제"""
+        with self.write_lock:
+            try:
+                # 메타데이터로 문서 필터링
+                where_clause = {
+                    "$and": [
+                        {"domain": domain},
+                        {"filename": filename}
+                    ]
+                }
+            
+                # 라우팅 프로필에서 차감 후 전체 컬렉션에서 삭제
+                self._forget_chunks(domain, where=where_clause)
+                self.collection.delete(where=where_clause)
+            
+                # 도메인별 컬렉션에서도 삭제
+                if domain in self.domain_collections:
+                    self.domain_collections[domain].delete(where=where_clause)
+            
+                self._bump_index_version(domain)
+                self.domain_router.save()
+            
+                return {
+                    "success": True,
+                    "message": f"{filename} 문서가 성공적으로 삭제되었습니다."
+                }
+            
+            except Exception as e:
+                return {
+                    "success": False,
+                    "error": str(e)
+                }
+    
+    def delete_chunks(self, domain: str, chunk_ids: List[str]):
+        """청크 ID 목록을 전체/도메인 컬렉션에서 삭제"""
+        with self.write_lock:
+            self._forget_chunks(domain, ids=chunk_ids)
+            for collection in self._target_collections(domain):
+                collection.delete(ids=chunk_ids)
+            self._bump_index_version(domain)
+            self.domain_router.save()
+    
+    def _forget_chunks(self, domain: str, **filters):
+        """삭제할 청크의 임베딩/본문을 도메인 라우팅 프로필에서 차감"""
+        if domain not in self.domain_collections:
+            return
+        page = self.domain_collections[domain].get(include=["embeddings", "documents"], **filters)
+        if page["ids"]:
+            self.domain_router.forget(domain, page["embeddings"], page["documents"])
+    
+    def summarize_existing_chunks(self, domain: Optional[str] = None, overwrite: bool = False) -> Dict:
+        """이미 색인된 청크에 요약 메타데이터 채우기 (백필)"""
+        if not self.llm_base_url:
+            return {"success": False, "error": "LLM_BASE_URL이 설정되지 않았습니다."}
+        
         try:
-            # 메타데이터로 문서 필터링
-            where_clause = {
-                "domain": domain,
-                "filename": filename
-            }
+            collection = self.domain_collections[domain] if domain else self.collection
+            summarized = failed = skipped = 0
+            touched_domains = set()
             
-            # 전체 컬렉션에서 삭제
-            self.collection.delete(where=where_clause)
+            for page in self._iter_collection_batches(collection, ["documents", "metadatas"], self.ingest_batch_size):
+                targets = [
+                    (chunk_id, document, metadata or {})
+                    for chunk_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"])
+                    if overwrite or not (metadata or {}).get("summary")
+                ]
+                skipped += len(page["ids"]) - len(targets)
+                if not targets:
+                    continue
+                
+                summaries = self._summarize_batch([document for _, document, _ in targets])
+                by_domain = {}
+                for (chunk_id, _, metadata), summary in zip(targets, summaries):
+                    if not summary:
+                        failed += 1
+                        continue
+                    metadata.update(summary)
+                    by_domain.setdefault(metadata.get("domain"), ([], []))
+                    by_domain[metadata.get("domain")][0].append(chunk_id)
+                    by_domain[metadata.get("domain")][1].append(metadata)
+                    summarized += 1
+                
+                with self.write_lock:
+                    for chunk_domain, (ids, metadatas) in by_domain.items():
+                        for target in self._target_collections(chunk_domain):
+                            target.update(ids=ids, metadatas=metadatas)
+                        touched_domains.add(chunk_domain)
             
-            # 도메인별 컬렉션에서도 삭제
-            if domain in self.domain_collections:
-                self.domain_collections[domain].delete(where=where_clause)
+            for chunk_domain in touched_domains:
+                if chunk_domain in self.domain_collections:
+                    self._bump_index_version(chunk_domain)
             
+            print(f"📝 청크 요약 백필 완료: {summarized}개 생성, {failed}개 실패, {skipped}개 건너뜀")
             return {
                 "success": True,
-                "message": f"{filename} 문서가 성공적으로 삭제되었습니다."
+                "summarized": summarized,
+                "failed": failed,
+                "skipped": skipped
             }
             
         except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
+            return {"success": False, "error": str(e)}
+    
+    def _dispatch_stats(self) -> Optional[Dict]:
+        """임베딩 마이크로 배칭 통계 (비활성화 시 None)"""
+        return self.embeddings.get_stats() if isinstance(self.embeddings, EmbeddingDispatcher) else None
     
     def get_document_stats(self, domain: Optional[str] = None) -> Dict:
         """문서 통계 정보 반환"""
@@ -355,7 +1447,12 @@ class RAGService:
                 return {
                     "domain": domain,
                     "total_chunks": count,
-                    "collection_name": collection.name
+                    "collection_name": collection.name,
+                    "index_version": self.index_versions.get(domain, 0),
+                    "cache": self.retrieval_cache.get_stats(),
+                    "context": self.context_selector.get_stats(),
+                    "embedding_dispatch": self._dispatch_stats(),
+                    "domain_routing": self.domain_router.get_stats()
                 }
             else:
                 # 전체 통계
@@ -365,7 +1462,12 @@ class RAGService:
                 
                 return {
                     "total_chunks": count,
-                    "domain_stats": domain_stats
+                    "domain_stats": domain_stats,
+                    "index_versions": dict(self.index_versions),
+                    "cache": self.retrieval_cache.get_stats(),
+                    "context": self.context_selector.get_stats(),
+                    "embedding_dispatch": self._dispatch_stats(),
+                    "domain_routing": self.domain_router.get_stats()
                 }
                 
         except Exception as e:
@@ -373,13 +1475,239 @@ class RAGService:
                 "error": str(e)
             }
     
+    def _iter_collection_batches(self, collection, include: List[str], batch_size: int = 1000) -> Iterator[Dict]:
+        """컬렉션 전체를 페이지 단위로 조회"""
+        offset = 0
+        while True:
+            page = collection.get(include=include, limit=batch_size, offset=offset)
+            if not page["ids"]:
+                break
+            yield page
+            if len(page["ids"]) < batch_size:
+                break
+            offset += batch_size
+    
+    @staticmethod
+    def _file_sha256(path: str) -> str:
+        """파일 SHA-256 체크섬"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def export_snapshot(self, path: Optional[str] = None) -> Dict:
+        """청크/메타데이터/임베딩을 Parquet 스냅샷 + 매니페스트로 내보내기"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            return {"success": False, "error": "스냅샷 기능에는 pyarrow 패키지가 필요합니다."}
+        
+        if path is None:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            path = os.path.join(self.snapshot_dir, f"rag_snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet")
+        manifest_path = f"{path}.manifest.json"
+        
+        try:
+            with self.write_lock:
+                writer = None
+                rows = 0
+                dimensions = None
+                domain_counts = {}
+                try:
+                    # 페이지 단위로 읽어 row group으로 기록 (전체 컬렉션을 메모리에 올리지 않음)
+                    for page in self._iter_collection_batches(
+                        self.collection, ["documents", "metadatas", "embeddings"], self.snapshot_batch_size
+                    ):
+                        embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+                        dimensions = dimensions or int(embeddings.shape[1])
+                        for metadata in page["metadatas"]:
+                            domain = (metadata or {}).get("domain")
+                            domain_counts[domain] = domain_counts.get(domain, 0) + 1
+                        
+                        table = pa.table({
+                            "id": pa.array(page["ids"], type=pa.string()),
+                            "document": pa.array(page["documents"], type=pa.string()),
+                            "metadata": pa.array(
+                                [json.dumps(metadata or {}, ensure_ascii=False) for metadata in page["metadatas"]],
+                                type=pa.string()
+                            ),
+                            "embedding": pa.FixedSizeListArray.from_arrays(
+                                pa.array(embeddings.reshape(-1), type=pa.float32()), dimensions
+                            )
+                        })
+                        if writer is None:
+                            writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+                        writer.write_table(table)
+                        rows += len(page["ids"])
+                finally:
+                    if writer is not None:
+                        writer.close()
+            
+            if writer is None:
+                return {"success": False, "error": "내보낼 청크가 없습니다."}
+            
+            manifest = {
+                "format_version": SNAPSHOT_FORMAT_VERSION,
+                "created_at": datetime.now().isoformat(),
+                "file": os.path.basename(path),
+                "sha256": self._file_sha256(path),
+                "size_bytes": os.path.getsize(path),
+                "rows": rows,
+                "dimensions": dimensions,
+                "embedding_provider": self.embedding_provider,
+                "embedding_model": self.embedding_model,
+                "chunker": self.chunker_type,
+                "domain_counts": domain_counts
+            }
+            with open(manifest_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            
+            print(f"📦 RAG 스냅샷 내보내기 완료: {rows}개 청크 -> {path}")
+            return {
+                "success": True,
+                "path": path,
+                "manifest_path": manifest_path,
+                "manifest": manifest
+            }
+            
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def import_snapshot(self, path: str, force: bool = False) -> Dict:
+        """Parquet 스냅샷을 임베딩 호출 없이 일괄 적재 (기존 컬렉션은 교체)"""
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            return {"success": False, "error": "스냅샷 기능에는 pyarrow 패키지가 필요합니다."}
+        
+        if path.endswith(".manifest.json"):
+            path = path[:-len(".manifest.json")]
+        manifest_path = f"{path}.manifest.json"
+        
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            
+            # 무결성 및 임베딩 모델 호환성 검증
+            if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+                return {"success": False, "error": f"지원하지 않는 스냅샷 버전입니다: {manifest.get('format_version')}"}
+            if self._file_sha256(path) != manifest["sha256"]:
+                return {"success": False, "error": "스냅샷 체크섬이 일치하지 않습니다."}
+            if not force and (manifest["embedding_provider"], manifest["embedding_model"]) != \
+                    (self.embedding_provider, self.embedding_model):
+                return {
+                    "success": False,
+                    "error": f"임베딩 모델이 다릅니다: {manifest['embedding_provider']}/{manifest['embedding_model']}"
+                }
+            
+            started = datetime.now()
+            with self.write_lock:
+                # 새 실제 컬렉션에 적재 후 개수 검증이 끝나면 교체 (실패 시 기존 인덱스 유지)
+                suffix = started.strftime('%Y%m%d%H%M%S%f')
+                staged = {}
+                try:
+                    for logical_name in self._collection_names():
+                        params = self._hnsw_params(logical_name)
+                        staged[logical_name] = self.client.create_collection(
+                            name=f"{logical_name}_s{suffix}",
+                            metadata=self._hnsw_metadata(params)
+                        )
+                        if "search_ef" in params:
+                            self._apply_search_ef(staged[logical_name], params["search_ef"])
+                    
+                    rows = 0
+                    expected = {}
+                    parquet_file = pq.ParquetFile(path)
+                    for batch in parquet_file.iter_batches(batch_size=self.snapshot_batch_size):
+                        ids = batch.column("id").to_pylist()
+                        documents = batch.column("document").to_pylist()
+                        metadatas = [json.loads(metadata) for metadata in batch.column("metadata").to_pylist()]
+                        embeddings = batch.column("embedding").flatten().to_numpy(zero_copy_only=False) \
+                            .reshape(len(ids), manifest["dimensions"])
+                        
+                        staged["rag_documents"].add(ids=ids, documents=documents, metadatas=metadatas,
+                                                    embeddings=embeddings)
+                        
+                        # 도메인 컬렉션에는 해당 도메인 청크만 적재
+                        by_domain = {}
+                        for i, metadata in enumerate(metadatas):
+                            by_domain.setdefault(metadata.get("domain"), []).append(i)
+                        for domain, indexes in by_domain.items():
+                            if f"rag_{domain}" in staged:
+                                staged[f"rag_{domain}"].add(
+                                    ids=[ids[i] for i in indexes],
+                                    documents=[documents[i] for i in indexes],
+                                    metadatas=[metadatas[i] for i in indexes],
+                                    embeddings=embeddings[indexes]
+                                )
+                                expected[f"rag_{domain}"] = expected.get(f"rag_{domain}", 0) + len(indexes)
+                        rows += len(ids)
+                    
+                    expected["rag_documents"] = rows
+                    if rows != manifest["rows"]:
+                        raise RuntimeError(f"스냅샷 행 수가 매니페스트와 다릅니다: {rows} != {manifest['rows']}")
+                    for logical_name, collection in staged.items():
+                        if collection.count() != expected.get(logical_name, 0):
+                            raise RuntimeError(f"{logical_name} 적재 청크 수가 다릅니다: "
+                                               f"{collection.count()} != {expected.get(logical_name, 0)}")
+                except Exception:
+                    for collection in staged.values():
+                        try:
+                            self.client.delete_collection(collection.name)
+                        except Exception:
+                            pass
+                    raise
+                
+                # 레지스트리 교체 후 참조 전환, 이전 컬렉션은 교체가 끝난 뒤 삭제
+                previous = [self._get_collection(logical_name).name for logical_name in staged]
+                for logical_name, collection in staged.items():
+                    entry = self.collection_registry.get(logical_name, {})
+                    self.collection_registry[logical_name] = dict(entry, name=collection.name)
+                self._save_registry()
+                for logical_name, collection in staged.items():
+                    self._set_collection(logical_name, collection)
+                
+                for domain in self.domain_collections:
+                    self._bump_index_version(domain)
+                self.domain_router.rebuild(self.domain_collections, self.snapshot_batch_size)
+                
+                for name in previous:
+                    try:
+                        self.client.delete_collection(name)
+                    except Exception as e:
+                        print(f"⚠️ 이전 컬렉션 삭제 실패 ({name}): {e}")
+            
+            self.snapshot_source = path
+            elapsed = (datetime.now() - started).total_seconds()
+            print(f"📦 RAG 스냅샷 적재 완료: {rows}개 청크 ({elapsed:.1f}초)")
+            return {
+                "success": True,
+                "path": path,
+                "rows": rows,
+                "elapsed_seconds": round(elapsed, 2),
+                "manifest": manifest
+            }
+            
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def bootstrap_from_snapshot(self, path: Optional[str] = None) -> Optional[Dict]:
+        """비어 있는 노드를 스냅샷으로 초기화 (RAG_SNAPSHOT_BOOTSTRAP)"""
+        path = path or os.getenv('RAG_SNAPSHOT_BOOTSTRAP')
+        if not path or self.collection.count() > 0:
+            return None
+        if not os.path.exists(path):
+            print(f"⚠️ 부트스트랩 스냅샷을 찾을 수 없습니다: {path}")
+            return None
+        return self.import_snapshot(path)
+    
     def process_all_existing_documents(self, rag_folder: str = None):
+        """기존 RAG 폴더의 모든 문서를 처리 (기본: 업로드/정합성 점검과 같은 config.UPLOAD_FOLDER)"""
         if rag_folder is None:
-            # 상위 디렉토리의 data/rag_files 폴더 사용
-            current_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-            rag_folder = os.path.join(current_dir, "data", "rag_files")
-        """기존 RAG 폴더의 모든 문서를 처리"""
-        domains = ['personal_credit', 'corporate_credit', 'policy_regulation']
+            rag_folder = config.UPLOAD_FOLDER
+        domains = list(config.RAG_DOMAINS.keys())
         results = []
         
         for domain in domains:
@@ -387,7 +1715,7 @@ class RAGService:
             if os.path.exists(domain_path):
                 for filename in os.listdir(domain_path):
                     filepath = os.path.join(domain_path, filename)
-                    if os.path.isfile(filepath) and filename.endswith('.txt'):
+                    if os.path.isfile(filepath) and get_extractor(filename) is not None:
                         result = self.process_document(filepath, domain, filename)
                         results.append(result)
         
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RAG 검색 품질/지연 평가
+라벨링된 질문 세트(정답 파일 + 정답 문자열)로 RAGService 검색의
+recall@k, MRR, 쿼리 지연(p50/p95)을 계산
+"""
+
+import os
+import json
+import math
+import time
+from typing import Dict, List, Optional
+
+# 기본 평가 질문 세트 (data/rag_files 샘플 문서 기준)
+DEFAULT_EVALUATION_SET = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data", "evaluation", "rag_questions.json"
+)
+
+def load_evaluation_set(path: Optional[str] = None) -> List[Dict]:
+    """평가 질문 세트 로드 -> [{"id", "question", "domain", "filename", "answer_contains"}]"""
+    with open(path or DEFAULT_EVALUATION_SET, 'r', encoding='utf-8') as f:
+        return json.load(f)["questions"]
+
+def _percentile(values: List[float], p: float) -> float:
+    """백분위수 (선형 보간)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * p / 100
+    low, high = math.floor(position), math.ceil(position)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+def is_relevant_chunk(chunk: Dict, question: Dict) -> bool:
+    """정답 파일의 청크이고 정답 문자열을 포함하면 관련 청크로 판단 (청킹 설정과 무관)"""
+    metadata = chunk.get("metadata", {})
+    if question.get("filename") and metadata.get("filename") != question["filename"]:
+        return False
+    answer = question.get("answer_contains")
+    return not answer or answer in chunk.get("content", "")
+
+def evaluate_retrieval(rag_service, questions: List[Dict], top_k: int = 5, scope: str = "domain",
+                       routing: bool = True) -> Dict:
+    """질문 세트로 검색 평가 (scope: domain=질문 도메인 컬렉션, global=도메인 미지정,
+    routing=False 이면 global 질문을 라우팅 없이 전체 컬렉션에서 검색)"""
+    latencies = []
+    hits = file_hits = 0
+    reciprocal_ranks = []
+    misses = []
+
+    for question in questions:
+        domain = question.get("domain") if scope == "domain" else None
+        start = time.perf_counter()
+        # 캐시 적중이 지연 측정에 섞이지 않도록 캐시를 거치지 않고, 운영 라우팅 통계에도 기록하지 않음
+        chunks = rag_service.retrieve_relevant_chunks(question["question"], domain, top_k, routing=routing,
+                                                      use_cache=False, record_shadow=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        rank = next((i + 1 for i, chunk in enumerate(chunks) if is_relevant_chunk(chunk, question)), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        file_hits += any(chunk["metadata"].get("filename") == question.get("filename") for chunk in chunks)
+        if rank is None:
+            misses.append(question.get("id", question["question"]))
+
+    total = len(questions) or 1
+    return {
+        "questions": len(questions),
+        "top_k": top_k,
+        "scope": scope,
+        f"recall@{top_k}": round(hits / total, 4),
+        f"file_recall@{top_k}": round(file_hits / total, 4),
+        "mrr": round(sum(reciprocal_ranks) / total, 4),
+        "latency_p50_ms": round(_percentile(latencies, 50), 3),
+        "latency_p95_ms": round(_percentile(latencies, 95), 3),
+        "misses": misses
+    }
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+스키마 벡터 인덱스 (Schema-as-RAG)
+메타데이터의 테이블/컬럼 설명을 임베딩해 두고 질문과 관련된 상위 N개 컬럼을 찾아
+프롬프트 스키마 축소와 규칙 기반 SQL 변환에 사용
+"""
+
+import os
+import re
+import time
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+def _bigrams(text: str) -> set:
+    """공백 제거 후 문자 bigram 집합 (한국어 설명 부분 일치용)"""
+    compact = re.sub(r'\s+', '', text.lower())
+    if len(compact) < 2:
+        return {compact} if compact else set()
+    return {compact[i:i + 2] for i in range(len(compact) - 1)}
+
+class SchemaIndex:
+    """테이블/컬럼 설명 임베딩 인덱스 (메모리 내 행렬, 메타데이터 변경 시 재구축)"""
+
+    def __init__(self, embeddings, top_n: Optional[int] = None, lexical_weight: Optional[float] = None):
+        self.embeddings = embeddings
+        self.top_n = top_n or int(os.getenv('SCHEMA_LINK_TOP_N', '15'))
+        # 임베딩 유사도와 설명 문자 bigram 겹침의 가중 합 (짧은 컬럼 설명은 임베딩만으로 불안정)
+        self.lexical_weight = lexical_weight if lexical_weight is not None else \
+            float(os.getenv('SCHEMA_LINK_LEXICAL_WEIGHT', '0.3'))
+
+        self._lock = threading.Lock()
+        # 재구축은 한 번에 하나씩 (시작 시 백그라운드 구축과 메타데이터 변경 시 재구축이 겹치지 않도록)
+        self._build_lock = threading.Lock()
+        self.columns = []        # [{"table", "column", "type", "description", "text"}]
+        self.matrix = None       # (컬럼 수, 차원) 정규화 임베딩
+        self.fingerprint = None
+        self.built_at = None
+        self.build_ms = 0.0
+        # 같은 설명 문장은 재임베딩하지 않도록 텍스트 -> 벡터 캐시
+        self._vector_cache = {}
+
+    @staticmethod
+    def _column_text(table: str, table_info: Dict, column: str, column_info: Dict) -> str:
+        """임베딩할 컬럼 설명 문장"""
+        parts = [f"{table}.{column}", f"({column_info.get('type', '')})"]
+        description = str(column_info.get("description") or "").strip()
+        if description and description.lower() != "nan":
+            parts.append(description)
+        if table_info.get("description"):
+            parts.append(f"[{table_info['description']}]")
+        return " ".join(parts)
+
+    @staticmethod
+    def _fingerprint(meta: Dict) -> str:
+        """메타데이터 내용 해시 (변경 없으면 재구축 생략)"""
+        items = []
+        for table, table_info in sorted(meta.get("tables", {}).items()):
+            items.append(f"{table}|{table_info.get('description', '')}")
+            for column, column_info in sorted(table_info.get("columns", {}).items()):
+                items.append(f"{table}.{column}|{column_info.get('type', '')}|{column_info.get('description', '')}")
+        return hashlib.sha256("\n".join(items).encode('utf-8')).hexdigest()
+
+    def rebuild_async(self, meta: Optional[Dict]) -> threading.Thread:
+        """백그라운드 스레드에서 재구축 (앱 시작이 임베딩 제공자 응답을 기다리지 않도록)"""
+        thread = threading.Thread(target=self.rebuild, args=(meta,), name="schema-index-build", daemon=True)
+        thread.start()
+        return thread
+
+    def rebuild(self, meta: Optional[Dict], force: bool = False) -> Dict:
+        """메타데이터로 인덱스 재구축"""
+        with self._build_lock:
+            return self._rebuild(meta, force)
+
+    def _rebuild(self, meta: Optional[Dict], force: bool) -> Dict:
+        if not meta or not meta.get("tables"):
+            with self._lock:
+                self.columns, self.matrix, self.fingerprint = [], None, None
+            return {"success": True, "columns": 0}
+
+        fingerprint = self._fingerprint(meta)
+        if not force and fingerprint == self.fingerprint:
+            return {"success": True, "columns": len(self.columns), "skipped": True}
+
+        start = time.perf_counter()
+        columns = []
+        for table, table_info in meta["tables"].items():
+            for column, column_info in table_info.get("columns", {}).items():
+                description = str(column_info.get("description") or "").strip()
+                columns.append({
+                    "table": table,
+                    "column": column,
+                    "type": column_info.get("type", ""),
+                    "description": "" if description.lower() == "nan" else description,
+                    "text": self._column_text(table, table_info, column, column_info)
+                })
+        for column in columns:
+            column["_bigrams"] = _bigrams(f"{column['column'].replace('_', ' ')} {column['description']}")
+
+        try:
+            pending = sorted({c["text"] for c in columns if c["text"] not in self._vector_cache})
+            if pending:
+                for text, vector in zip(pending, self.embeddings.embed_documents(pending)):
+                    self._vector_cache[text] = vector
+
+            matrix = np.asarray([self._vector_cache[c["text"]] for c in columns], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1.0, norms)
+
+            with self._lock:
+                self.columns, self.matrix, self.fingerprint = columns, matrix, fingerprint
+                self.built_at = time.time()
+                self.build_ms = (time.perf_counter() - start) * 1000
+
+            print(f"🗂️ 스키마 인덱스 구축: {len(meta['tables'])}개 테이블, {len(columns)}개 컬럼 "
+                  f"(신규 임베딩 {len(pending)}개, {self.build_ms:.1f}ms)")
+            return {"success": True, "columns": len(columns), "embedded": len(pending),
+                    "build_ms": round(self.build_ms, 1)}
+
+        except Exception as e:
+            # 임베딩 실패 시 컬럼 목록만 두어 설명 bigram 연결은 계속 동작 (지문은 비워 다음 재구축에서 재시도)
+            with self._lock:
+                self.columns, self.matrix, self.fingerprint = columns, None, None
+            print(f"❌ 스키마 인덱스 구축 실패 (설명 일치로만 연결): {e}")
+            return {"success": False, "columns": len(columns), "error": str(e)}
+
+    def link(self, question: str, top_n: Optional[int] = None) -> List[Dict]:
+        """질문과 관련된 상위 N개 컬럼 -> [{"table", "column", "type", "description", "score"}]
+
+        임베딩이 없거나 질문 임베딩에 실패하면 설명 bigram 겹침만으로 연결
+        """
+        with self._lock:
+            columns, matrix = self.columns, self.matrix
+        if not columns:
+            return []
+
+        semantic = None
+        if matrix is not None:
+            try:
+                query = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+                norm = np.linalg.norm(query)
+                semantic = matrix @ (query / norm if norm else query)
+            except Exception as e:
+                print(f"⚠️ 스키마 연결 질문 임베딩 실패 (설명 일치로만 연결): {e}")
+
+        question_bigrams = _bigrams(question)
+        lexical = np.asarray([
+            len(column["_bigrams"] & question_bigrams) / len(column["_bigrams"]) if column["_bigrams"] else 0.0
+            for column in columns
+        ], dtype=np.float32)
+        if semantic is None:
+            if not lexical.any():
+                return []
+            scores = lexical
+        else:
+            scores = (1 - self.lexical_weight) * semantic + self.lexical_weight * lexical
+
+        n = min(top_n or self.top_n, len(columns))
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top])]
+        return [{
+            "table": columns[i]["table"],
+            "column": columns[i]["column"],
+            "type": columns[i]["type"],
+            "description": columns[i]["description"],
+            "score": round(float(scores[i]), 4)
+        } for i in top]
+
+    @staticmethod
+    def rank_tables(links: List[Dict]) -> List[Dict]:
+        """연결된 컬럼 점수를 테이블 단위로 집계 (최고 점수 순)"""
+        tables = {}
+        for link in links:
+            entry = tables.setdefault(link["table"], {"table": link["table"], "score": link["score"], "columns": []})
+            entry["score"] = max(entry["score"], link["score"])
+            entry["columns"].append(link["column"])
+        return sorted(tables.values(), key=lambda t: t["score"], reverse=True)
+
+    def prune_metadata(self, question: str, meta: Dict, top_n: Optional[int] = None) -> Dict:
+        """연결된 컬럼만 남긴 메타데이터 (조인 키 유지를 위해 테이블별 *_id 컬럼 포함)"""
+        links = self.link(question, top_n)
+        if not links:
+            return meta
+
+        linked = {}
+        for link in links:
+            linked.setdefault(link["table"], set()).add(link["column"])
+
+        pruned = {"tables": {}}
+        for table, names in linked.items():
+            table_info = meta["tables"].get(table)
+            if not table_info:
+                continue
+            columns = {
+                column: info for column, info in table_info["columns"].items()
+                if column in names or column.endswith("_id")
+            }
+            pruned["tables"][table] = {"description": table_info.get("description", ""), "columns": columns}
+        return pruned if pruned["tables"] else meta
+
+    def get_status(self) -> Dict:
+        """인덱스 상태"""
+        with self._lock:
+            return {
+                "columns": len(self.columns),
+                "tables": len({c["table"] for c in self.columns}),
+                "fingerprint": self.fingerprint,
+                "built_at": self.built_at,
+                "build_ms": round(self.build_ms, 1),
+                "top_n": self.top_n,
+                "lexical_weight": self.lexical_weight
+            }
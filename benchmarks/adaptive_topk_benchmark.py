@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+적응형 top_k 벤치마크
+고정 top_k 컨텍스트와 절대/상대 유사도 컷오프, knee 절단을 적용한 컨텍스트의
+선택된 k, 컨텍스트 토큰, 정답 포함률, 무관한 질문의 RAG 생략률을 비교
+
+실행: python benchmarks/adaptive_topk_benchmark.py [--top-k 5] [--chunk-tokens 120]
+"""
+
+import os
+import argparse
+
+from common import make_rag_service, ingest_rag_sources, load_questions, percentile, print_table
+
+# 샘플 문서와 무관한 질문 (컨텍스트가 비어야 정상)
+OFF_TOPIC_QUESTIONS = [
+    "오늘 서울 날씨는 어때?",
+    "점심 메뉴로 뭐가 좋을까?",
+    "축구 경기 결과 알려줘",
+    "파이썬 리스트 정렬 방법",
+    "주말에 볼 만한 영화 추천",
+]
+
+# (이름, 최소 유사도, 상대 컷오프, knee 간격)
+CONFIGS = [
+    ("fixed", 0.0, 0.0, 0.0),
+    ("absolute", None, 0.0, 0.0),
+    ("relative", None, 0.5, 0.0),
+    ("knee", None, 0.0, 0.15),
+    ("relative+knee", None, 0.5, 0.15),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description="적응형 top_k 벤치마크")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--chunk-tokens", type=int, default=120, help="청크 최대 토큰 (샘플 문서가 작아 기본값을 낮춤)")
+    parser.add_argument("--min-similarity", type=float, default=0.05,
+                        help="절대 컷오프 (해싱 임베딩은 코사인 값이 낮아 기본값을 낮춤)")
+    args = parser.parse_args()
+
+    os.environ['RAG_CHUNK_MAX_TOKENS'] = str(args.chunk_tokens)
+    os.environ['RAG_CHUNK_OVERLAP_TOKENS'] = str(args.chunk_tokens // 10)
+    # 요약 대체가 토큰 수에 섞이지 않도록 예산 비활성화
+    os.environ['RAG_CONTEXT_TOKEN_BUDGET'] = '0'
+
+    service = make_rag_service()
+    chunks = ingest_rag_sources(service)
+    questions = load_questions()
+    print(f"청크 {chunks}개, 질문 {len(questions)}개 + 무관한 질문 {len(OFF_TOPIC_QUESTIONS)}개, top_k={args.top_k}\n")
+
+    selector = service.context_selector
+    rows = []
+    baseline_tokens = None
+    for name, min_similarity, relative_cutoff, knee_gap in CONFIGS:
+        selector.min_similarity = args.min_similarity if min_similarity is None else min_similarity
+        selector.relative_cutoff = relative_cutoff
+        selector.knee_gap = knee_gap
+
+        tokens, ks = [], []
+        hits = 0
+        for question in questions:
+            result = service.build_rag_context(question["question"], question["domain"], args.top_k)
+            tokens.append(service.token_counter.count(result["context"]))
+            ks.append(result["stats"]["chosen_k"])
+            hits += question["answer_contains"] in result["context"]
+
+        skipped = 0
+        off_topic_tokens = []
+        for question in OFF_TOPIC_QUESTIONS:
+            result = service.build_rag_context(question, None, args.top_k)
+            skipped += not result["chunks"]
+            off_topic_tokens.append(service.token_counter.count(result["context"]))
+
+        total_tokens = sum(tokens) + sum(off_topic_tokens)
+        if baseline_tokens is None:
+            baseline_tokens = total_tokens
+        rows.append({
+            "config": name,
+            "min_sim": selector.min_similarity,
+            "relative": relative_cutoff,
+            "knee": knee_gap,
+            "avg_k": round(sum(ks) / len(ks), 2),
+            "avg_ctx_tokens": round(sum(tokens) / len(tokens), 1),
+            "p95_ctx_tokens": round(percentile(tokens, 95), 1),
+            "answer_in_ctx": round(hits / len(questions), 3),
+            "off_topic_skipped": f"{skipped}/{len(OFF_TOPIC_QUESTIONS)}",
+            "tokens_saved": f"{(1 - total_tokens / baseline_tokens) * 100:.1f}%" if baseline_tokens else "-"
+        })
+
+    print_table(rows, ["config", "min_sim", "relative", "knee", "avg_k", "avg_ctx_tokens", "p95_ctx_tokens",
+                       "answer_in_ctx", "off_topic_skipped", "tokens_saved"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+청크 요약 컨텍스트 벤치마크
+원문 청크 컨텍스트와 토큰 예산 초과 시 사전 계산 요약으로 대체한 컨텍스트의
+프롬프트 토큰 수, 정답 포함률, (LLM 지정 시) SQL 생성 LLM 지연을 비교
+
+--llm-base-url 을 지정하면 로컬 LLM(OpenAI 호환)으로 요약을 생성하고 지연까지 측정
+지정하지 않으면 첫 문장 + 수치 문장을 뽑는 추출 요약으로 토큰 절감만 측정
+
+실행: python benchmarks/chunk_summary_benchmark.py [--budgets 0,400,250,150] [--top-k 5] \
+        [--llm-base-url http://localhost:11434 --llm-model llama3]
+"""
+
+import os
+import re
+import argparse
+
+from common import make_rag_service, ingest_rag_sources, load_questions, percentile, timed, print_table
+
+from services.rag_service import RAGService
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?。다])\s+')
+
+class ExtractiveSummaryRAGService(RAGService):
+    """LLM 없이 측정할 때 쓰는 추출 요약 (첫 문장 + 숫자가 포함된 문장)"""
+
+    def summarize_chunk(self, text):
+        sentences = [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s.strip()]
+        if not sentences:
+            return None
+        facts = [s for s in sentences[1:] if re.search(r'\d', s)][:3]
+        return {
+            "summary": sentences[0][:200],
+            "key_facts": "\n".join(fact[:120] for fact in facts),
+            "summary_token_count": self.token_counter.count(sentences[0] + "".join(facts))
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="청크 요약 컨텍스트 벤치마크")
+    parser.add_argument("--budgets", default="0,400,250,150", help="컨텍스트 토큰 예산 목록 (0은 원문)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--chunk-tokens", type=int, default=120, help="청크 최대 토큰 (샘플 문서가 작아 기본값을 낮춤)")
+    parser.add_argument("--llm-base-url", default=None)
+    parser.add_argument("--llm-model", default=None)
+    args = parser.parse_args()
+
+    os.environ['RAG_CHUNK_MAX_TOKENS'] = str(args.chunk_tokens)
+    os.environ['RAG_CHUNK_OVERLAP_TOKENS'] = str(args.chunk_tokens // 10)
+    # 해싱 임베딩은 코사인 값이 낮으므로 유사도 컷오프 미적용 (적응형 컷오프도 비활성화해 요약 효과만 측정)
+    os.environ.setdefault('RAG_MIN_SIMILARITY', '0')
+    os.environ.setdefault('RAG_RELATIVE_CUTOFF', '0')
+    os.environ.setdefault('RAG_KNEE_GAP', '0')
+
+    if args.llm_base_url:
+        os.environ['LLM_BASE_URL'] = args.llm_base_url
+        if args.llm_model:
+            os.environ['LLM_MODEL'] = args.llm_model
+        service = make_rag_service()
+        summarizer = f"LLM ({args.llm_base_url})"
+    else:
+        os.environ.pop('LLM_BASE_URL', None)
+        service = make_rag_service(service_class=ExtractiveSummaryRAGService)
+        service.llm_base_url = "extractive"  # 백필 사전 조건 충족용 (LLM 호출 없음)
+        summarizer = "추출 요약 (LLM 미지정)"
+
+    chunks = ingest_rag_sources(service)
+    backfill, backfill_ms = timed(service.summarize_existing_chunks)
+    print(f"요약기: {summarizer}, 청크 {chunks}개, 요약 {backfill.get('summarized', 0)}개 "
+          f"({backfill_ms / 1000:.1f}초)\n")
+
+    questions = load_questions()
+    rows = []
+    for budget in [int(b) for b in args.budgets.split(',')]:
+        context_tokens, latencies = [], []
+        hits = summarized = 0
+        for question in questions:
+            result = service.build_rag_context(question["question"], question["domain"], args.top_k,
+                                               token_budget=budget)
+            context = result["context"]
+            context_tokens.append(service.token_counter.count(context))
+            hits += question["answer_contains"] in context
+            summarized += result["stats"]["summarized_chunks"]
+
+            if args.llm_base_url:
+                prompt = f"[참고 문서]\n{context}\n\n질문: {question['question']}\nSQL:"
+                _, elapsed = timed(service.call_local_llm, prompt, "당신은 자연어를 SQL로 변환하는 전문가입니다.")
+                latencies.append(elapsed)
+
+        row = {
+            "budget": budget or "원문",
+            "avg_ctx_tokens": round(sum(context_tokens) / len(questions), 1),
+            "p95_ctx_tokens": round(percentile(context_tokens, 95), 1),
+            "summarized/q": round(summarized / len(questions), 2),
+            "answer_in_ctx": round(hits / len(questions), 3)
+        }
+        if latencies:
+            row["llm_p50_ms"] = round(percentile(latencies, 50), 1)
+            row["llm_p95_ms"] = round(percentile(latencies, 95), 1)
+        rows.append(row)
+
+    columns = ["budget", "avg_ctx_tokens", "p95_ctx_tokens", "summarized/q", "answer_in_ctx"]
+    if args.llm_base_url:
+        columns += ["llm_p50_ms", "llm_p95_ms"]
+    print_table(rows, columns)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+청커 비교 벤치마크
+기존 문자 기반 분할기(RecursiveCharacterTextSplitter)와 한국어 토큰 청커의
+청크 수, 임베딩 토큰 수, 토큰 한도 초과 여부, 검색 적중률을 샘플 rag_files로 비교
+
+실행: python benchmarks/chunking_benchmark.py [--budgets 64,128,256,800] [--top-k 3]
+"""
+
+import argparse
+
+from common import (
+    HashingEmbeddings, load_rag_sources, load_questions, cosine, print_table
+)
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from services.korean_chunker import TokenCounter, KoreanTokenChunker
+
+def build_chunks(splitter, sources):
+    """문서별 청크 생성 -> [{"text", "domain", "filename"}]"""
+    chunks = []
+    for source in sources:
+        with open(source["filepath"], 'r', encoding='utf-8') as f:
+            text = f.read()
+        for chunk in splitter(text):
+            chunks.append({"text": chunk, "domain": source["domain"], "filename": source["filename"]})
+    return chunks
+
+def evaluate(chunks, questions, embeddings, token_counter, budget, top_k):
+    """청크 통계 및 검색 적중률 계산"""
+    vectors = embeddings.embed_documents([chunk["text"] for chunk in chunks])
+    token_counts = [token_counter.count(chunk["text"]) for chunk in chunks]
+
+    hits_at_1 = 0
+    hits_at_k = 0
+    context_tokens = 0
+    for question in questions:
+        query = embeddings.embed_query(question["question"])
+        ranked = sorted(range(len(chunks)), key=lambda i: cosine(query, vectors[i]), reverse=True)[:top_k]
+        found = [question["answer_contains"] in chunks[i]["text"] for i in ranked]
+        hits_at_1 += found[0] if found else 0
+        hits_at_k += any(found)
+        context_tokens += sum(token_counts[i] for i in ranked)
+
+    return {
+        "chunks": len(chunks),
+        "embed_tokens": sum(token_counts),
+        "avg_tokens": round(sum(token_counts) / max(len(chunks), 1), 1),
+        "max_tokens": max(token_counts) if token_counts else 0,
+        "over_budget": sum(1 for count in token_counts if count > budget),
+        "hit@1": round(hits_at_1 / len(questions), 3),
+        f"hit@{top_k}": round(hits_at_k / len(questions), 3),
+        "ctx_tokens/q": round(context_tokens / len(questions), 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="청커 비교 벤치마크")
+    parser.add_argument("--budgets", default="64,128,256,800", help="임베딩 토큰 한도 목록")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--provider", default="openai")
+    parser.add_argument("--model", default="text-embedding-ada-002")
+    args = parser.parse_args()
+
+    sources = load_rag_sources()
+    questions = load_questions()
+    embeddings = HashingEmbeddings()
+    token_counter = TokenCounter(args.provider, args.model)
+    print(f"토크나이저: {token_counter.tokenizer_name}, 문서 {len(sources)}개, 질문 {len(questions)}개\n")
+
+    rows = []
+    for budget in [int(b) for b in args.budgets.split(',')]:
+        candidates = {
+            "recursive(1000/200자)": RecursiveCharacterTextSplitter(
+                chunk_size=1000, chunk_overlap=200, length_function=len,
+                separators=["\n\n", "\n", " ", ""]
+            ).split_text,
+            f"recursive({budget}/{budget // 5}자)": RecursiveCharacterTextSplitter(
+                chunk_size=budget, chunk_overlap=budget // 5, length_function=len,
+                separators=["\n\n", "\n", " ", ""]
+            ).split_text,
+            f"korean({budget}토큰)": KoreanTokenChunker(
+                token_counter, max_tokens=budget, overlap_tokens=budget // 10
+            ).split_text,
+        }
+        for name, splitter in candidates.items():
+            chunks = build_chunks(splitter, sources)
+            row = {"budget": budget, "chunker": name}
+            row.update(evaluate(chunks, questions, embeddings, token_counter, budget, args.top_k))
+            rows.append(row)
+
+    print_table(rows, ["budget", "chunker", "chunks", "embed_tokens", "avg_tokens", "max_tokens",
+                       "over_budget", "hit@1", f"hit@{args.top_k}", "ctx_tokens/q"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+벤치마크 공용 유틸리티
+네트워크 없이 재현 가능한 임베딩, 샘플 문서/평가 질문 로더, 통계 함수 제공
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import hashlib
+import tempfile
+from functools import lru_cache
+from typing import Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+RAG_FILES_DIR = os.path.join(ROOT_DIR, "data", "rag_files")
+QUESTIONS_PATH = os.path.join(ROOT_DIR, "data", "evaluation", "rag_questions.json")
+
+# 백엔드 모듈 import 경로
+sys.path.insert(0, BACKEND_DIR)
+
+from langchain.embeddings.base import Embeddings
+
+@lru_cache(maxsize=65536)
+def _hash_ngram(ngram: str, dimensions: int):
+    """n-gram을 (차원 인덱스, 부호)로 해싱"""
+    digest = hashlib.blake2b(ngram.encode('utf-8'), digest_size=8).digest()
+    value = int.from_bytes(digest, 'little')
+    return value % dimensions, 1.0 if (value >> 63) & 1 else -1.0
+
+class HashingEmbeddings(Embeddings):
+    """문자 n-gram 해싱 임베딩 (결정적, 네트워크 불필요한 로컬 대체 모델)"""
+
+    def __init__(self, dimensions: int = 256, ngram: int = 2):
+        self.dimensions = dimensions
+        self.ngram = ngram
+        self.calls = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for word in text.split():
+            padded = f" {word} "
+            for i in range(max(len(padded) - self.ngram + 1, 1)):
+                index, sign = _hash_ngram(padded[i:i + self.ngram], self.dimensions)
+                vector[index] += sign
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        return self._embed(text)
+
+def load_rag_sources() -> List[Dict]:
+    """data/rag_files 아래 샘플 문서 목록"""
+    sources = []
+    for domain in sorted(os.listdir(RAG_FILES_DIR)):
+        domain_path = os.path.join(RAG_FILES_DIR, domain)
+        if not os.path.isdir(domain_path):
+            continue
+        for filename in sorted(os.listdir(domain_path)):
+            filepath = os.path.join(domain_path, filename)
+            if os.path.isfile(filepath):
+                sources.append({"domain": domain, "filename": filename, "filepath": filepath})
+    return sources
+
+def load_questions(path: str = QUESTIONS_PATH) -> List[Dict]:
+    """평가 질문 세트 로드"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)["questions"]
+
+def cosine(a: List[float], b: List[float]) -> float:
+    """코사인 유사도 (정규화된 벡터 가정)"""
+    return sum(x * y for x, y in zip(a, b))
+
+def percentile(values: List[float], p: float) -> float:
+    """백분위수 (선형 보간)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * p / 100
+    low = math.floor(position)
+    high = math.ceil(position)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+def timed(func, *args, **kwargs):
+    """(결과, 경과 ms) 반환"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+def print_table(rows: List[Dict], columns: List[str]):
+    """결과 표 출력"""
+    widths = {col: max(len(col), *(len(str(row.get(col, ""))) for row in rows)) for col in columns}
+    print("  ".join(col.ljust(widths[col]) for col in columns))
+    print("  ".join("-" * widths[col] for col in columns))
+    for row in rows:
+        print("  ".join(str(row.get(col, "")).ljust(widths[col]) for col in columns))
+
+def make_rag_service(embeddings=None, persist_directory: str = None, service_class=None):
+    """임시 디렉토리의 RAGService 생성 (기본: 해싱 임베딩, 운영 DB와 분리)"""
+    # OpenAI 클라이언트 생성에 키가 필요하므로 더미 값 지정 (실제 호출 없음)
+    os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+    if service_class is None:
+        from services.rag_service import RAGService
+        service_class = RAGService
+    return service_class(
+        persist_directory=persist_directory or tempfile.mkdtemp(prefix="rag_bench_"),
+        embeddings=embeddings or HashingEmbeddings()
+    )
+
+def ingest_rag_sources(service, sources: List[Dict] = None) -> int:
+    """샘플 문서를 서비스에 색인하고 청크 수 반환"""
+    total = 0
+    for source in sources or load_rag_sources():
+        result = service.process_document(source["filepath"], source["domain"], source["filename"])
+        total += result.get("chunks_created", 0)
+    return total
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+도메인 자동 라우팅 벤치마크
+도메인 미지정 질문을 전체 컬렉션에서 검색할 때와 중심 벡터/키워드 프로필로
+1~2개 도메인 컬렉션에 라우팅할 때의 recall@k, MRR, 검색 지연, 라우팅 정확도를 비교
+(정답 도메인을 지정한 검색을 상한선으로 함께 표시)
+
+실행: python benchmarks/domain_routing_benchmark.py [--top-k 5] [--distractors 30]
+"""
+
+import os
+import sys
+import argparse
+
+from common import HashingEmbeddings, make_rag_service, ingest_rag_sources, load_rag_sources, load_questions, \
+    percentile, timed, print_table
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "retrieval"))
+from sweep import write_distractors
+
+from services.retrieval_evaluation import evaluate_retrieval
+
+def main():
+    parser = argparse.ArgumentParser(description="도메인 자동 라우팅 벤치마크")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--distractors", type=int, default=30, help="도메인별로 나눠 추가할 방해 문서 수")
+    parser.add_argument("--dimensions", type=int, default=256, help="해싱 임베딩 차원")
+    args = parser.parse_args()
+
+    os.environ['RAG_CHUNK_MAX_TOKENS'] = '120'
+    os.environ['RAG_CHUNK_OVERLAP_TOKENS'] = '12'
+    # 라우팅 정확도는 아래에서 직접 측정 (그림자 평가가 지연 측정에 섞이지 않도록)
+    os.environ['RAG_ROUTER_SHADOW'] = 'false'
+
+    service = make_rag_service(embeddings=HashingEmbeddings(dimensions=args.dimensions))
+    # 방해 문서는 배정된 도메인의 어휘로 생성 (도메인 간 차이가 유지되는 실제 코퍼스 증가에 가깝게)
+    sources = load_rag_sources() + write_distractors(args.distractors, domain_vocabulary=True)
+    chunks = ingest_rag_sources(service, sources)
+    questions = load_questions()
+    print(f"청크 {chunks}개, 질문 {len(questions)}개\n")
+
+    # 라우팅 정확도/지연 (질문 임베딩은 제외하고 라우팅 자체만 측정)
+    top1_hits = routed_hits = searched = 0
+    route_latencies = []
+    for question in questions:
+        embedding = service.embeddings.embed_query(question["question"])
+        routing, elapsed = timed(service.domain_router.route, embedding, question["question"])
+        route_latencies.append(elapsed)
+        top1_hits += routing["domains"][0] == question["domain"]
+        routed_hits += question["domain"] in routing["domains"]
+        searched += len(routing["domains"])
+    print(f"라우팅 정확도: top1 {top1_hits / len(questions):.3f}, 검색 도메인 포함 {routed_hits / len(questions):.3f}, "
+          f"평균 검색 도메인 {searched / len(questions):.2f}개, "
+          f"라우팅 지연 p50 {percentile(route_latencies, 50):.3f}ms / p95 {percentile(route_latencies, 95):.3f}ms\n")
+
+    rows = []
+    for name, routing_enabled, scope in [("global", False, "global"), ("routed", True, "global"),
+                                         ("oracle domain", False, "domain")]:
+        service.domain_routing = routing_enabled
+        result = evaluate_retrieval(service, questions, top_k=args.top_k, scope=scope)
+        rows.append({
+            "mode": name,
+            f"recall@{args.top_k}": result[f"recall@{args.top_k}"],
+            f"file_recall@{args.top_k}": result[f"file_recall@{args.top_k}"],
+            "mrr": result["mrr"],
+            "p50_ms": result["latency_p50_ms"],
+            "p95_ms": result["latency_p95_ms"]
+        })
+
+    print_table(rows, ["mode", f"recall@{args.top_k}", f"file_recall@{args.top_k}", "mrr", "p50_ms", "p95_ms"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+임베딩 마이크로 배칭 벤치마크
+요청마다 embed_query를 직접 호출하는 경우와 EmbeddingDispatcher로 묶는 경우의
+동시 부하 처리량과 지연(p50/p95)을 비교
+원격 API/로컬 모델의 비용 구조(호출당 고정 지연 + 항목당 비용)를 흉내낸 지연 임베딩 사용
+
+실행: python benchmarks/embedding_dispatch_benchmark.py [--call-ms 40] [--item-ms 0.5] \
+        [--concurrency 1,8,32,64] [--requests 256]
+"""
+
+import argparse
+import threading
+import time
+
+from common import HashingEmbeddings, load_questions, percentile, print_table
+
+from services.embedding_dispatcher import EmbeddingDispatcher
+
+class SlowEmbeddings(HashingEmbeddings):
+    """호출당 고정 지연과 항목당 지연을 더한 임베딩 (동시 호출 수 제한 가능)"""
+
+    def __init__(self, call_ms: float, item_ms: float, max_in_flight: int):
+        super().__init__()
+        self.call_ms = call_ms
+        self.item_ms = item_ms
+        # 원격 API의 rate limit / 로컬 모델의 코어 수를 흉내냄
+        self._slots = threading.Semaphore(max_in_flight)
+
+    def embed_documents(self, texts):
+        with self._slots:
+            time.sleep((self.call_ms + self.item_ms * len(texts)) / 1000)
+            return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_queries(self, texts):
+        return self.embed_documents(texts)
+
+def run_load(embeddings, queries, concurrency: int) -> dict:
+    """concurrency개 스레드가 쿼리를 나눠 호출"""
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        for query in chunk:
+            start = time.perf_counter()
+            embeddings.embed_query(query)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(queries[i::concurrency],)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "q/s": round(len(queries) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 마이크로 배칭 벤치마크")
+    parser.add_argument("--call-ms", type=float, default=40.0, help="호출당 고정 지연 (ms)")
+    parser.add_argument("--item-ms", type=float, default=0.5, help="항목당 추가 지연 (ms)")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="동시 처리 가능한 호출 수")
+    parser.add_argument("--concurrency", default="1,8,32,64")
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    questions = [q["question"] for q in load_questions()]
+    queries = [f"{questions[i % len(questions)]} {i}" for i in range(args.requests)]
+    print(f"호출 지연 {args.call_ms}ms + 항목당 {args.item_ms}ms, 동시 호출 한도 {args.max_in_flight}, "
+          f"요청 {args.requests}개\n")
+
+    rows = []
+    for concurrency in [int(c) for c in args.concurrency.split(',')]:
+        direct = SlowEmbeddings(args.call_ms, args.item_ms, args.max_in_flight)
+        direct_result = run_load(direct, queries, concurrency)
+
+        backend = SlowEmbeddings(args.call_ms, args.item_ms, args.max_in_flight)
+        dispatcher = EmbeddingDispatcher(backend, max_batch_size=args.max_batch,
+                                         max_wait_ms=args.max_wait_ms, num_workers=args.max_in_flight)
+        batched_result = run_load(dispatcher, queries, concurrency)
+        stats = dispatcher.get_stats()
+
+        rows.append({
+            "concurrency": concurrency,
+            "direct_q/s": direct_result["q/s"],
+            "direct_p50": direct_result["p50_ms"],
+            "direct_p95": direct_result["p95_ms"],
+            "batched_q/s": batched_result["q/s"],
+            "batched_p50": batched_result["p50_ms"],
+            "batched_p95": batched_result["p95_ms"],
+            "avg_batch": stats["avg_batch"],
+            "speedup": f"{batched_result['q/s'] / direct_result['q/s']:.2f}x"
+        })
+
+    print_table(rows, ["concurrency", "direct_q/s", "direct_p50", "direct_p95", "batched_q/s",
+                       "batched_p50", "batched_p95", "avg_batch", "speedup"])
+
+if __name__ == "__main__":
+    main()
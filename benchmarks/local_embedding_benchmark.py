@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+로컬 임베딩 엔진 벤치마크
+기존 PyTorch(HuggingFaceEmbeddings) 경로와 ONNX Runtime(fp32/int8) 경로의
+로딩 시간, 첫 쿼리 지연, 단일 쿼리 p50/p95, 배치/동시 처리량, RSS 메모리를 비교
+엔진별로 별도 프로세스에서 측정하여 메모리 수치가 섞이지 않도록 함
+
+실행: python benchmarks/local_embedding_benchmark.py --hf-model jhgan/ko-sroberta-multitask \
+        --onnx-dir /models/ko-sroberta-onnx [--threads 4] [--queries 200]
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+import threading
+import time
+
+from common import load_questions, load_rag_sources, percentile, timed, print_table
+
+ENGINES = ["torch", "onnx", "onnx-int8"]
+
+def current_rss_mb() -> float:
+    """현재 프로세스 RSS (MB)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def build_engine(engine: str, args):
+    """엔진 생성 (워밍업은 측정 대상이므로 끔)"""
+    os.environ['LOCAL_EMBEDDING_WARMUP'] = 'false'
+    os.environ['LOCAL_EMBEDDING_THREADS'] = str(args.threads)
+    os.environ['LOCAL_EMBEDDING_BATCH_SIZE'] = str(args.batch_size)
+    if engine == "torch":
+        os.environ['LOCAL_EMBEDDING_ENGINE'] = 'torch'
+        model = args.hf_model
+    else:
+        os.environ['LOCAL_EMBEDDING_ENGINE'] = 'onnx'
+        os.environ['LOCAL_EMBEDDING_QUANTIZE'] = 'true' if engine == "onnx-int8" else 'false'
+        model = args.onnx_dir or args.hf_model
+
+    from services.local_embeddings import init_local_embeddings
+    return init_local_embeddings(model)
+
+def measure(engine: str, args) -> dict:
+    """단일 엔진 측정 (워커 프로세스에서 실행)"""
+    from services.embedding_dispatcher import EmbeddingDispatcher
+
+    questions = [q["question"] for q in load_questions()]
+    queries = [questions[i % len(questions)] for i in range(args.queries)]
+    documents = []
+    for source in load_rag_sources():
+        with open(source["filepath"], 'r', encoding='utf-8') as f:
+            documents.extend(line.strip() for line in f if line.strip())
+    documents = documents[:args.documents]
+
+    rss_start = current_rss_mb()
+    embeddings, load_ms = timed(build_engine, engine, args)
+    _, first_ms = timed(embeddings.embed_query, queries[0])
+    rss_loaded = current_rss_mb()
+
+    latencies = [timed(embeddings.embed_query, query)[1] for query in queries]
+    _, batch_ms = timed(embeddings.embed_documents, documents)
+
+    # 동시 요청 처리량 (디스패처로 묶은 경우)
+    dispatcher = EmbeddingDispatcher(embeddings, max_batch_size=args.batch_size, max_wait_ms=5)
+    def worker(chunk):
+        for query in chunk:
+            dispatcher.embed_query(query)
+    threads = [threading.Thread(target=worker, args=(queries[i::args.concurrency],))
+               for i in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    concurrent_s = time.perf_counter() - start
+
+    return {
+        "engine": engine,
+        "load_ms": round(load_ms, 1),
+        "first_query_ms": round(first_ms, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "batch_docs/s": round(len(documents) / (batch_ms / 1000), 1),
+        "concurrent_q/s": round(len(queries) / concurrent_s, 1),
+        "rss_model_mb": round(rss_loaded - rss_start, 1),
+        "rss_peak_mb": round(current_rss_mb(), 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 임베딩 엔진 벤치마크")
+    parser.add_argument("--hf-model", default="jhgan/ko-sroberta-multitask", help="sentence-transformers 모델명")
+    parser.add_argument("--onnx-dir", default=None, help="model.onnx와 tokenizer.json이 있는 디렉토리")
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    parser.add_argument("--threads", type=int, default=0, help="intra-op 스레드 수 (0이면 기본값)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--documents", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args)))
+        return
+
+    rows = []
+    for engine in args.engines.split(','):
+        command = [sys.executable, os.path.abspath(__file__), "--worker", engine] + sys.argv[1:]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        output = completed.stdout.strip().splitlines()
+        if completed.returncode != 0 or not output:
+            error = (completed.stderr.strip().splitlines() or ["unknown error"])[-1]
+            print(f"⚠️ {engine} 측정 실패: {error}")
+            continue
+        rows.append(json.loads(output[-1]))
+
+    if rows:
+        print_table(rows, ["engine", "load_ms", "first_query_ms", "p50_ms", "p95_ms",
+                           "batch_docs/s", "concurrent_q/s", "rss_model_mb", "rss_peak_mb"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+전처리 에이전트 마이크로벤치마크
+혼합 전처리 에이전트의 단계별 질의당 지연을 기존 구현과 비교
+
+- regex: 호출마다 문자열 패턴을 re.sub/re.findall로 해석하고 숫자 패턴마다 findall을 반복하던 방식
+         vs 미리 컴파일한 규칙 레지스트리와 이름 있는 그룹의 엔티티 통합 스캐너 한 번 (정규화 + 엔티티 추출)
+         + 통합 스캐너가 기존 추출기의 신용점수/대출금액/범위/날짜를 모두 찾는지 확인
+- segmenter: 문자 클래스 정규식 절 추출 vs 단일 패스 절 분리기의 입력 길이별 소요 시간
+             (병적인 입력 포함) + 무작위 입력 퍼징으로 절 오프셋 불변식 검사
+- tokenizer: jieba vs 한국어 토크나이저의 콜드 스타트(별도 프로세스), 절당 지연(캐시 없음/있음),
+             절당 용어 사전 일치 토큰 수
+- cache: 전처리 결과 캐시 없음 vs 캐시 적중(공유 결과 객체를 새 dict로 직렬화) 질의당 지연 + 딕셔너리 변경 시 무효화 확인
+- profile: full/prompt/lite 프로필별 질의당 지연 (결과 캐시 없음) + lite 결과가 full과 일치하는지 확인
+- batch: preprocess_query 순차 호출 vs preprocess_batch 워커 수별 처리량 (캐시 적중이 없도록 서로 다른 질의)
+         + 상시 워커 풀 준비(spawn) 시간
+- alloc: dict 트리 결과(preprocess_query) vs __slots__ 결과 객체(analyze_query)의 질의당 유지 메모리 블록/바이트,
+         GC 추적 객체 수, 호출 중 최대 메모리 (tracemalloc)
+
+실행: python benchmarks/preprocessing_benchmark.py [--sections regex segmenter tokenizer cache profile batch alloc] [--repeat 2000] [--fuzz 5000] [--batch 5000]
+"""
+
+import re
+import sys
+import json
+import random
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+import subprocess
+
+from common import BACKEND_DIR, percentile, timed, print_table
+
+from preprocessing.hybrid_preprocessing_agent import HybridPreprocessingAgent, PREPROCESS_PROFILES
+from preprocessing.clause_segmenter import segment_clauses, STANDALONE_CONNECTIVES
+from preprocessing.korean_tokenizer import create_tokenizer
+
+SAMPLE_QUERIES = [
+    "신용점수 750 이상인 개인고객의 대출금액 합계를 조회해주세요",
+    "위험도가 높은 기업고객 중 연체일수가 30일 이상인 고객 수를 알려주세요",
+    "VIP고객의 평균 신용점수와 일반고객의 평균 신용점수를 비교해주세요",
+    "소득수준이 보통이고 신용점수가 650 이상인 고객 목록을 조회해주세요",
+    "2024년3월1일부터 6개월 동안 대출 5000000원 이상, 금리 5% 이상인 소상공인 목록",
+    "신용점수 600 부터 700까지이고 위험도 매우높음인 관리고객의 연체 건수"
+]
+
+def legacy_regex(text: str):
+    """기존 방식: 문자열 패턴을 매번 해석, 숫자/날짜/범위 패턴별 findall 반복 (기존 추출기 구현 그대로)"""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s가-힣.,!?()]', '', text)
+    text = re.sub(r'(\d+)원', r'\1 원', text)
+    text = re.sub(r'(\d+)%', r'\1 퍼센트', text)
+
+    numeric_values = []
+    for pattern in [r'(\d+)원', r'(\d+)%', r'(\d+)일', r'(\d+)개월', r'(\d+)년']:
+        for match in re.findall(pattern, text):
+            numeric_values.append({
+                "value": match,
+                "pattern": pattern,
+                "type": "currency" if "원" in pattern else "percentage" if "%" in pattern else "duration"
+            })
+    customer_types = [kind for kind in ["개인고객", "기업고객", "소상공인", "VIP고객", "관리고객"] if kind in text]
+    risk_levels = [level for level in ["낮음", "보통", "높음", "매우낮음", "매우높음"] if level in text]
+
+    scores = []
+    for pattern in [r'신용점수\s*(\d+)', r'크레딧스코어\s*(\d+)', r'(\d+)\s*점']:
+        for match in re.findall(pattern, text):
+            if 300 <= int(match) <= 850:
+                scores.append({"value": int(match), "type": "credit_score"})
+    amounts = []
+    for pattern in [r'대출금액\s*(\d+)원', r'(\d+)원\s*대출', r'대출\s*(\d+)원']:
+        for match in re.findall(pattern, text):
+            amounts.append({"value": int(match), "type": "loan_amount", "unit": "원"})
+    dates = []
+    for pattern in [r'(\d{4})년(\d{1,2})월(\d{1,2})일', r'(\d{4})-(\d{1,2})-(\d{1,2})', r'(\d{1,2})월(\d{1,2})일']:
+        for match in re.findall(pattern, text):
+            dates.append({"match": match})
+    ranges = []
+    for pattern in [r'(\d+)\s*이상\s*(\d+)이하', r'(\d+)\s*부터\s*(\d+)까지', r'(\d+)\s*~\s*(\d+)', r'(\d+)\s*-\s*(\d+)']:
+        for match in re.findall(pattern, text):
+            ranges.append({"min": int(match[0]), "max": int(match[1]), "type": "numeric_range"})
+    return text, numeric_values, customer_types, risk_levels, scores, amounts, dates, ranges
+
+def registry_regex(agent: HybridPreprocessingAgent, text: str):
+    """컴파일된 규칙 레지스트리 + 엔티티 통합 스캐너 한 번 (모든 엔티티 추출기를 한 스캔에서 처리)"""
+    text = agent._normalize_text(text)
+    return text, agent._extract_entities(text, term_matches=[])
+
+def check_entity_coverage(agent: HybridPreprocessingAgent):
+    """통합 스캐너가 기존 추출기가 찾던 신용점수/대출금액/범위/날짜를 모두 찾는지 확인"""
+    for query in SAMPLE_QUERIES:
+        _, _, _, _, scores, amounts, dates, ranges = legacy_regex(query)
+        entities = registry_regex(agent, query)[1]
+        range_values = {(found.min, found.max) for found in entities.numeric_ranges}
+        score_values = {score.value for score in entities.credit_scores} | {found.min for found in entities.numeric_ranges}
+        assert {score["value"] for score in scores} <= score_values, (query, scores, entities.credit_scores)
+        assert {amount["value"] for amount in amounts} <= {amount.value for amount in entities.loan_amounts}, \
+            (query, amounts, entities.loan_amounts)
+        assert {(found["min"], found["max"]) for found in ranges} <= range_values, (query, ranges)
+        # 기존 방식은 연월일 안의 월일을 한 번 더 찾으므로 (월, 일) 기준으로 비교
+        assert {found["match"][-2:] for found in dates} <= {(date.month, date.day) for date in entities.date_values}, \
+            (query, dates)
+
+def measure(name: str, func, queries: list, repeat: int) -> dict:
+    latencies = []
+    for i in range(repeat):
+        latencies.append(timed(func, queries[i % len(queries)])[1])
+    return {
+        "method": name,
+        "calls": repeat,
+        "p50_us": round(percentile(latencies, 50) * 1000, 1),
+        "p95_us": round(percentile(latencies, 95) * 1000, 1),
+        "mean_us": round(sum(latencies) / len(latencies) * 1000, 1)
+    }
+
+def bench_regex(agent: HybridPreprocessingAgent, args) -> list:
+    # re 모듈 내부 패턴 캐시가 비워진 상황(다른 정규식 다수 사용)을 흉내내지 않고 캐시가 따뜻한 상태로 비교
+    check_entity_coverage(agent)
+    return [
+        measure("legacy re.sub/findall", legacy_regex, SAMPLE_QUERIES, args.repeat),
+        measure("compiled registry", lambda q: registry_regex(agent, q), SAMPLE_QUERIES, args.repeat)
+    ]
+
+LEGACY_CLAUSE_PATTERNS = [
+    r'([^.!?]+[.!?])',
+    r'([^그리고]+그리고[^그리고]+)',
+    r'([^또는]+또는[^또는]+)',
+    r'([^이고]+이고[^이고]+)',
+    r'([^이거나]+이거나[^이거나]+)',
+    r'([^하며]+하며[^하며]+)',
+]
+
+def legacy_clauses(text: str) -> list:
+    """기존 절 추출의 정규식 부분 (절 분석 제외)"""
+    return [match for pattern in LEGACY_CLAUSE_PATTERNS for match in re.findall(pattern, text)]
+
+# 병적인 입력: 연결어가 없는 긴 문장(문자 클래스 패턴이 시작 위치마다 끝까지 훑음), 연결어 반복, 공백 없는 반복
+PATHOLOGICAL_INPUTS = {
+    "no connective": lambda n: ("신용점수가 높은 고객 " * n)[:n],
+    "connective run": lambda n: ("그리고 " * n)[:n],
+    "no spaces": lambda n: ("이고이거나하며" * n)[:n]
+}
+
+FUZZ_ALPHABET = list("그리고또는이거나하며면서지만런데한가나다 ..!?;,0123456789") + list(STANDALONE_CONNECTIVES)
+
+def check_spans(text: str, spans: list):
+    """절 오프셋 불변식: 범위 내, 비어 있지 않음, 오름차순, 겹치지 않음, 연결어 미포함"""
+    position = 0
+    for span in spans:
+        assert 0 <= position <= span.start < span.end <= len(text), (text, spans)
+        clause = span.text(text)
+        assert clause.strip(), (text, span)
+        assert not any(token in STANDALONE_CONNECTIVES for token in clause.split()), (text, span)
+        position = span.end
+
+def bench_segmenter(agent: HybridPreprocessingAgent, args) -> list:
+    rng = random.Random(42)
+    for _ in range(args.fuzz):
+        text = "".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, 200)))
+        check_spans(text, segment_clauses(text))
+    print(f"퍼징 {args.fuzz}건 불변식 통과")
+
+    rows = []
+    for name, make in PATHOLOGICAL_INPUTS.items():
+        for length in [1000, 4000, 16000]:
+            text = make(length)
+            row = {"input": name, "chars": length}
+            # 기존 정규식은 길이 제곱에 비례하므로 큰 입력은 생략
+            row["legacy_ms"] = round(timed(legacy_clauses, text)[1], 2) if length <= 4000 else "-"
+            spans, elapsed = timed(segment_clauses, text)
+            check_spans(text, spans)
+            row["segmenter_ms"] = round(elapsed, 2)
+            row["clauses"] = len(spans)
+            rows.append(row)
+    return rows
+
+COLD_START_SCRIPT = """
+import sys, time, json
+started = time.perf_counter()
+sys.path.insert(0, {backend!r})
+from services.dynamic_dictionary_manager import dictionary_manager
+from preprocessing.korean_tokenizer import create_tokenizer
+tokenizer = create_tokenizer({name!r}, dictionary=dictionary_manager)
+loaded = time.perf_counter()
+tokenizer.tokenize({query!r})
+print(json.dumps({{"load_ms": (loaded - started) * 1000, "first_ms": (time.perf_counter() - loaded) * 1000}}))
+"""
+
+def cold_start(name: str) -> dict:
+    """새 프로세스에서 딕셔너리 로드 + 토크나이저 생성 + 첫 토큰화 시간"""
+    script = COLD_START_SCRIPT.format(backend=BACKEND_DIR, name=name, query=SAMPLE_QUERIES[0])
+    completed = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def bench_tokenizer(agent: HybridPreprocessingAgent, args) -> list:
+    clauses = [span.text(query).strip() for query in SAMPLE_QUERIES for span in segment_clauses(query)]
+    rows = []
+    for name in ["jieba", "korean"]:
+        cold = cold_start(name)
+        tokenizer = create_tokenizer(name, dictionary=agent.dict_manager)
+        uncached, cached = [], []
+        term_hits = 0
+        for i in range(args.repeat):
+            clause = clauses[i % len(clauses)]
+            tokenizer.cache_size = 0
+            tokens, elapsed = timed(tokenizer.tokenize, clause)
+            uncached.append(elapsed)
+            tokenizer.cache_size = 4096
+            cached.append(timed(tokenizer.tokenize, clause)[1])
+            if i < len(clauses):
+                term_hits += sum(1 for token in tokens if agent.dict_manager.get_term_info(token))
+        rows.append({
+            "tokenizer": name,
+            "cold_load_ms": round(cold["load_ms"], 1),
+            "cold_first_ms": round(cold["first_ms"], 1),
+            "p50_us": round(percentile(uncached, 50) * 1000, 1),
+            "p95_us": round(percentile(uncached, 95) * 1000, 1),
+            "cached_p50_us": round(percentile(cached, 50) * 1000, 1),
+            "terms_per_clause": round(term_hits / len(clauses), 2)
+        })
+    return rows
+
+def bench_cache(agent: HybridPreprocessingAgent, args) -> list:
+    cache_size = agent.result_cache_size
+    agent.result_cache_size = 0
+    uncached = measure("no result cache", agent.preprocess_query, SAMPLE_QUERIES, args.repeat)
+
+    agent.result_cache_size = cache_size
+    agent.clear_cache()
+    cached = measure("result cache", agent.preprocess_query, SAMPLE_QUERIES, args.repeat)
+    uncached["hit_rate"] = "-"
+    cached["hit_rate"] = agent.get_cache_stats()["hit_rate"]
+
+    # 캐시된 결과를 수정해도 다음 조회에 영향이 없어야 함
+    result = agent.preprocess_query(SAMPLE_QUERIES[0])
+    result["entities"]["domain_terms"].clear()
+    assert agent.preprocess_query(SAMPLE_QUERIES[0])["entities"]["domain_terms"]
+
+    # 딕셔너리 버전이 바뀌면 이전 결과를 다시 쓰지 않아야 함
+    misses = agent.get_cache_stats()["misses"]
+    agent.dict_manager._mark_changed()
+    agent.preprocess_query(SAMPLE_QUERIES[0])
+    assert agent.get_cache_stats()["misses"] == misses + 1
+    print("캐시 결과 수정 격리/딕셔너리 변경 무효화 확인")
+    return [uncached, cached]
+
+def bench_profile(agent: HybridPreprocessingAgent, args) -> list:
+    cache_size = agent.result_cache_size
+    agent.result_cache_size = 0
+    rows = []
+    try:
+        for query in SAMPLE_QUERIES:
+            full = agent.preprocess_query(query, "full")
+            lite = agent.preprocess_query(query, "lite")
+            assert lite["entities"] == full["entities"] and lite["sql_mappings"] == full["sql_mappings"], query
+        print("lite 프로필 엔티티/SQL 패턴이 full과 일치")
+
+        for profile in PREPROCESS_PROFILES:
+            rows.append(measure(profile, lambda q: agent.preprocess_query(q, profile), SAMPLE_QUERIES, args.repeat))
+    finally:
+        agent.result_cache_size = cache_size
+
+    baseline = rows[0]["p50_us"]
+    for row in rows:
+        row["speedup"] = f"{baseline / row['p50_us']:.2f}x"
+    return rows
+
+def bench_batch(agent: HybridPreprocessingAgent, args) -> list:
+    # 실행마다 다른 질의를 써서 결과 캐시 적중을 배제
+    def make_queries(run: int) -> list:
+        return [f"{SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]} {run}-{i}" for i in range(args.batch)]
+
+    started = time.perf_counter()
+    sequential = [agent.preprocess_query(query, "lite") for query in make_queries(0)]
+    elapsed = time.perf_counter() - started
+    rows = [{
+        "method": "sequential loop",
+        "workers": 1,
+        "queries": len(sequential),
+        "elapsed_s": round(elapsed, 2),
+        "queries_per_s": round(len(sequential) / elapsed, 1),
+        "per_core_qps": round(len(sequential) / elapsed, 1)
+    }]
+
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, cores})
+    # 풀 크기를 측정할 최대 워커 수로 맞추고 워커 기동(spawn) 시간은 따로 측정
+    agent.shutdown_batch_pool()
+    agent.batch_workers = worker_counts[-1]
+    warmup = timed(agent.warm_batch_pool)[1] / 1000
+    try:
+        for run, workers in enumerate(worker_counts, 1):
+            stats = {}
+            results = list(agent.preprocess_batch(make_queries(run), workers=workers, profile="lite", stats=stats))
+            assert len(results) == args.batch and all("error" not in result for result in results)
+            rows.append({
+                "method": "preprocess_batch",
+                "workers": workers,
+                "queries": stats["queries"],
+                "elapsed_s": stats["elapsed_sec"],
+                "queries_per_s": stats["queries_per_sec"],
+                "per_core_qps": stats["queries_per_sec_per_core"]
+            })
+    finally:
+        agent.shutdown_batch_pool()
+    print(f"CPU 코어 {cores}개, 워커 풀 준비 {warmup:.2f}초 ({agent.batch_start_method}, 첫 배치 전 1회)")
+    return rows
+
+def bench_alloc(agent: HybridPreprocessingAgent, args) -> list:
+    queries = [f"{SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]} {i}" for i in range(200)]
+    cache_size = agent.result_cache_size
+    agent.result_cache_size = 0
+    # 용어 색인/토크나이저 캐시를 미리 채워 결과 자체의 할당만 측정
+    for query in queries:
+        agent.analyze_query(query, "full")
+
+    rows = []
+    try:
+        for name, func in [("dict tree", agent.preprocess_query), ("slots objects", agent.analyze_query)]:
+            gc.collect()
+            objects_before = len(gc.get_objects())
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            results = [func(query, "full") for query in queries]
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            gc.collect()
+            objects_after = len(gc.get_objects())
+
+            retained = [stat for stat in after.compare_to(before, "filename") if stat.size_diff > 0]
+            rows.append({
+                "result": name,
+                "queries": len(results),
+                "blocks_per_query": round(sum(stat.count_diff for stat in retained) / len(results), 1),
+                "bytes_per_query": round(sum(stat.size_diff for stat in retained) / len(results)),
+                "gc_objects_per_query": round((objects_after - objects_before) / len(results), 1),
+                "peak_kb": round(peak / 1024, 1)
+            })
+            del results
+    finally:
+        agent.result_cache_size = cache_size
+    return rows
+
+SECTIONS = {
+    "regex": bench_regex,
+    "segmenter": bench_segmenter,
+    "tokenizer": bench_tokenizer,
+    "cache": bench_cache,
+    "profile": bench_profile,
+    "batch": bench_batch,
+    "alloc": bench_alloc
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="전처리 에이전트 마이크로벤치마크")
+    parser.add_argument("--sections", nargs="+", default=list(SECTIONS), choices=list(SECTIONS))
+    parser.add_argument("--repeat", type=int, default=2000, help="측정 호출 수")
+    parser.add_argument("--fuzz", type=int, default=5000, help="절 분리기 무작위 입력 수")
+    parser.add_argument("--batch", type=int, default=5000, help="배치 전처리 질의 수")
+    args = parser.parse_args()
+
+    agent = HybridPreprocessingAgent()
+    for section in args.sections:
+        print(f"\n[{section}]")
+        rows = SECTIONS[section](agent, args)
+        print_table(rows, list(rows[0].keys()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RAG 검색 평가 하네스
+청커/청크 크기/임베딩 차원/HNSW 파라미터/top_k 조합을 RAGService로 색인·검색하여
+recall@k, MRR, 쿼리 지연 p50/p95, 색인 시간, 메모리/디스크 사용량을 비교
+
+- 임베딩은 결정적 해싱 임베딩(네트워크 불필요)을 사용하고 차원 수로 모델 크기를 흉내냄
+- 색인 설정마다 별도 프로세스에서 측정하여 메모리 수치가 섞이지 않도록 함
+- --distractors 로 샘플 문서 어휘를 섞은 방해 문서를 추가해 코퍼스 규모를 키울 수 있음
+
+실행: python benchmarks/retrieval/sweep.py [--grid benchmarks/retrieval/grid.json] \
+        [--distractors 20] [--output results.json]
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import itertools
+import subprocess
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import (
+    HashingEmbeddings, load_rag_sources, make_rag_service, ingest_rag_sources, timed, print_table
+)
+
+DEFAULT_GRID = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grid.json")
+
+# 색인을 새로 만들어야 하는 설정 키 (나머지는 같은 색인에서 검색만 반복)
+INDEX_KEYS = ["chunker", "chunk_size", "embedding_dim", "hnsw_m", "hnsw_search_ef"]
+
+# HNSW 설정 키 -> RAGService 환경 변수 (grid에 없으면 Chroma 기본값)
+HNSW_ENV = {"hnsw_m": "RAG_HNSW_M", "hnsw_search_ef": "RAG_HNSW_SEARCH_EF"}
+
+def current_rss_mb() -> float:
+    """현재 프로세스 RSS (MB)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def directory_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / 1024 / 1024
+
+def write_distractors(count: int, seed: int = 42, domain_vocabulary: bool = False) -> list:
+    """샘플 문서 어휘를 무작위로 섞은 방해 문서 생성 -> 소스 목록
+    (domain_vocabulary=True 이면 배정된 도메인 문서의 어휘만 사용)"""
+    sources = load_rag_sources()
+    vocabulary = {}
+    for source in sources:
+        with open(source["filepath"], 'r', encoding='utf-8') as f:
+            vocabulary.setdefault(source["domain"], []).extend(f.read().split())
+    shared = [word for words in vocabulary.values() for word in words]
+
+    rng = random.Random(seed)
+    directory = tempfile.mkdtemp(prefix="rag_distractors_")
+    domains = sorted(vocabulary)
+    distractors = []
+    for i in range(count):
+        domain = domains[i % len(domains)]
+        words = vocabulary[domain] if domain_vocabulary else shared
+        lines = [" ".join(rng.choice(words) for _ in range(rng.randint(8, 20))) + "." for _ in range(40)]
+        filepath = os.path.join(directory, f"distractor_{i:04d}.txt")
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+        distractors.append({"domain": domain, "filename": os.path.basename(filepath), "filepath": filepath})
+    return distractors
+
+def configure_environment(index_config: dict):
+    """RAGService가 읽는 청킹 환경 변수 설정"""
+    os.environ['RAG_CHUNKER'] = index_config["chunker"]
+    if index_config["chunker"] == "korean":
+        os.environ['RAG_CHUNK_MAX_TOKENS'] = str(index_config["chunk_size"])
+        os.environ['RAG_CHUNK_OVERLAP_TOKENS'] = str(index_config["chunk_size"] // 10)
+    else:
+        os.environ['RAG_CHUNK_SIZE'] = str(index_config["chunk_size"])
+        os.environ['RAG_CHUNK_OVERLAP'] = str(index_config["chunk_size"] // 5)
+    for key, env in HNSW_ENV.items():
+        if index_config.get(key) is not None:
+            os.environ[env] = str(index_config[key])
+    # 해싱 임베딩은 코사인 값이 낮으므로 유사도 컷오프 미적용, 지연 측정을 위해 배칭/캐시 비활성화
+    os.environ['RAG_MIN_SIMILARITY'] = '0'
+    os.environ['EMBEDDING_DISPATCH'] = 'false'
+
+def measure_index(index_config: dict, top_ks: list, scopes: list, distractors: int, questions_path: str) -> list:
+    """단일 색인 설정 측정 (워커 프로세스에서 실행)"""
+    configure_environment(index_config)
+    from services.retrieval_evaluation import load_evaluation_set, evaluate_retrieval
+
+    questions = load_evaluation_set(questions_path)
+    sources = load_rag_sources() + write_distractors(distractors)
+
+    rss_start = current_rss_mb()
+    service = make_rag_service(embeddings=HashingEmbeddings(dimensions=index_config["embedding_dim"]))
+    chunks, build_ms = timed(ingest_rag_sources, service, sources)
+    build = {
+        "chunks": chunks,
+        "build_ms": round(build_ms, 1),
+        "rss_mb": round(current_rss_mb() - rss_start, 1),
+        "disk_mb": round(directory_size_mb(service.persist_directory), 2)
+    }
+
+    rows = []
+    for scope, top_k in itertools.product(scopes, top_ks):
+        # global은 도메인 라우팅 없이 전체 컬렉션 인덱스 자체를 측정
+        result = evaluate_retrieval(service, questions, top_k=top_k, scope=scope, routing=False)
+        row = dict(index_config, scope=scope, top_k=top_k, **build)
+        row.update({
+            "recall@k": result[f"recall@{top_k}"],
+            "file_recall@k": result[f"file_recall@{top_k}"],
+            "mrr": result["mrr"],
+            "p50_ms": result["latency_p50_ms"],
+            "p95_ms": result["latency_p95_ms"]
+        })
+        rows.append(row)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG 검색 평가 하네스")
+    parser.add_argument("--grid", default=DEFAULT_GRID, help="설정 조합 JSON")
+    parser.add_argument("--questions", default=None, help="평가 질문 세트 (기본: data/evaluation/rag_questions.json)")
+    parser.add_argument("--distractors", type=int, default=20, help="추가할 방해 문서 수")
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    with open(args.grid, 'r', encoding='utf-8') as f:
+        grid = json.load(f)
+
+    if args.worker:
+        rows = measure_index(json.loads(args.worker), grid["top_k"], grid["scope"], args.distractors, args.questions)
+        print(json.dumps(rows, ensure_ascii=False))
+        return
+
+    index_configs = [dict(zip(INDEX_KEYS, values)) for values in itertools.product(*(grid.get(key, [None]) for key in INDEX_KEYS))]
+    print(f"색인 설정 {len(index_configs)}개 x top_k {grid['top_k']} x scope {grid['scope']}, "
+          f"방해 문서 {args.distractors}개\n")
+
+    rows = []
+    for index_config in index_configs:
+        command = [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(index_config)] + sys.argv[1:]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        output = completed.stdout.strip().splitlines()
+        if completed.returncode != 0 or not output:
+            error = (completed.stderr.strip().splitlines() or ["unknown error"])[-1]
+            print(f"⚠️ {index_config} 측정 실패: {error}")
+            continue
+        rows.extend(json.loads(output[-1]))
+
+    print_table(rows, INDEX_KEYS + ["scope", "top_k", "chunks", "build_ms", "rss_mb", "disk_mb",
+                                    "recall@k", "file_recall@k", "mrr", "p50_ms", "p95_ms"])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+
+if __name__ == "__main__":
+    main()
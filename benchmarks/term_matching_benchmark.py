@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+딕셔너리 용어 매칭 벤치마크
+용어/동의어마다 `in` 검사와 `str.replace`를 반복하던 기존 방식과
+Aho-Corasick 오토마톤 단일 스캔의 구축 시간, 질의당 매핑+엔티티 추출 지연을 용어 수별로 비교
+(단어별 get_term_info도 전체 순회 방식과 표면형 역색인 조회를 비교)
+
+실행: python benchmarks/term_matching_benchmark.py [--terms 100 1000 10000] [--queries 200]
+"""
+
+import random
+import argparse
+import tempfile
+
+from common import percentile, timed, print_table
+
+from services.dynamic_dictionary_manager import DynamicDictionaryManager
+from preprocessing.hybrid_preprocessing_agent import HybridPreprocessingAgent
+
+SAMPLE_QUERIES = [
+    "신용점수 750 이상인 개인고객의 대출금액 합계를 조회해주세요",
+    "위험도가 높은 기업고객 중 연체일수가 30일 이상인 고객 수를 알려주세요",
+    "VIP고객의 평균 신용점수와 일반고객의 평균 신용점수를 비교해주세요",
+    "소득수준이 보통이고 신용점수가 650 이상인 고객 목록을 조회해주세요"
+]
+
+def random_word(rng: random.Random) -> str:
+    return "".join(chr(rng.randint(0xAC00, 0xD7A3)) for _ in range(rng.randint(2, 5)))
+
+def build_dictionary(base_terms: dict, count: int, seed: int = 42) -> dict:
+    """샘플 딕셔너리에 무작위 한글 용어(동의어 3개씩)를 추가해 count개로 확장"""
+    rng = random.Random(seed)
+    credit_terms = {category: dict(terms) for category, terms in base_terms.items()}
+    synthetic = credit_terms.setdefault("synthetic", {})
+    existing = sum(len(terms) for terms in credit_terms.values())
+    for i in range(max(count - existing, 0)):
+        synthetic[random_word(rng)] = {
+            "synonyms": [random_word(rng) for _ in range(3)],
+            "sql_mapping": f"synthetic_{i}",
+            "table": "synthetic"
+        }
+    return credit_terms
+
+def make_queries(credit_terms: dict, count: int, seed: int = 7) -> list:
+    """샘플 질의에 무작위 용어/동의어를 끼워 넣은 질의 목록"""
+    rng = random.Random(seed)
+    surfaces = [surface for terms in credit_terms.values() for term, info in terms.items()
+                for surface in [term] + info.get("synonyms", [])]
+    queries = []
+    for i in range(count):
+        words = SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)].split()
+        for _ in range(3):
+            words.insert(rng.randint(0, len(words)), rng.choice(surfaces))
+        queries.append(" ".join(words))
+    return queries
+
+def naive_mapping(credit_terms: dict, text: str):
+    """기존 방식: 용어마다 in 검사 + 연쇄 replace, 엔티티는 별도 전체 순회"""
+    mapped_text = text
+    for category, terms in credit_terms.items():
+        for term, info in terms.items():
+            if term in mapped_text:
+                mapped_text = mapped_text.replace(term, info.get("sql_mapping", term))
+            for synonym in info.get("synonyms", []):
+                if synonym in mapped_text:
+                    mapped_text = mapped_text.replace(synonym, info.get("sql_mapping", term))
+    found = [term for terms in credit_terms.values() for term, info in terms.items()
+             if term in text or any(syn in text for syn in info.get("synonyms", []))]
+    return mapped_text, found
+
+def naive_term_info(credit_terms: dict, word: str):
+    """기존 방식: 카테고리/용어/동의어 전체 순회"""
+    for category, terms in credit_terms.items():
+        for key, info in terms.items():
+            if word == key or word in info.get("synonyms", []):
+                return {"category": category, "term": key, "info": info}
+    return None
+
+def automaton_mapping(agent: HybridPreprocessingAgent, text: str):
+    term_matches, _ = agent._scan_terms(text)
+    return agent._apply_domain_mapping(text, term_matches), agent._extract_entities(text, term_matches)
+
+def main():
+    parser = argparse.ArgumentParser(description="딕셔너리 용어 매칭 벤치마크")
+    parser.add_argument("--terms", type=int, nargs="+", default=[100, 1000, 10000], help="용어 수 목록")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    agent = HybridPreprocessingAgent()
+    base_terms = agent.dict_manager.credit_terms
+    sql_patterns = agent.dict_manager.sql_patterns
+    # 운영 딕셔너리 파일을 건드리지 않도록 임시 디렉토리의 관리자 사용
+    agent.dict_manager = DynamicDictionaryManager(dictionaries_dir=tempfile.mkdtemp(prefix="dict_bench_"))
+    agent.dict_manager.sql_patterns = sql_patterns
+
+    rows = []
+    lookup_rows = []
+    for count in args.terms:
+        credit_terms = build_dictionary(base_terms, count)
+        queries = make_queries(credit_terms, args.queries)
+        agent.dict_manager.credit_terms = credit_terms
+        agent.dict_manager._rebuild_surface_index()
+        agent.dict_manager._mark_changed()
+        _, build_ms = timed(agent._get_term_index)
+
+        for name, func in [("naive", lambda q: naive_mapping(credit_terms, q)),
+                           ("automaton", lambda q: automaton_mapping(agent, q))]:
+            latencies = [timed(func, query)[1] for query in queries]
+            rows.append({
+                "terms": count,
+                "surfaces": len(agent._get_term_index()[2]),
+                "method": name,
+                "build_ms": round(build_ms, 1) if name == "automaton" else "-",
+                "p50_ms": round(percentile(latencies, 50), 3),
+                "p95_ms": round(percentile(latencies, 95), 3),
+                "qps": round(len(latencies) / (sum(latencies) / 1000), 1)
+            })
+
+        # 절 분석의 단어별 용어 조회
+        words = [word for query in queries for word in query.split()]
+        for name, func in [("scan", lambda w: naive_term_info(credit_terms, w)),
+                           ("reverse index", agent.dict_manager.get_term_info)]:
+            _, elapsed = timed(lambda: [func(word) for word in words])
+            lookup_rows.append({
+                "terms": count,
+                "method": name,
+                "lookups": len(words),
+                "us_per_lookup": round(elapsed * 1000 / len(words), 2)
+            })
+
+    print_table(rows, ["terms", "surfaces", "method", "build_ms", "p50_ms", "p95_ms", "qps"])
+    print()
+    print_table(lookup_rows, ["terms", "method", "lookups", "us_per_lookup"])
+
+if __name__ == "__main__":
+    main()